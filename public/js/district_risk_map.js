@@ -22,6 +22,48 @@ frappe.ready(() => {
       zoom: 6
     });
 
+    // District polygons as vector tiles, coloured by max sector severity
+    map.on('load', () => {
+      map.addSource('districts', {
+        type: 'vector',
+        tiles: [`${window.location.origin}/tiles/districts/{z}/{x}/{y}.mvt`],
+        maxzoom: 12
+      });
+
+      map.addLayer({
+        id: 'district-severity',
+        type: 'fill',
+        source: 'districts',
+        'source-layer': 'districts',
+        paint: {
+          'fill-color': [
+            'match', ['get', 'max_severity'],
+            1, getColor(1),
+            2, getColor(2),
+            3, getColor(3),
+            4, getColor(4),
+            5, getColor(5),
+            '#999'
+          ],
+          'fill-opacity': 0.45,
+          'fill-outline-color': '#555'
+        }
+      });
+
+      map.on('click', 'district-severity', (e) => {
+        const p = e.features[0].properties;
+        new mapboxgl.Popup()
+          .setLngLat(e.lngLat)
+          .setHTML(`
+            <strong>${p.district_ar || p.district}</strong><br>
+            <b>Severity:</b> ${p.max_severity}<br>
+            <b>PiN:</b> ${p.total_pin_sum}<br>
+            <b>Risk:</b> ${p.risk_severity}
+          `)
+          .addTo(map);
+      });
+    });
+
     // Get risk data from backend
     frappe.call({
       method: 'red_crescent.api.get_district_risks',
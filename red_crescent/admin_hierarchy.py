@@ -0,0 +1,150 @@
+from collections import namedtuple
+
+import frappe
+
+from red_crescent.map_search import normalize
+
+# Process-wide cache of the administrative hierarchy (Governorate → Districts
+# → Sub-Districts → Villages) with lookups by name, pcode, English and Arabic
+# name, plus the Sectors names shown next to it on the severity map. Workers
+# keep their own copy per site and compare a version stamp in Redis on each
+# read; any change to the source doctypes bumps the stamp.
+
+VERSION_KEY = "admin_hierarchy_version"
+
+LEVELS = ("governorate", "district", "sub_district", "village")
+
+# level: (doctype, pcode field, English name field, Arabic name field, parent field)
+SOURCES = {
+    "governorate": ("Governorate", "gov_pcode", "eng_name", "ar_name", None),
+    "district": ("Districts", "dis_pcode", "eng_name", "ar_name", "governorate"),
+    "sub_district": ("Sub-Districts", "sub_district_pcode", "sub_district", "arabic_name", "district"),
+    "village": ("Villages", "villagepcode", "villagenameen", "villagenamear", "sub_district"),
+}
+
+Place = namedtuple("Place", "level name pcode name_en name_ar parent")
+
+_sites = {}
+
+
+# ------------------------------- Cache ------------------------------- #
+
+def _key(value):
+    return normalize(value)
+
+
+def _load_level(level):
+    doctype, pcode, en, ar, parent = SOURCES[level]
+    fields = ["name", pcode, en, ar]
+    if parent:
+        fields.append(parent)
+    if level == "village":
+        # Villages without a sub-district still belong to a district
+        fields.append("district")
+
+    places, lookup = {}, {}
+    for r in frappe.get_all(doctype, fields=fields):
+        parent_name = r.get(parent) if parent else None
+        if level == "village" and not parent_name:
+            parent_name = r.district
+        place = Place(level, r.name, r.get(pcode), r.get(en), r.get(ar), parent_name)
+        places[r.name] = place
+        for value in (r.name, place.pcode, place.name_en, place.name_ar):
+            key = _key(value)
+            if key:
+                names = lookup.setdefault(key, [])
+                if r.name not in names:
+                    names.append(r.name)
+    return places, lookup
+
+
+def _load():
+    state = {"places": {}, "lookup": {}, "children": {}}
+    for level in LEVELS:
+        places, lookup = _load_level(level)
+        state["places"][level] = places
+        state["lookup"][level] = lookup
+        children = state["children"][level] = {}
+        for place in places.values():
+            children.setdefault(place.parent, []).append(place.name)
+    state["sectors"] = {s.name: s for s in frappe.get_all("Sectors", fields=["name", "sector", "ar_sector"])}
+    return state
+
+
+def get_hierarchy():
+    version = frappe.cache().get_value(VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=12)
+        frappe.cache().set_value(VERSION_KEY, version)
+
+    state = _sites.get(frappe.local.site)
+    if not state or state["version"] != version:
+        state = _sites[frappe.local.site] = {"version": version, **_load()}
+    return state
+
+
+def invalidate(*args, **kwargs):
+    frappe.cache().delete_value(VERSION_KEY)
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(VERSION_KEY))
+
+
+# ------------------------------- Lookups ------------------------------- #
+
+def get_place(level, name):
+    """Place of `level` by its document name, or None."""
+    return get_hierarchy()["places"][level].get(name)
+
+
+def resolve(level, value, parent=None):
+    """Place of `level` whose name, pcode, English or Arabic name is `value`.
+
+    `parent` (a name of the level above) disambiguates names shared by
+    several places, e.g. districts with the same name in two governorates.
+    """
+    if not value:
+        return None
+    state = get_hierarchy()
+    places = state["places"][level]
+    if value in places and (not parent or places[value].parent == parent):
+        return places[value]
+
+    names = state["lookup"][level].get(_key(value)) or []
+    if parent:
+        names = [n for n in names if places[n].parent == parent]
+    return places[names[0]] if names else None
+
+
+def resolve_name(level, value, parent=None):
+    """Document name for `value` (see resolve), or `value` itself if unknown."""
+    place = resolve(level, value, parent)
+    return place.name if place else value
+
+
+def children(level, name):
+    """Places one level below `level` whose parent is `name`."""
+    if level == LEVELS[-1]:
+        return []
+    below = LEVELS[LEVELS.index(level) + 1]
+    state = get_hierarchy()
+    return [state["places"][below][n] for n in state["children"][below].get(name, [])]
+
+
+def ancestors(level, name):
+    """{level: Place} for the place and every level above it."""
+    out = {}
+    index = LEVELS.index(level)
+    while name and index >= 0:
+        place = get_place(LEVELS[index], name)
+        if not place:
+            break
+        out[place.level] = place
+        if place.level == "village" and not get_place("sub_district", place.parent):
+            # Village linked straight to a district
+            index -= 1
+        name = place.parent
+        index -= 1
+    return out
+
+
+def get_sector(name):
+    return get_hierarchy()["sectors"].get(name)
@@ -1,9 +1,7 @@
-import math
-import requests
-from urllib.parse import quote
-
 import frappe
 
+from red_crescent.http_cache import conditional_response
+
 
 # ------------------------------- Helpers ------------------------------- #
 
@@ -19,32 +17,20 @@ def make_point_feature(lat, lng, props):
 # ------------------------------- Public APIs ------------------------------- #
 
 @frappe.whitelist()
-def reverse_geocode(lat: float, lng: float) -> str:
-    """Reverse geocode using Nominatim with a graceful fallback."""
-    try:
-        r = requests.get(
-            "https://nominatim.openstreetmap.org/reverse",
-            params={"format": "jsonv2", "lat": lat, "lon": lng, "addressdetails": 1},
-            headers={"User-Agent": "Frappe-ERPNext-Volunteer-Map/1.0"},
-            timeout=10,
-        )
-        r.raise_for_status()
-        j = r.json()
-        display = j.get("display_name")
-        if display:
-            return display
-        a = j.get("address", {}) or {}
-        parts = [
-            a.get("road"),
-            a.get("suburb"),
-            a.get("city") or a.get("town") or a.get("village"),
-            a.get("state"),
-            a.get("postcode"),
-            a.get("country"),
-        ]
-        return ", ".join([p for p in parts if p])
-    except Exception:
-        return f"{float(lat):.6f}, {float(lng):.6f}"
+def reverse_geocode(lat: float, lng: float, enrich: bool = False) -> str:
+    """Reverse geocode against the local gazetteer (Nominatim only if enriched)."""
+    from red_crescent.gazetteer import reverse_geocode as gazetteer_reverse
+
+    result = gazetteer_reverse(lat, lng, enrich=enrich)
+    return result["display_name"] or result.get("nominatim") or f"{float(lat):.6f}, {float(lng):.6f}"
+
+
+@frappe.whitelist()
+def reverse_geocode_details(lat: float, lng: float, enrich: bool = False) -> dict:
+    """Village, sub-district, district and governorate (pcodes, AR/EN names) for a point."""
+    from red_crescent.gazetteer import reverse_geocode as gazetteer_reverse
+
+    return gazetteer_reverse(lat, lng, enrich=enrich)
 
 
 @frappe.whitelist(allow_guest=True)
@@ -59,85 +45,174 @@ def boot_session(bootinfo):
 
 
 # ------------------------------- Risk / Needs ------------------------------- #
-import json
 import frappe
-from frappe.utils import cint
+from frappe.utils import add_days, cint, nowdate
+
+from red_crescent.district_cache import get_districts, get_population
+from red_crescent.geo_simplify import get_simplified, resolution_for
+from red_crescent.sector_rollup import get_rollups, summarize
 
 @frappe.whitelist()
-def get_district_risks(governorate=None, district=None, risk_type=None, min_severity=None, limit_start=0, page_length=2000):
-    filters = {}
-    if governorate:
-        filters["governorate"] = governorate
-    if district:
-        filters["district"] = district
-    if risk_type:
-        filters["risk_type"] = risk_type
+def get_district_risks(governorate=None, district=None, risk_type=None, min_severity=None, limit_start=0, page_length=2000, zoom=None, resolution=None, cursor=None):
+    """District risk features, up to `page_length` risk rows per page.
+
+    Risk rows are seeked on (`modified`, `name`), newest first, with the
+    opaque `next_cursor` of the previous page. A district belongs to the page
+    that reaches its newest row, and that page returns all of its rows (the
+    first district even if it alone is longer than `page_length`); later
+    pages skip districts already returned. `limit_start` offsets are
+    rejected, since they cannot page whole districts.
+    """
+    from red_crescent.geojson_stream import decode_cursor, encode_cursor
+
+    if cint(limit_start):
+        frappe.throw(
+            frappe._("get_district_risks pages with next_cursor; limit_start is not supported"),
+            frappe.ValidationError,
+        )
 
+    page_length = max(cint(page_length), 1)
+    conditions, values = [], {"batch": page_length + 1}
+    for field, value in (("governorate", governorate), ("district", district), ("risk_type", risk_type)):
+        if value:
+            conditions.append(f"{field} = %({field})s")
+            values[field] = value
+
+    def where(*extra):
+        return " AND ".join([*conditions, *extra]) or "1 = 1"
+
+    def district_keys(keys):
+        """Condition on (governorate, district) pairs, one index seek each."""
+        parts = []
+        for i, (gov, dist) in enumerate(keys):
+            parts.append(f"(governorate <=> %(kg{i})s AND district <=> %(kd{i})s)")
+            values[f"kg{i}"], values[f"kd{i}"] = gov, dist
+        return f"({' OR '.join(parts)})"
+
+    start = decode_cursor(cursor, size=2)
     default_mode = not risk_type and (min_severity in (None, "", 0, "0"))
 
-    rows = frappe.get_all(
-        "District Risk Profile",
-        fields=[
-            "name", "governorate", "district", "sub_district", "village",
-            "risk_type", "impact", "risk_ranking as risk_level",
-            "latitude", "longitude"
-        ],
-        filters=filters,
-        start=int(limit_start),
-        page_length=int(page_length),
-        order_by="modified desc",
-    )
-
-    population_rows = frappe.get_all(
-        "Yemen Population by District - 2025",
-        fields=["district", "population_total"]
-    )
-    population_map = {
-        row["district"]: row["population_total"] or 0
-        for row in population_rows
-    }
+    # Walk risk rows from the cursor, collecting districts that start here
+    page, counts, seen = [], {}, set()
+    rows_in_page, position, next_cursor = 0, start, None
+    while True:
+        seek = []
+        if position:
+            seek.append("(modified < %(pos_modified)s OR (modified = %(pos_modified)s AND name < %(pos_name)s))")
+            values["pos_modified"], values["pos_name"] = position
+        batch = frappe.db.sql(
+            f"""
+            SELECT name, modified, governorate, district
+            FROM `tabDistrict Risk Profile`
+            WHERE {where(*seek)}
+            ORDER BY modified DESC, name DESC
+            LIMIT %(batch)s
+            """,
+            values,
+            as_dict=True,
+        )
 
-    district_map = {}
-    for r in rows:
-        impact = cint(r.get("impact") or 0)
-        level = cint(r.get("risk_level") or 0)
-        severity = impact * level
-
-        dist_key = f"{r['governorate']}::{r['district']}"
-
-        if dist_key not in district_map:
-            district_map[dist_key] = {
-                "governorate": r["governorate"],
-                "district": r["district"],
-                "sub_district": r.get("sub_district"),
-                "village": r.get("village"),
-                "latitude": r.get("latitude"),
-                "longitude": r.get("longitude"),
-                "all_risks": [],
-                "filtered_risks": []
-            }
+        new_keys = [k for k in dict.fromkeys((r.governorate, r.district) for r in batch) if k not in seen]
+        if new_keys:
+            # Row counts, and whether a row up to the cursor (the last row the
+            # previous page consumed) put the district on an earlier page
+            earlier = "0"
+            if start:
+                earlier = (
+                    "MAX(modified > %(start_modified)s"
+                    " OR (modified = %(start_modified)s AND name >= %(start_name)s))"
+                )
+                values["start_modified"], values["start_name"] = start
+            for g in frappe.db.sql(
+                f"""
+                SELECT governorate, district, COUNT(*) AS risk_count, {earlier} AS earlier
+                FROM `tabDistrict Risk Profile`
+                WHERE {where(district_keys(new_keys))}
+                GROUP BY governorate, district
+                """,
+                values,
+                as_dict=True,
+            ):
+                key = (g.governorate, g.district)
+                seen.add(key)
+                if not cint(g.earlier):
+                    counts[key] = cint(g.risk_count)
+
+        for r in batch:
+            key = (r.governorate, r.district)
+            if key in counts and key not in page:
+                if page and rows_in_page + counts[key] > page_length:
+                    next_cursor = encode_cursor(*position)
+                    break
+                page.append(key)
+                rows_in_page += counts[key]
+            position = (str(r.modified), r.name)
+        if next_cursor or len(batch) < values["batch"]:
+            break
+
+    # The page's risk rows, newest first within each district
+    risks_by_district = {key: [] for key in page}
+    if page:
+        for r in frappe.db.sql(
+            f"""
+            SELECT
+                name, governorate, district, risk_type, impact,
+                risk_ranking AS risk_level, sub_district, village, latitude, longitude
+            FROM `tabDistrict Risk Profile`
+            WHERE {where(district_keys(page))}
+            ORDER BY modified DESC, name DESC
+            """,
+            values,
+            as_dict=True,
+        ):
+            risks_by_district[(r.governorate, r.district)].append(r)
 
-        # جميع المخاطر
-        district_map[dist_key]["all_risks"].append({
-            "name": r["name"],
-            "risk_type": r["risk_type"],
-            "impact": impact,
-            "risk_level": level,
-            "severity": severity
-        })
+    districts = get_districts()
+    population = get_population()
 
-        # قائمة المخاطر المفلترة
-        if min_severity is None or severity >= int(min_severity):
-            district_map[dist_key]["filtered_risks"].append({
+    district_map = {}
+    for gov, dist in page:
+        risks = risks_by_district[(gov, dist)]
+        latest = risks[0] if risks else {}
+        data = district_map[f"{gov or ''}::{dist or ''}"] = {
+            "governorate": gov or None,
+            "district": dist or None,
+            "sub_district": latest.get("sub_district"),
+            "village": latest.get("village"),
+            "latitude": latest.get("latitude"),
+            "longitude": latest.get("longitude"),
+            "all_risks": [],
+            "filtered_risks": []
+        }
+
+        for r in risks:
+            impact = cint(r.get("impact") or 0)
+            level = cint(r.get("risk_level") or 0)
+            risk = {
                 "name": r["name"],
                 "risk_type": r["risk_type"],
                 "impact": impact,
                 "risk_level": level,
-                "severity": severity
-            })
+                "severity": impact * level
+            }
+            # جميع المخاطر
+            data["all_risks"].append(risk)
+            # قائمة المخاطر المفلترة
+            if min_severity is None or risk["severity"] >= int(min_severity):
+                data["filtered_risks"].append(dict(risk))
+
+    shapes = get_simplified(
+        "Districts",
+        [
+            (ref.name, ref.modified, ref.geometry)
+            for ref in (districts.get(d["district"]) for d in district_map.values())
+            if ref and ref.geometry
+        ],
+        resolution_for(zoom, resolution),
+    )
 
     features = []
-    for dist_key, data in district_map.items():
+    for data in district_map.values():
         if not data["filtered_risks"]:
             # 🧠 في الوضع الافتراضي → نعرض أعلى خطر
             if default_mode and data["all_risks"]:
@@ -149,26 +224,10 @@ def get_district_risks(governorate=None, district=None, risk_type=None, min_seve
         geom = None
         district_ar = data["district"]
 
-        try:
-            dist_doc = frappe.db.get_value(
-                "Districts",
-                {
-                    "governorate": data["governorate"],
-                    "name": data["district"]
-                },
-                ["location_geojson", "ar_name"],
-                as_dict=True,
-            )
-            if dist_doc:
-                if dist_doc.get("ar_name"):
-                    district_ar = dist_doc["ar_name"]
-                if dist_doc.get("location_geojson"):
-                    try:
-                        geom = json.loads(dist_doc["location_geojson"])
-                    except Exception:
-                        geom = None
-        except Exception as e:
-            frappe.logger().error(f"GeoJSON load failed for {dist_key}: {e}")
+        ref = districts.get(data["district"])
+        if ref and ref.governorate == data["governorate"]:
+            district_ar = ref.ar_name or district_ar
+            geom = shapes.get(ref.name)
 
         if not geom and data["latitude"] and data["longitude"]:
             try:
@@ -183,7 +242,7 @@ def get_district_risks(governorate=None, district=None, risk_type=None, min_seve
             continue
 
         max_severity = max([r["severity"] for r in data["all_risks"]]) if data["all_risks"] else 0
-        total_pop = population_map.get(data["district"], 0)
+        total_pop = population.get(data["district"], 0)
 
         # 🆕 حساب السكان المعرضين بنسبة من السكان
         ratio = max_severity / 100 if max_severity else 0
@@ -207,15 +266,15 @@ def get_district_risks(governorate=None, district=None, risk_type=None, min_seve
         })
 
     # 🆕 إجماليات على مستوى البلد
-    total_population_all = sum(population_map.values())
+    total_population_all = sum(population.values())
     total_exposed = sum(f["properties"]["exposed_population"] for f in features)
 
     return {
         "type": "FeatureCollection",
         "features": features,
-        "limit_start": int(limit_start),
-        "page_length": int(page_length),
-        "records_returned": len(rows),
+        "page_length": page_length,
+        "next_cursor": next_cursor,
+        "records_returned": rows_in_page,
         "population_total_all": total_population_all,
         "population_exposed_total": total_exposed
     }
@@ -286,256 +345,136 @@ def get_district_sectoral_needs_geojson(governorate=None, district=None, sector=
 # ------------------------------- Volunteers ------------------------------- #
 
 @frappe.whitelist(allow_guest=True)
+@conditional_response("Volunteer Map Point", "Team Member")
 def get_volunteer_addresses_geojson(
-    governorate=None, district=None, address_type=None, q=None, team=None, sex=None
+    governorate=None, district=None, address_type=None, q=None, team=None, sex=None, status=None
 ):
-    CHILD = "Volunteer Address"
-    PARENT = "YRCS Volunteers"
-
-    volunteer_whitelist = None
-    if team:
-        members = frappe.get_all(
-            "Team Member", filters={"parenttype": "Teams", "parent": team}, fields=["volunteer"]
-        )
-        volunteer_whitelist = {m.volunteer for m in members if m.volunteer}
-        if not volunteer_whitelist:
-            return {"type": "FeatureCollection", "features": []}
-
-    filters = {"parenttype": PARENT, "latitude": ["is", "set"], "longitude": ["is", "set"]}
-    if governorate:
-        filters["governorate"] = governorate
-    if district:
-        filters["district"] = district
-    if address_type:
-        filters["add_type"] = address_type
-
-    or_filters = []
-    if q:
-        or_filters = [
-            [CHILD, "home_address", "like", f"%{q}%"],
-            [CHILD, "village", "like", f"%{q}%"],
-            [CHILD, "district", "like", f"%{q}%"],
-        ]
-
-    rows = frappe.get_all(
-        CHILD,
-        fields=[
-            "name", "parent", "add_type",
-            "governorate", "district", "sub_district", "village",
-            "home_address", "latitude", "longitude",
-        ],
-        filters=filters,
-        or_filters=or_filters,
-        limit_page_length=5000,
-        order_by="modified desc",
+    """Newest 5000 matching volunteer addresses; every filter runs before the limit."""
+    from red_crescent.volunteer_query import get_locations, to_feature
+
+    rows = get_locations(
+        governorate=governorate,
+        district=district,
+        address_type=address_type,
+        q=q,
+        team=team,
+        sex=sex,
+        status=status,
+        limit=5000,
     )
+    return {"type": "FeatureCollection", "features": [to_feature(r) for r in rows]}
 
-    if volunteer_whitelist is not None:
-        rows = [r for r in rows if r.parent in volunteer_whitelist]
 
-    parent_names = list({r.parent for r in rows})
-    name_map, sex_map, img_map = {}, {}, {}
-    if parent_names:
-        pr = frappe.get_all(
-            PARENT,
-            filters={"name": ["in", parent_names]},
-            fields=["name", "firstname", "middle_name", "last_name", "sex", "volunteer_photo"],
-        )
-        for p in pr:
-            full = " ".join(
-                [p.get("firstname") or "", p.get("middle_name") or "", p.get("last_name") or ""]
-            ).strip()
-            name_map[p.name] = full or p.name
-            sex_map[p.name] = p.sex or ""
-            img_map[p.name] = p.volunteer_photo or ""
-
-    feats = []
-    for r in rows:
-        if not r.latitude or not r.longitude:
-            continue
+@frappe.whitelist(allow_guest=True)
+def stream_volunteer_addresses_geojson(
+    governorate=None, district=None, address_type=None, q=None, team=None, sex=None, status=None, cursor=None,
+    page_length=None,
+):
+    """Page through all volunteer addresses; pass back `next_cursor` until it is null."""
+    from red_crescent.geojson_stream import volunteer_addresses
+
+    return volunteer_addresses(
+        governorate=governorate,
+        district=district,
+        address_type=address_type,
+        q=q,
+        team=team,
+        sex=sex,
+        status=status,
+        cursor=cursor,
+        page_length=page_length,
+    )
 
-        raw_img = img_map.get(r.parent)
-        image_url = (
-            frappe.utils.get_url(f"/files/{quote(raw_img)}")
-            if raw_img
-            else frappe.utils.get_url("/files/default-avatar.png")
-        )
 
-        feats.append(
-            make_point_feature(
-                r.latitude,
-                r.longitude,
-                {
-                    "row": r.name,
-                    "volunteer_id": r.parent,
-                    "volunteer": name_map.get(r.parent, r.parent),
-                    "sex": sex_map.get(r.parent),
-                    "image": image_url,
-                    "address_type": r.add_type,
-                    "governorate": r.governorate,
-                    "district": r.district,
-                    "sub_district": r.sub_district,
-                    "village": r.village,
-                    "home_address": r.home_address,
-                    "weight": 1,
-                },
-            )
-        )
+@frappe.whitelist(allow_guest=True)
+def get_volunteer_map_facets():
+    """All volunteers map filter lists with counts, in one cached call."""
+    from red_crescent.volunteer_facets import get_facets
 
-    return {"type": "FeatureCollection", "features": feats}
+    return get_facets()
 
 
 @frappe.whitelist(allow_guest=True)
 def get_distinct_vol_address_types():
-    rows = frappe.get_all(
-        "Volunteer Address",
-        fields=["distinct add_type as add_type"],
-        filters={"parenttype": "YRCS Volunteers"},
-    )
-    return [r.add_type for r in rows if r.add_type]
+    from red_crescent.volunteer_facets import get_facets
+
+    return [r["value"] for r in get_facets()["address_types"]]
 
 
 @frappe.whitelist(allow_guest=True)
 def get_vol_governorates():
-    rows = frappe.db.sql(
-        """
-        SELECT DISTINCT governorate
-        FROM `tabVolunteer Address`
-        WHERE parenttype = 'YRCS Volunteers'
-          AND IFNULL(governorate, '') != ''
-        ORDER BY governorate
-        """,
-        as_dict=True,
-    )
-    return [r.governorate for r in rows]
+    from red_crescent.volunteer_facets import get_facets
+
+    return [r["value"] for r in get_facets()["governorates"]]
 
 
 @frappe.whitelist(allow_guest=True)
 def get_vol_districts(governorate=None):
+    from red_crescent.volunteer_facets import get_facets
+
+    districts = get_facets()["districts"]
     if governorate:
-        rows = frappe.db.sql(
-            """
-            SELECT DISTINCT district
-            FROM `tabVolunteer Address`
-            WHERE parenttype = 'YRCS Volunteers'
-              AND IFNULL(district, '') != ''
-              AND governorate = %s
-            ORDER BY district
-            """,
-            (governorate,),
-            as_dict=True,
-        )
-    else:
-        rows = frappe.db.sql(
-            """
-            SELECT DISTINCT district
-            FROM `tabVolunteer Address`
-            WHERE parenttype = 'YRCS Volunteers'
-              AND IFNULL(district, '') != ''
-            ORDER BY district
-            """,
-            as_dict=True,
-        )
-    return [r.district for r in rows]
+        districts = [r for r in districts if r["governorate"] == governorate]
+    return list(dict.fromkeys(r["value"] for r in districts))
 
 
 @frappe.whitelist(allow_guest=True)
 def get_teams_for_filter():
-    return [r.name for r in frappe.get_all("Teams", fields=["name"], order_by="name asc")]
+    from red_crescent.volunteer_facets import get_facets
+
+    return [r["value"] for r in get_facets()["teams"]]
 
 
 @frappe.whitelist(allow_guest=True)
 def get_nearest_volunteers(
-    lat, lng, radius_km=10, address_type=None, team=None, sex=None, limit=100
+    lat, lng, radius_km=10, address_type=None, team=None, sex=None, status=None, limit=100
 ):
-    from frappe.utils.data import flt
-
-    lat = flt(lat)
-    lng = flt(lng)
-    radius_km = flt(radius_km)
+    """Closest volunteers to a point, served from the shared volunteer grid index."""
+    from red_crescent.volunteer_geo_index import nearest
+    from red_crescent.volunteer_query import team_volunteers
 
     volunteer_ids = None
     if team:
-        members = frappe.get_all("Team Member", filters={"parent": team}, fields=["volunteer"])
-        volunteer_ids = [m.volunteer for m in members if m.volunteer]
-
-    filters = {"latitude": ["is", "set"], "longitude": ["is", "set"]}
-    if address_type:
-        filters["add_type"] = address_type
-
-    rows = frappe.get_all(
-        "Volunteer Address",
-        fields=[
-            "name", "parent", "add_type", "governorate", "district", "sub_district",
-            "village", "home_address", "latitude", "longitude",
-        ],
-        filters=filters,
-        limit_page_length=5000,
+        volunteer_ids = team_volunteers(team)
+        if not volunteer_ids:
+            return []
+
+    return nearest(
+        lat,
+        lng,
+        radius_km=radius_km,
+        address_type=address_type,
+        sex=sex,
+        status=status,
+        volunteers=volunteer_ids,
+        limit=limit,
     )
 
-    if volunteer_ids:
-        rows = [r for r in rows if r.parent in volunteer_ids]
-
-    parent_names = list({r.parent for r in rows})
-    name_map, sex_map, img_map = {}, {}, {}
 
-    if parent_names:
-        volunteers = frappe.get_all(
-            "YRCS Volunteers",
-            filters={"name": ["in", parent_names]},
-            fields=["name", "sex", "volunteer_photo", "firstname", "middle_name", "last_name"],
-        )
-        for v in volunteers:
-            full_name = " ".join(filter(None, [v.firstname, v.middle_name, v.last_name])) or v.name
-            name_map[v.name] = full_name
-            sex_map[v.name] = v.sex
-            img_map[v.name] = v.volunteer_photo or "/files/default-avatar.png"
-
-    def haversine(lat1, lon1, lat2, lon2):
-        R = 6371
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(
-            math.radians(lat2)
-        ) * math.sin(dlon / 2) ** 2
-        return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-    out = []
-    for r in rows:
-        try:
-            d_km = haversine(lat, lng, float(r.latitude), float(r.longitude))
-            if d_km > radius_km:
-                continue
-            v_id = r.parent
-            v_sex = sex_map.get(v_id)
-            if sex and sex != v_sex:
-                continue
-            out.append(
-                {
-                    "volunteer_id": v_id,
-                    "volunteer": name_map.get(v_id, v_id),
-                    "sex": v_sex,
-                    "image": img_map.get(v_id),
-                    "address_type": r.add_type,
-                    "governorate": r.governorate,
-                    "district": r.district,
-                    "sub_district": r.sub_district,
-                    "village": r.village,
-                    "home_address": r.home_address,
-                    "latitude": float(r.latitude),
-                    "longitude": float(r.longitude),
-                    "distance_km": round(d_km, 2),
-                }
-            )
-        except Exception:
-            continue
-
-    return sorted(out, key=lambda x: x["distance_km"])[: int(limit)]
+@frappe.whitelist(allow_guest=True)
+def get_volunteer_clusters(zoom, bbox=None, last_days=None, governorate=None, gender=None, role=None):
+    """Volunteer clusters (count, sex and role breakdown) for a map viewport.
+
+    `bbox` is "west,south,east,north". Past the deepest cluster zoom the
+    individual volunteers inside the viewport are returned instead. The
+    other filters are those of the volunteers map page.
+    """
+    from red_crescent.volunteer_clusters import clusters
+
+    return clusters(
+        zoom,
+        bbox,
+        governorate=governorate,
+        sex=gender,
+        role=role,
+        modified_since=add_days(nowdate(), -cint(last_days)) if cint(last_days) else None,
+    )
 
 
 # ------------------------------- IDPs ------------------------------- #
 
 @frappe.whitelist(allow_guest=True)
+@conditional_response("IDPs Sites")
 def get_idps_sites_geojson():
     rows = frappe.get_all(
         "IDPs Sites",
@@ -574,7 +513,11 @@ def get_idps_sites_geojson():
 
 # ------------------------------- Fleet / Warehouses / Assets ------------------------------- #
 
+from red_crescent.map_search import matching_names
+
+
 @frappe.whitelist(allow_guest=True)
+@conditional_response("YRCS Fleet Vehicle")
 def get_vehicles_geojson(branch=None, status=None, q=None):
     filters = {"latitude": ["is", "set"], "longitude": ["is", "set"]}
     if branch:
@@ -582,7 +525,7 @@ def get_vehicles_geojson(branch=None, status=None, q=None):
     if status:
         filters["status"] = status
     if q:
-        filters["name"] = ["like", f"%{q}%"]
+        filters["name"] = ["in", matching_names("YRCS Fleet Vehicle", q) or [""]]
 
     rows = frappe.get_all(
         "YRCS Fleet Vehicle",
@@ -609,6 +552,7 @@ def get_vehicles_geojson(branch=None, status=None, q=None):
 
 
 @frappe.whitelist(allow_guest=True)
+@conditional_response("Warehouse")
 def get_warehouses_geojson(branch=None, warehouse_type=None, q=None):
     filters = {"latitude": ["is", "set"], "longitude": ["is", "set"]}
     if branch:
@@ -616,7 +560,7 @@ def get_warehouses_geojson(branch=None, warehouse_type=None, q=None):
     if warehouse_type:
         filters["warehouse_type"] = warehouse_type
     if q:
-        filters["name"] = ["like", f"%{q}%"]
+        filters["name"] = ["in", matching_names("Warehouse", q) or [""]]
 
     rows = frappe.get_all(
         "Warehouse",
@@ -642,6 +586,7 @@ def get_warehouses_geojson(branch=None, warehouse_type=None, q=None):
 
 
 @frappe.whitelist(allow_guest=True)
+@conditional_response("Asset")
 def get_assets_geojson(branch=None, asset_category=None, q=None):
     filters = {"latitude": ["is", "set"], "longitude": ["is", "set"]}
     if branch:
@@ -649,7 +594,7 @@ def get_assets_geojson(branch=None, asset_category=None, q=None):
     if asset_category:
         filters["asset_category"] = asset_category
     if q:
-        filters["name"] = ["like", f"%{q}%"]
+        filters["name"] = ["in", matching_names("Asset", q) or [""]]
 
     rows = frappe.get_all(
         "Asset",
@@ -749,107 +694,67 @@ def flip_coordinates(geometry):
 import json
 
 @frappe.whitelist(allow_guest=True)
-def get_geojson_with_severity(sector=None, governorate=None, district=None):
+def get_geojson_with_severity(sector=None, governorate=None, district=None, zoom=None, resolution=None):
     import json
 
+    from red_crescent.admin_hierarchy import get_place, get_sector, resolve_name
+
     parent_filters = {}
 
-    # Governorate filter
+    # Governorate / district filters accept a name, pcode, Arabic or English name
     if governorate:
-        gov_name = frappe.db.get_value("Governorate", {"ar_name": governorate}, "name") or governorate
-        parent_filters["governorate"] = gov_name
-
-    # District filter
+        parent_filters["governorate"] = resolve_name("governorate", governorate)
     if district:
-        dist_name = frappe.db.get_value("Districts", {"ar_name": district}, "name")
-        if not dist_name:
-            dist_name = frappe.db.get_value("Districts", {"eng_name": district}, "name")
-        parent_filters["district"] = dist_name or district
+        parent_filters["district"] = resolve_name("district", district, parent_filters.get("governorate"))
 
     records = frappe.get_all(
         "District Sectoral Needs",
         filters=parent_filters,
-        fields=["name", "district", "location_geojson", "governorate", "dis_pcode"],
+        fields=["name", "district", "location_geojson", "governorate", "dis_pcode", "modified"],
         limit_page_length=1000
     )
 
-    # Preload lookups
-    district_names = {
-        d.name: {"ar": d.ar_name, "en": d.eng_name}
-        for d in frappe.get_all("Districts", fields=["name", "ar_name", "eng_name"])
-    }
-    governorate_names = {
-        g.name: g.ar_name
-        for g in frappe.get_all("Governorate", fields=["name", "ar_name"])
-    }
-    sector_names = {
-        s.name: s.ar_sector
-        for s in frappe.get_all("Sectors", fields=["name", "ar_sector"])
-    }
+    rollups = get_rollups()
+
+    shapes = get_simplified(
+        "District Sectoral Needs",
+        [(rec.name, rec.modified, rec.location_geojson) for rec in records if rec.location_geojson],
+        resolution_for(zoom, resolution),
+    )
 
     features = []
 
     for rec in records:
-        if not rec.location_geojson:
-            continue
-
         try:
-            geojson_data = json.loads(rec.location_geojson)
-            geometry = geojson_data.get("geometry") if "geometry" in geojson_data else geojson_data
+            geometry = shapes.get(rec.name)
             if not geometry:
                 continue
 
-            severity_filters = {"parent": rec.name}
+            rollup = rollups.get(rec.name) or summarize([])
             if sector:
-                severity_filters["sector"] = sector
-
-            sector_rows = frappe.get_all(
-                "Sector Severity",
-                filters=severity_filters,
-                fields=[
-                    "sector", "severity", "total_pin",
-                    "boys_0_17", "girls_0_17", "men_18_plus", "women_18_plus"
-                ]
-            )
-
-            if sector and not sector_rows:
-                continue
-
-            max_severity = 0
-            total_pin_sum = 0
-            sector_severities = []
-
-            for row in sector_rows:
-                severity_val = int(row.severity or 0)
-                if severity_val > max_severity:
-                    max_severity = severity_val
-
-                total_pin_sum += int(row.total_pin or 0)
+                rollup = summarize([r for r in rollup["sectors"] if r["sector"] == sector])
+                if not rollup["sectors"]:
+                    continue
 
-                sector_ar = sector_names.get(row.sector, "")
-                sector_severities.append({
-                    "sector": row.sector,
-                    "sector_ar": sector_ar,
-                    "severity": row.severity,
-                    "total_pin": row.total_pin or 0,
-                    "boys_0_17": row.boys_0_17 or 0,
-                    "girls_0_17": row.girls_0_17 or 0,
-                    "men_18_plus": row.men_18_plus or 0,
-                    "women_18_plus": row.women_18_plus or 0,
-                })
+            max_severity = rollup["max_severity"]
+            total_pin_sum = rollup["total_pin_sum"]
+            sector_severities = [
+                {**row, "sector_ar": (get_sector(row["sector"]) or {}).get("ar_sector") or ""}
+                for row in rollup["sectors"]
+            ]
 
-            district_data = district_names.get(rec.district, {})
-            governorate_ar = governorate_names.get(rec.governorate, "")
+            district_place = get_place("district", rec.district)
+            governorate_place = get_place("governorate", rec.governorate)
 
             features.append({
                 "type": "Feature",
                 "geometry": geometry,
                 "properties": {
                     "district": rec.district,
-                    "district_ar": district_data.get("ar", rec.district),
-                    "district_en": district_data.get("en", rec.district),
+                    "district_ar": district_place.name_ar if district_place else rec.district,
+                    "district_en": district_place.name_en if district_place else rec.district,
                     "governorate": rec.governorate,
-                    "governorate_ar": governorate_ar,
+                    "governorate_ar": (governorate_place.name_ar or "") if governorate_place else "",
                     "sector_severities": sector_severities,  # ✅ stays as JSON
                     "dis_pcode": rec.dis_pcode,
                     "max_severity": max_severity,
@@ -891,26 +796,25 @@ import frappe
 import json
 
 @frappe.whitelist(allow_guest=True)
-def get_districts_geojson():
-    districts = frappe.get_all("Districts", fields=["name", "location_geojson"])
-    features = []
-
-    for d in districts:
-        if not d.location_geojson:
-            continue
-
-        try:
-            geometry = json.loads(d.location_geojson)
-        except Exception:
-            continue  # skip invalid GeoJSON
+def get_districts_geojson(zoom=None, resolution=None):
+    districts = get_districts()
+    shapes = get_simplified(
+        "Districts",
+        [(d.name, d.modified, d.geometry) for d in districts.values() if d.geometry],
+        resolution_for(zoom, resolution),
+    )
 
-        features.append({
+    features = [
+        {
             "type": "Feature",
             "geometry": geometry,
             "properties": {
-                "name": d.name
+                "name": name
             }
-        })
+        }
+        for name, geometry in shapes.items()
+        if geometry
+    ]
 
     return {
         "type": "FeatureCollection",
@@ -0,0 +1,272 @@
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, flt, getdate, now_datetime, nowdate
+
+# Cross-programme assistance history. Every beneficiary line of the source
+# doctypes below is copied into one Beneficiary Assistance row (beneficiary,
+# date, modality, item / amount, programme activity, donor), rebuilt per
+# source document on save and removed on delete. Beneficiary keeps the
+# latest date as `last_assistance_date`, so "assisted in the last N days" is
+# a primary key read; filtered and bulk checks use the (beneficiary,
+# assistance_date) index.
+
+DOCTYPE = "Beneficiary Assistance"
+BENEFICIARY = "Beneficiary"
+
+# Days looked back by the data-entry warning unless the site config sets
+# `assistance_window_days`
+DEFAULT_WINDOW_DAYS = 30
+
+# source doctype: how to read its assistance lines. `table` is None for
+# documents about a single beneficiary; with `head` the document's own
+# beneficiary is indexed as well as the table's. `include` lists the statuses
+# at which the assistance has been delivered; other statuses are not indexed.
+# Values starting with "=" are constants.
+SOURCES = {
+    "Relief Distribution": {
+        "table": "lines", "date": "distribution_date", "modality": "modality",
+        "item": "item_name", "qty": "qty", "amount": "total_cost",
+    },
+    "Intervention": {
+        "table": "distributions", "date": "start_date", "modality": "=In-kind",
+        "item": "item_name", "qty": "qty", "amount": "total_cost",
+        "status": "status", "include": ("Ongoing", "Completed"),
+    },
+    "Cash Transfer Request": {
+        "table": None, "date": "request_date", "modality": "transfer_method",
+        "item": "=Cash Transfer", "qty": None, "amount": "amount",
+        "status": "status", "include": ("Approved", "Disbursed"),
+    },
+    "Emergency Relief Distribution": {
+        "table": "lines", "date": "distribution_date", "modality": "modality",
+        "item": "item_description", "qty": "qty", "amount": "line_value",
+        "status": "status", "include": ("Ongoing", "Completed"),
+    },
+    "Emergency Shelter Assignment": {
+        "table": "occupants", "head": True, "date": "check_in", "modality": "=Shelter",
+        "item": "shelter_type", "qty": None, "amount": None,
+        "status": "assignment_status", "include": ("Active", "Completed"),
+    },
+}
+
+FIELDS = (
+    "beneficiary", "assistance_date", "modality", "item", "qty", "amount",
+    "programme_activity", "donor", "source_doctype", "source_name", "source_row",
+)
+
+
+# ------------------------------- Index maintenance ------------------------------- #
+
+def _read(spec, key, *docs):
+    field = spec.get(key)
+    if not field:
+        return None
+    if field.startswith("="):
+        return field[1:]
+    for d in docs:
+        if d.get(field) is not None:
+            return d.get(field)
+    return None
+
+
+def assistance_rows(doc):
+    """Index rows for one source document."""
+    spec = SOURCES[doc.doctype]
+    if spec.get("status") and doc.get(spec["status"]) not in spec["include"]:
+        return []
+
+    lines = (doc.get(spec["table"]) or []) if spec["table"] else []
+    if not spec["table"] or spec.get("head"):
+        # The head beneficiary is often listed among the occupants too
+        lines = [doc, *(line for line in lines if line.get("beneficiary") != doc.get("beneficiary"))]
+    rows = []
+    for line in lines:
+        if not line.get("beneficiary"):
+            continue
+        # Line fields win over header fields of the same name
+        rows.append(
+            {
+                "beneficiary": line.get("beneficiary"),
+                "assistance_date": _read(spec, "date", doc) or getdate(doc.get("creation") or nowdate()),
+                "modality": _read(spec, "modality", line, doc),
+                "item": _read(spec, "item", line, doc),
+                "qty": flt(_read(spec, "qty", line)),
+                "amount": flt(_read(spec, "amount", line)),
+                "programme_activity": doc.get("programme_activity"),
+                "donor": doc.get("donor"),
+                "source_doctype": doc.doctype,
+                "source_name": doc.name,
+                "source_row": line.name if line is not doc else None,
+            }
+        )
+    return rows
+
+
+def _remove(source_doctype, source_name):
+    """Delete a source's rows; returns the beneficiaries they covered."""
+    filters = {"source_doctype": source_doctype, "source_name": source_name}
+    beneficiaries = set(frappe.get_all(DOCTYPE, filters=filters, pluck="beneficiary"))
+    if beneficiaries:
+        frappe.db.delete(DOCTYPE, filters)
+    return beneficiaries
+
+
+def _insert(rows):
+    if not rows:
+        return
+    now, user = now_datetime(), frappe.session.user
+    frappe.db.bulk_insert(
+        DOCTYPE,
+        fields=["name", "creation", "modified", "modified_by", "owner", "docstatus", *FIELDS],
+        values=[(frappe.generate_hash(length=12), now, now, user, user, 0, *(r[f] for f in FIELDS)) for r in rows],
+    )
+
+
+def refresh_last_assistance(beneficiaries):
+    """Recompute Beneficiary.last_assistance_date from the index."""
+    beneficiaries = [b for b in beneficiaries if b]
+    if not beneficiaries:
+        return
+    frappe.db.sql(
+        f"""
+        UPDATE `tab{BENEFICIARY}` b
+        LEFT JOIN (
+            SELECT beneficiary, MAX(assistance_date) AS last_date
+            FROM `tab{DOCTYPE}`
+            WHERE beneficiary IN %(names)s
+            GROUP BY beneficiary
+        ) a ON a.beneficiary = b.name
+        SET b.last_assistance_date = a.last_date
+        WHERE b.name IN %(names)s
+        """,
+        {"names": tuple(beneficiaries)},
+    )
+
+
+def sync_source(doc, method=None):
+    rows = assistance_rows(doc)
+    touched = _remove(doc.doctype, doc.name) | {r["beneficiary"] for r in rows}
+    _insert(rows)
+    refresh_last_assistance(touched)
+
+
+def remove_source(doc, method=None):
+    refresh_last_assistance(_remove(doc.doctype, doc.name))
+
+
+def rebuild():
+    """Rebuild the whole index from every source doctype."""
+    frappe.db.delete(DOCTYPE)
+    for doctype in SOURCES:
+        if not frappe.db.table_exists(doctype):
+            continue
+        for name in frappe.get_all(doctype, pluck="name"):
+            _insert(assistance_rows(frappe.get_doc(doctype, name)))
+    frappe.db.sql(
+        f"""
+        UPDATE `tab{BENEFICIARY}` b
+        LEFT JOIN (
+            SELECT beneficiary, MAX(assistance_date) AS last_date
+            FROM `tab{DOCTYPE}` GROUP BY beneficiary
+        ) a ON a.beneficiary = b.name
+        SET b.last_assistance_date = a.last_date
+        """
+    )
+
+
+# ------------------------------- Checks ------------------------------- #
+
+def _since(days):
+    return add_days(getdate(nowdate()), -cint(days))
+
+
+def last_assisted(beneficiaries, days, modality=None, programme_activity=None, exclude=None):
+    """{beneficiary: latest assistance date within `days`} for many beneficiaries.
+
+    `exclude` is a (source doctype, source name) whose own rows are ignored.
+    """
+    beneficiaries = list({b for b in beneficiaries if b})
+    out = {}
+    conditions = ["beneficiary IN %(names)s", "assistance_date >= %(since)s"]
+    values = {"since": _since(days)}
+    if modality:
+        conditions.append("modality = %(modality)s")
+        values["modality"] = modality
+    if programme_activity:
+        conditions.append("programme_activity = %(programme_activity)s")
+        values["programme_activity"] = programme_activity
+    if exclude:
+        conditions.append("NOT (source_doctype = %(source_doctype)s AND source_name = %(source_name)s)")
+        values["source_doctype"], values["source_name"] = exclude
+
+    for i in range(0, len(beneficiaries), 1000):
+        values["names"] = tuple(beneficiaries[i:i + 1000])
+        for beneficiary, last_date in frappe.db.sql(
+            f"""
+            SELECT beneficiary, MAX(assistance_date) FROM `tab{DOCTYPE}`
+            WHERE {" AND ".join(conditions)}
+            GROUP BY beneficiary
+            """,
+            values,
+        ):
+            out[beneficiary] = last_date
+    return out
+
+
+@frappe.whitelist()
+def check_assistance(beneficiary, days=DEFAULT_WINDOW_DAYS, modality=None, programme_activity=None):
+    """Whether a beneficiary was assisted in the last `days`, with the recent history."""
+    frappe.has_permission(BENEFICIARY, "read", beneficiary, throw=True)
+    if modality or programme_activity:
+        last_date = last_assisted([beneficiary], days, modality, programme_activity).get(beneficiary)
+    else:
+        last_date = frappe.db.get_value(BENEFICIARY, beneficiary, "last_assistance_date")
+        if last_date and getdate(last_date) < _since(days):
+            last_date = None
+
+    history = []
+    if last_date:
+        history = frappe.get_all(
+            DOCTYPE,
+            filters={"beneficiary": beneficiary, "assistance_date": [">=", _since(days)]},
+            fields=["assistance_date", "modality", "item", "qty", "amount", "programme_activity", "donor", "source_doctype", "source_name"],
+            order_by="assistance_date desc",
+            limit_page_length=20,
+        )
+    return {"assisted": bool(last_date), "last_assistance_date": last_date, "history": history}
+
+
+@frappe.whitelist()
+def check_assistance_bulk(beneficiaries, days=DEFAULT_WINDOW_DAYS, modality=None, programme_activity=None):
+    """{beneficiary: last assistance date} for those assisted in the last `days`.
+
+    Beneficiaries the user cannot read are left out.
+    """
+    frappe.has_permission(BENEFICIARY, "read", throw=True)
+    if isinstance(beneficiaries, str):
+        beneficiaries = json.loads(beneficiaries)
+    names = list({b for b in beneficiaries if b})
+    readable = []
+    for i in range(0, len(names), 1000):
+        readable.extend(
+            frappe.get_list(BENEFICIARY, filters={"name": ["in", names[i:i + 1000]]}, pluck="name", limit_page_length=0)
+        )
+    return last_assisted(readable, days, modality, programme_activity)
+
+
+def warn_recent_assistance(doc, method=None):
+    """Validate hook: flag beneficiaries already assisted in the window."""
+    days = cint(frappe.conf.get("assistance_window_days")) or DEFAULT_WINDOW_DAYS
+    recent = last_assisted(
+        [r["beneficiary"] for r in assistance_rows(doc)], days, exclude=(doc.doctype, doc.name)
+    )
+    if recent:
+        frappe.msgprint(
+            _("Already assisted in the last {0} days: {1}").format(
+                days, ", ".join(f"{b} ({d})" for b, d in sorted(recent.items()))
+            ),
+            title=_("Possible Double Assistance"),
+            indicator="orange",
+        )
@@ -0,0 +1,277 @@
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+
+import frappe
+from frappe import _
+from frappe.utils import escape_html, now_datetime
+
+from red_crescent.map_search import normalize
+
+# Beneficiary deduplication. Each Beneficiary stores indexed blocking keys:
+# normalized phone, normalized national ID, and a name key (consonant
+# skeleton of the first and family names, Arabic-normalized) plus district.
+# Only records sharing a key are compared, with a fuzzy pairwise score, so
+# screening the whole table is linear in the number of records apart from
+# the (small) blocks. Candidate pairs are kept as Beneficiary Duplicate rows
+# for review; saving a Beneficiary checks its own blocks through the indexes.
+
+DOCTYPE = "Beneficiary"
+PAIRS = "Beneficiary Duplicate"
+
+KEY_FIELDS = ("dedup_phone", "dedup_national_id", "dedup_name_key")
+FIELDS = ("name", "full_name", "national_id", "phone_number", "date_of_birth", "gender", "district", *KEY_FIELDS)
+
+# Pairs scoring at least this are recorded
+THRESHOLD = 0.8
+# Blocks larger than this (shared switchboard numbers, placeholder IDs) are skipped
+MAX_BLOCK = 200
+BATCH_SIZE = 1000
+
+# National IDs shorter than this, or entered as placeholders, get no key
+MIN_ID_LENGTH = 4
+_PLACEHOLDER_IDS = {
+    "na", "nil", "none", "null", "unknown", "notavailable", "noid", "missing", "pending",
+    "لايوجد", "غيرمتوفر", "غيرمعروف",
+}
+
+_NAME_PARTICLES = {"بن", "ابن", "بنت", "ال", "bin", "ibn", "bint", "al", "el"}
+# Arabic alef and heh are meant here, not the Latin look-alikes RUF001 suggests
+_VOWELS = re.compile("[اويهaeiouyhw]")  # noqa: RUF001
+_REPEATS = re.compile(r"(.)\1+")
+_DIGITS = re.compile(r"\D+")
+
+
+# ------------------------------- Keys ------------------------------- #
+
+def normalize_phone(phone):
+    """Last nine digits of a Yemeni number, ignoring +967 / 00967 / 0 prefixes."""
+    digits = _DIGITS.sub("", normalize(phone))
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("967"):
+        digits = digits[3:]
+    digits = digits.lstrip("0")
+    return digits[-9:] if len(digits) >= 7 else None
+
+
+def normalize_national_id(national_id):
+    """Lower-cased ID with separators removed, or None for placeholders and short values.
+
+    Letters are kept: "A123456" and "B123456" are different IDs.
+    """
+    key = normalize(national_id).replace(" ", "")
+    if len(key) < MIN_ID_LENGTH or key in _PLACEHOLDER_IDS or len(set(key)) == 1:
+        return None
+    return key
+
+
+def _skeleton(word):
+    if word.startswith("ال") and len(word) > 3:
+        word = word[2:]
+    return _REPEATS.sub(r"\1", word[:1] + _VOWELS.sub("", word[1:]))
+
+
+def name_words(full_name):
+    return [w for w in normalize(full_name).split() if w not in _NAME_PARTICLES]
+
+
+def name_key(full_name, district):
+    """Skeleton of the first and family names plus district, or None."""
+    words = name_words(full_name)
+    if len(words) < 2:
+        return None
+    return f"{_skeleton(words[0])}|{_skeleton(words[-1])}|{district or ''}"[:140]
+
+
+def keys_for(r):
+    return {
+        "dedup_phone": normalize_phone(r.get("phone_number")),
+        "dedup_national_id": normalize_national_id(r.get("national_id")),
+        "dedup_name_key": name_key(r.get("full_name"), r.get("district")),
+    }
+
+
+# ------------------------------- Scoring ------------------------------- #
+
+def score(a, b):
+    """(score 0..1, reasons) for two beneficiary records with their keys."""
+    reasons = []
+    if a.get("dedup_national_id") and a.get("dedup_national_id") == b.get("dedup_national_id"):
+        return 1.0, ["national_id"]
+
+    name_a, name_b = " ".join(name_words(a.get("full_name"))), " ".join(name_words(b.get("full_name")))
+    name_score = SequenceMatcher(None, name_a, name_b).ratio() if name_a and name_b else 0
+    total = 0.55 * name_score
+    if name_score >= 0.85:
+        reasons.append("name")
+
+    if a.get("dedup_phone") and a.get("dedup_phone") == b.get("dedup_phone"):
+        total += 0.25
+        reasons.append("phone")
+    if a.get("date_of_birth") and a.get("date_of_birth") == b.get("date_of_birth"):
+        total += 0.15
+        reasons.append("date_of_birth")
+    if a.get("district") and a.get("district") == b.get("district"):
+        total += 0.05
+        reasons.append("district")
+    if a.get("gender") and b.get("gender") and a.get("gender") != b.get("gender"):
+        total -= 0.2
+    return max(min(total, 1.0), 0.0), reasons
+
+
+# ------------------------------- Pairs ------------------------------- #
+
+def _pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def _reviewed_pairs(name=None):
+    """Pairs already confirmed or dismissed, optionally only those involving `name`."""
+    condition = "AND (beneficiary = %(name)s OR duplicate_of = %(name)s)" if name else ""
+    return {
+        _pair(a, b)
+        for a, b in frappe.db.sql(
+            f"SELECT beneficiary, duplicate_of FROM `tab{PAIRS}` WHERE status != 'Open' {condition}",
+            {"name": name},
+        )
+    }
+
+
+def record_pairs(pairs):
+    """Insert Open Beneficiary Duplicate rows for {(a, b): (score, reasons)}."""
+    if not pairs:
+        return
+    now, user = now_datetime(), frappe.session.user
+    frappe.db.bulk_insert(
+        PAIRS,
+        fields=["name", "creation", "modified", "modified_by", "owner", "docstatus",
+                "beneficiary", "duplicate_of", "score", "status", "reasons"],
+        values=[
+            (frappe.generate_hash(length=12), now, now, user, user, 0, a, b, round(s * 100, 1), "Open", ", ".join(reasons))
+            for (a, b), (s, reasons) in pairs.items()
+        ],
+        chunk_size=BATCH_SIZE,
+    )
+
+
+def find_candidates(record, exclude=None):
+    """{other name: (score, reasons)} for records sharing a block with `record`."""
+    conditions, values = [], {"name": exclude or ""}
+    for field in KEY_FIELDS:
+        if record.get(field):
+            conditions.append(f"{field} = %({field})s")
+            values[field] = record.get(field)
+    if not conditions:
+        return {}
+
+    out = {}
+    for other in frappe.db.sql(
+        f"""
+        SELECT {", ".join(FIELDS)} FROM `tab{DOCTYPE}`
+        WHERE name != %(name)s AND ({" OR ".join(conditions)})
+        LIMIT {MAX_BLOCK}
+        """,
+        values,
+        as_dict=True,
+    ):
+        s, reasons = score(record, other)
+        if s >= THRESHOLD:
+            out[other.name] = (s, reasons)
+    return out
+
+
+# ------------------------------- Doc events ------------------------------- #
+
+def set_keys(doc, method=None):
+    """Set the blocking keys; matches are recorded by `check_duplicates`, never rejected."""
+    doc.update(keys_for(doc))
+
+
+def check_duplicates(doc, method=None):
+    """Record (and report) likely duplicates of a saved Beneficiary.
+
+    A shared national ID is recorded as a pair for review with a warning
+    rather than blocking the save: IDs are entered by hand and can be wrong.
+    """
+    candidates = find_candidates(doc.as_dict(), exclude=doc.name)
+    frappe.db.delete(PAIRS, {"status": "Open", "beneficiary": doc.name})
+    frappe.db.delete(PAIRS, {"status": "Open", "duplicate_of": doc.name})
+    if not candidates:
+        return
+    reviewed = _reviewed_pairs(doc.name)
+    pairs = {_pair(doc.name, other): c for other, c in candidates.items() if _pair(doc.name, other) not in reviewed}
+    record_pairs(pairs)
+    if not pairs:
+        return
+
+    same_id = sorted(other for other, (_s, reasons) in candidates.items() if "national_id" in reasons)
+    others = sorted(other for other in candidates if other not in same_id)
+    messages = []
+    if same_id:
+        messages.append(_("National ID {0} is already used by: {1}").format(escape_html(doc.national_id), ", ".join(same_id)))
+    if others:
+        messages.append(_("Possible duplicates: {0}").format(", ".join(others)))
+    frappe.msgprint(
+        "<br>".join(messages),
+        title=_("Possible Duplicate Beneficiary"),
+        indicator="orange",
+    )
+
+
+def remove_pairs(doc, method=None):
+    frappe.db.delete(PAIRS, {"beneficiary": doc.name})
+    frappe.db.delete(PAIRS, {"duplicate_of": doc.name})
+
+
+# ------------------------------- Batch ------------------------------- #
+
+def screen_all():
+    """Refresh every blocking key and rebuild the Open duplicate pairs."""
+    records = frappe.db.sql(f"SELECT {', '.join(FIELDS)} FROM `tab{DOCTYPE}`", as_dict=True)
+
+    updates = {}
+    for r in records:
+        keys = keys_for(r)
+        if any(keys[f] != r.get(f) for f in KEY_FIELDS):
+            updates[r.name] = keys
+            r.update(keys)
+    if updates:
+        frappe.db.bulk_update(DOCTYPE, updates, chunk_size=BATCH_SIZE, update_modified=False)
+
+    blocks = {}
+    for i, r in enumerate(records):
+        for field in KEY_FIELDS:
+            if r.get(field):
+                blocks.setdefault((field, r.get(field)), []).append(i)
+
+    reviewed = _reviewed_pairs()
+    pairs, skipped = {}, 0
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK:
+            skipped += 1
+            continue
+        for i, j in combinations(members, 2):
+            key = _pair(records[i].name, records[j].name)
+            if key in pairs or key in reviewed:
+                continue
+            s, reasons = score(records[i], records[j])
+            if s >= THRESHOLD:
+                pairs[key] = (s, reasons)
+
+    frappe.db.delete(PAIRS, {"status": "Open"})
+    record_pairs(pairs)
+    frappe.db.commit()
+    return {"records": len(records), "keys_updated": len(updates), "pairs": len(pairs), "skipped_blocks": skipped}
+
+
+@frappe.whitelist()
+def screen_beneficiaries():
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "red_crescent.beneficiary_dedup.screen_all",
+        queue="long",
+        timeout=3600,
+        job_id="beneficiary_dedup_screening",
+        deduplicate=True,
+    )
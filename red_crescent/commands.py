@@ -0,0 +1,70 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-volunteer-map-points")
+@pass_context
+def rebuild_volunteer_map_points(context):
+    """Rebuild the Volunteer Map Point projection from YRCS Volunteers"""
+    import frappe
+
+    from red_crescent.volunteer_map_points import rebuild
+
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        count = rebuild()
+        frappe.db.commit()
+    finally:
+        frappe.destroy()
+    click.echo(f"Rebuilt {count} volunteer map points")
+
+
+@click.command("import-idps-sites")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--mapping", help="JSON object of file column -> IDPs Sites field")
+@click.option("--dry-run", is_flag=True, default=False, help="Report changes without writing")
+@pass_context
+def import_idps_sites(context, path, mapping=None, dry_run=False):
+    """Import IDPs Sites from a Power BI site export (CSV / XLSX)"""
+    import frappe
+
+    from red_crescent.idps_site_import import import_sites
+
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        stats = import_sites(path, column_mapping=mapping, dry_run=dry_run)
+    finally:
+        frappe.destroy()
+    click.echo(
+        f"{'Would write' if dry_run else 'Wrote'}: {stats['inserted']} new, {stats['updated']} updated; "
+        f"{stats['unchanged']} unchanged, {stats['skipped']} skipped"
+    )
+    for warning in stats["warnings"][:50]:
+        click.echo(f"  {warning}")
+    if len(stats["warnings"]) > 50:
+        click.echo(f"  ... {len(stats['warnings']) - 50} more warnings")
+
+
+@click.command("screen-beneficiaries")
+@pass_context
+def screen_beneficiaries(context):
+    """Refresh Beneficiary dedup keys and rebuild the open duplicate pairs"""
+    import frappe
+
+    from red_crescent.beneficiary_dedup import screen_all
+
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        stats = screen_all()
+    finally:
+        frappe.destroy()
+    click.echo(
+        f"Screened {stats['records']} beneficiaries: {stats['pairs']} possible duplicate pairs, "
+        f"{stats['keys_updated']} keys updated, {stats['skipped_blocks']} oversized blocks skipped"
+    )
+
+
+commands = [rebuild_volunteer_map_points, import_idps_sites, screen_beneficiaries]
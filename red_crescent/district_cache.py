@@ -0,0 +1,122 @@
+import json
+
+import frappe
+from frappe.utils import cint
+
+# Process-wide cache of district reference data (parsed boundary, names and
+# population). Workers keep their own copy and compare a version stamp in Redis
+# on each read; any change to the source doctypes bumps the stamp.
+
+VERSION_KEY = "district_reference_cache_version"
+POPULATION_DOCTYPE = "Yemen Population by District - 2025"
+
+_sites = {}
+
+
+def parse_geometry(raw):
+    """Parse a stored GeoJSON string into a geometry dict (unwrapping Features)."""
+    if not raw:
+        return None
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except Exception:
+        return None
+    if isinstance(data, dict) and data.get("type") == "Feature":
+        data = data.get("geometry")
+    return data or None
+
+
+def geometry_bbox(geometry):
+    """(min_lng, min_lat, max_lng, max_lat) of a GeoJSON geometry."""
+    xs, ys = [], []
+
+    def walk(c):
+        if c and isinstance(c[0], int | float):
+            xs.append(c[0])
+            ys.append(c[1])
+        else:
+            for part in c:
+                walk(part)
+
+    walk((geometry or {}).get("coordinates") or [])
+    return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+
+def _current_version():
+    version = frappe.cache().get_value(VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=12)
+        frappe.cache().set_value(VERSION_KEY, version)
+    return version
+
+
+def _load_population():
+    """{district: population_total}, as get_district_risks always read it.
+
+    The population table may hold several rows for a district (the last one
+    read wins) and districts that are not in Districts; both are kept as is.
+    """
+    return {
+        row["district"]: cint(row["population_total"])
+        for row in frappe.get_all(POPULATION_DOCTYPE, fields=["district", "population_total"])
+    }
+
+
+def _load(population):
+    rows = frappe.db.sql(
+        """
+        SELECT name, governorate, dis_pcode, eng_name, ar_name, location_geojson, modified
+        FROM `tabDistricts`
+        """,
+        as_dict=True,
+    )
+    out = {}
+    for r in rows:
+        geometry = parse_geometry(r.location_geojson)
+        out[r.name] = frappe._dict(
+            name=r.name,
+            governorate=r.governorate,
+            dis_pcode=r.dis_pcode,
+            eng_name=r.eng_name,
+            ar_name=r.ar_name,
+            modified=r.modified,
+            geometry=geometry,
+            bbox=geometry_bbox(geometry),
+            population_total=population.get(r.name, 0),
+        )
+    return out
+
+
+def _state():
+    version = _current_version()
+    state = _sites.get(frappe.local.site)
+    if not state or state["version"] != version:
+        population = _load_population()
+        state = _sites[frappe.local.site] = {
+            "version": version,
+            "population": population,
+            "districts": _load(population),
+        }
+    return state
+
+
+def get_districts():
+    """Return {district name: reference record} for every district."""
+    return _state()["districts"]
+
+
+def get_population():
+    """Return {district: population_total} for every row of the population table."""
+    return _state()["population"]
+
+
+def get_district(name, governorate=None):
+    ref = get_districts().get(name)
+    if ref and governorate and ref.governorate != governorate:
+        return None
+    return ref
+
+
+def invalidate(*args, **kwargs):
+    frappe.cache().delete_value(VERSION_KEY)
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(VERSION_KEY))
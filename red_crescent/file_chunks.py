@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+
+# Chunked reader for uploaded CSV / XLSX files, shared by the Sector Severity
+# upload and the IDPs Sites import. XLSX is streamed through openpyxl's
+# read-only mode and CSV through pandas' chunksize, so large files are never
+# held in memory as a whole.
+
+# Rows read from the file at a time
+CHUNK_ROWS = 5000
+
+
+def _xlsx_chunks(path, chunk_rows):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h).strip() if h is not None else f"_column_{i}" for i, h in enumerate(header)]
+        chunk = []
+        for row in rows:
+            if all(v is None or v == "" for v in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        wb.close()
+
+
+def _csv_chunks(path, chunk_rows):
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=str, skip_blank_lines=True):
+        chunk.columns = [str(c).strip() for c in chunk.columns]
+        yield chunk
+
+
+def iter_frames(path, column_map, chunk_rows=CHUNK_ROWS):
+    """Yield (first row number, DataFrame chunk) without loading the whole file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        chunks = _csv_chunks(path, chunk_rows)
+    elif ext in (".xlsx", ".xlsm"):
+        chunks = _xlsx_chunks(path, chunk_rows)
+    else:
+        # Legacy .xls has no streaming reader
+        df = pd.read_excel(path)
+        chunks = (df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows))
+
+    start = 1
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True).rename(columns=column_map)
+        yield start, chunk
+        start += len(chunk)
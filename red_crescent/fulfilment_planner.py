@@ -0,0 +1,218 @@
+import heapq
+
+import frappe
+import numpy as np
+from frappe import _
+from frappe.utils import cint, flt, getdate, nowdate
+
+from red_crescent.district_cache import get_districts
+from red_crescent.relief_stock import BALANCE, PRECISION
+from red_crescent.volunteer_geo_index import haversine_km
+
+# Batch planner matching open Resource Requests to warehouse stock. Requested
+# Item lines are popped from a heap ordered by request priority, `needed_by`
+# and age; each line is served from the nearest warehouses (great-circle
+# distance from Warehouse latitude / longitude to the request's district, or
+# its governorate) that still hold unreserved, unexpired stock. The plan is
+# written as one draft Relief Dispatch per (request, warehouse), whose FEFO
+# allocation then reserves the batches.
+
+REQUEST = "Resource Request"
+DISPATCH = "Relief Dispatch"
+OPEN_STATUSES = ("Submitted", "Approved")
+PRIORITY_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+NO_DATE = "9999-12-31"
+
+
+# ------------------------------- Inputs ------------------------------- #
+
+def _centres():
+    """{district: (lat, lng)} and {governorate: (lat, lng)} from district boxes."""
+    districts, governorates = {}, {}
+    for ref in get_districts().values():
+        if not ref.bbox:
+            continue
+        centre = ((ref.bbox[1] + ref.bbox[3]) / 2, (ref.bbox[0] + ref.bbox[2]) / 2)
+        districts[ref.name] = centre
+        governorates.setdefault(ref.governorate, []).append(centre)
+    return districts, {g: tuple(np.mean(c, axis=0)) for g, c in governorates.items()}
+
+
+def _open_lines():
+    """Requested Item lines of open requests, less what earlier dispatches cover."""
+    rows = frappe.db.sql(
+        f"""
+        SELECT r.name AS request, r.priority, r.needed_by_date, r.creation,
+            r.governorate, r.district, i.item_code, i.qty, i.needed_by,
+            i.item_description
+        FROM `tab{REQUEST}` r
+        JOIN `tabRequested Item` i ON i.parent = r.name AND i.parenttype = %(doctype)s
+        WHERE r.status IN %(statuses)s AND i.item_code IS NOT NULL AND i.qty > 0
+        ORDER BY r.name, i.idx
+        """,
+        {"doctype": REQUEST, "statuses": OPEN_STATUSES},
+        as_dict=True,
+    )
+    if not rows:
+        return []
+
+    covered = {}
+    for r in frappe.db.sql(
+        f"""
+        SELECT d.resource_request, i.item_code, SUM(i.quantity_dispatched) AS qty
+        FROM `tab{DISPATCH}` d
+        JOIN `tabRelief Dispatch Item` i ON i.parent = d.name AND i.parenttype = %s
+        WHERE d.resource_request IN %s
+        GROUP BY d.resource_request, i.item_code
+        """,
+        (DISPATCH, tuple({r.request for r in rows})),
+        as_dict=True,
+    ):
+        covered[(r.resource_request, r.item_code)] = flt(r.qty)
+
+    lines = []
+    for r in rows:
+        key = (r.request, r.item_code)
+        used = min(covered.get(key, 0), flt(r.qty))
+        covered[key] = covered.get(key, 0) - used
+        if flt(r.qty) - used > 0:
+            r.need = flt(r.qty) - used
+            lines.append(r)
+    return lines
+
+
+def _supply(item_codes, on_date):
+    """{item: {warehouse: unreserved, unexpired qty}}."""
+    supply = {}
+    for r in frappe.db.sql(
+        f"""
+        SELECT warehouse, item_code, SUM(qty - IFNULL(reserved_qty, 0)) AS available
+        FROM `tab{BALANCE}`
+        WHERE item_code IN %s AND (expiry_date IS NULL OR expiry_date >= %s)
+        GROUP BY warehouse, item_code
+        HAVING available > 0
+        """,
+        (tuple(item_codes), on_date),
+        as_dict=True,
+    ):
+        supply.setdefault(r.item_code, {})[r.warehouse] = flt(r.available)
+    return supply
+
+
+# ------------------------------- Solver ------------------------------- #
+
+def plan(on_date=None):
+    """Return {"dispatches": [...], "unmet": [...]} for every open request line."""
+    on_date = str(getdate(on_date or nowdate()))
+    lines = _open_lines()
+    if not lines:
+        return {"dispatches": [], "unmet": []}
+
+    supply = _supply({line.item_code for line in lines}, on_date)
+    warehouses = frappe.get_all(
+        "Warehouse",
+        filters={"name": ["in", list({w for s in supply.values() for w in s}) or [""]]},
+        fields=["name", "latitude", "longitude"],
+    )
+    names = [w.name for w in warehouses]
+    lats = np.array([flt(w.latitude) if w.latitude else np.nan for w in warehouses], dtype=float)
+    lngs = np.array([flt(w.longitude) if w.longitude else np.nan for w in warehouses], dtype=float)
+    district_centres, governorate_centres = _centres()
+
+    ranked = {}
+
+    def nearest(line):
+        """Warehouses ordered by distance from the request (unlocated ones last)."""
+        if line.request not in ranked:
+            centre = district_centres.get(line.district) or governorate_centres.get(line.governorate)
+            if centre and names:
+                dist = np.nan_to_num(haversine_km(centre[0], centre[1], lats, lngs), nan=np.inf)
+            else:
+                dist = np.full(len(names), np.inf)
+            ranked[line.request] = [(names[i], float(dist[i])) for i in np.argsort(dist, kind="stable")]
+        return ranked[line.request]
+
+    heap = [
+        (
+            PRIORITY_RANK.get(line.priority, len(PRIORITY_RANK)),
+            str(line.needed_by or line.needed_by_date or NO_DATE),
+            str(line.creation),
+            i,
+        )
+        for i, line in enumerate(lines)
+    ]
+    heapq.heapify(heap)
+
+    dispatches, unmet = {}, []
+    while heap:
+        line = lines[heapq.heappop(heap)[-1]]
+        stock, need = supply.get(line.item_code, {}), line.need
+        for warehouse, distance in nearest(line):
+            if need <= 0:
+                break
+            take = round(min(need, stock.get(warehouse, 0)), PRECISION)
+            if take <= 0:
+                continue
+            stock[warehouse] -= take
+            need -= take
+            d = dispatches.setdefault(
+                (line.request, warehouse),
+                {
+                    "resource_request": line.request,
+                    "from_warehouse": warehouse,
+                    "distance_km": None if distance == np.inf else round(distance, 1),
+                    "priority": line.priority,
+                    "governorate": line.governorate,
+                    "district": line.district,
+                    "items": [],
+                },
+            )
+            d["items"].append(
+                {"item_code": line.item_code, "qty": take, "description": line.item_description}
+            )
+        if need > 0:
+            unmet.append({"resource_request": line.request, "item_code": line.item_code, "qty": round(need, PRECISION)})
+
+    return {"dispatches": list(dispatches.values()), "unmet": unmet}
+
+
+# ------------------------------- Output ------------------------------- #
+
+def create_dispatches(planned, on_date=None):
+    """Insert one draft Relief Dispatch per planned (request, warehouse)."""
+    created = []
+    for p in planned:
+        doc = frappe.get_doc(
+            {
+                "doctype": DISPATCH,
+                "status": "Draft",
+                "dispatch_title": _("{0} from {1}").format(p["resource_request"], p["from_warehouse"]),
+                "resource_request": p["resource_request"],
+                "from_warehouse": p["from_warehouse"],
+                "dispatch_date": on_date or nowdate(),
+                "governorate": p["governorate"],
+                "district": p["district"],
+                "dispatch_items": [
+                    {
+                        "item_code": i["item_code"],
+                        "quantity_dispatched": i["qty"],
+                        "description": i["description"],
+                    }
+                    for i in p["items"]
+                ],
+            }
+        )
+        doc.insert()
+        created.append(doc.name)
+    return created
+
+
+@frappe.whitelist()
+def plan_fulfilment(create=0, on_date=None):
+    """Plan every open Resource Request; with `create`, save the draft dispatches."""
+    frappe.only_for("System Manager")
+    result = plan(on_date)
+    if cint(create):
+        result["created"] = create_dispatches(result["dispatches"], on_date)
+        frappe.db.commit()
+    return result
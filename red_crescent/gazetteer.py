@@ -0,0 +1,272 @@
+import json
+import math
+
+import frappe
+import numpy as np
+import requests
+from frappe.utils import cint, flt
+
+from red_crescent.district_cache import get_districts
+from red_crescent.volunteer_geo_index import haversine_km
+
+# Offline reverse geocoder over the administrative gazetteer: nearest village
+# from a grid over `Villages` coordinates, containing district by
+# point-in-polygon over `Districts.location_geojson`, and the sub-district /
+# governorate hierarchy. Nominatim is only an optional, persistently cached
+# enrichment.
+
+VERSION_KEY = "gazetteer_version"
+CELL_DEG = 0.1
+KM_PER_DEG = 111.32
+MAX_VILLAGE_KM = 25
+
+CACHE_DOCTYPE = "Reverse Geocode Cache"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+
+_sites = {}
+
+
+# ------------------------------- Index ------------------------------- #
+
+def _to_float(value):
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+def _cell(lat, lng):
+    return math.floor(lat / CELL_DEG), math.floor(lng / CELL_DEG)
+
+
+def _load():
+    villages, lats, lngs, grid = [], [], [], {}
+    for v in frappe.get_all(
+        "Villages",
+        fields=["name", "villagepcode", "villagenameen", "villagenamear", "district", "sub_district", "latitude", "longitude"],
+        filters={"latitude": ["is", "set"], "longitude": ["is", "set"]},
+    ):
+        lat, lng = _to_float(v.latitude), _to_float(v.longitude)
+        if lat is None or lng is None:
+            continue
+        grid.setdefault(_cell(lat, lng), []).append(len(villages))
+        villages.append(v)
+        lats.append(lat)
+        lngs.append(lng)
+
+    return {
+        "villages": villages,
+        "lat": np.array(lats, dtype=float),
+        "lng": np.array(lngs, dtype=float),
+        "grid": {k: np.array(v, dtype=np.int64) for k, v in grid.items()},
+        "sub_districts": {
+            s.name: s
+            for s in frappe.get_all(
+                "Sub-Districts", fields=["name", "sub_district", "arabic_name", "sub_district_pcode", "district"]
+            )
+        },
+        "governorates": {
+            g.name: g for g in frappe.get_all("Governorate", fields=["name", "gov_pcode", "eng_name", "ar_name"])
+        },
+    }
+
+
+def get_index():
+    version = frappe.cache().get_value(VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=12)
+        frappe.cache().set_value(VERSION_KEY, version)
+
+    state = _sites.get(frappe.local.site)
+    if not state or state["version"] != version:
+        state = _sites[frappe.local.site] = {"version": version, **_load()}
+    return state
+
+
+def invalidate(*args, **kwargs):
+    frappe.cache().delete_value(VERSION_KEY)
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(VERSION_KEY))
+
+
+# ------------------------------- Lookups ------------------------------- #
+
+def nearest_village(lat, lng, max_km=MAX_VILLAGE_KM):
+    """(village row, distance in km) of the closest village, or (None, None)."""
+    index = get_index()
+    ci, cj = _cell(lat, lng)
+    cell_km = CELL_DEG * KM_PER_DEG * max(math.cos(math.radians(lat)), 0.01)
+    max_ring = math.ceil(max_km / cell_km) + 1
+
+    best, best_km = None, None
+    for ring in range(max_ring + 1):
+        # Everything outside the searched square is at least this far away.
+        if best is not None and best_km <= (ring - 1) * cell_km:
+            break
+        cells = [
+            (ci + di, cj + dj)
+            for di in range(-ring, ring + 1)
+            for dj in range(-ring, ring + 1)
+            if max(abs(di), abs(dj)) == ring
+        ]
+        chunks = [index["grid"][c] for c in cells if c in index["grid"]]
+        if not chunks:
+            continue
+        idx = np.concatenate(chunks)
+        dist = haversine_km(lat, lng, index["lat"][idx], index["lng"][idx])
+        k = int(np.argmin(dist))
+        if best is None or dist[k] < best_km:
+            best, best_km = int(idx[k]), float(dist[k])
+
+    if best is None or best_km > max_km:
+        return None, None
+    return index["villages"][best], best_km
+
+
+def _in_ring(lat, lng, ring):
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_geometry(lat, lng, geometry):
+    if not geometry:
+        return False
+    if geometry.get("type") == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry.get("type") == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return False
+    for rings in polygons:
+        if rings and _in_ring(lat, lng, rings[0]) and not any(_in_ring(lat, lng, h) for h in rings[1:]):
+            return True
+    return False
+
+
+def containing_district(lat, lng):
+    for ref in get_districts().values():
+        box = ref.bbox
+        if box and box[0] <= lng <= box[2] and box[1] <= lat <= box[3] and point_in_geometry(lat, lng, ref.geometry):
+            return ref
+    return None
+
+
+def _label(en, ar):
+    if (frappe.local.lang or "").startswith("ar"):
+        return ar or en
+    return en or ar
+
+
+def reverse(lat, lng):
+    """Resolve a point to village / sub-district / district / governorate."""
+    lat, lng = flt(lat), flt(lng)
+    index = get_index()
+    village, village_km = nearest_village(lat, lng)
+    district = containing_district(lat, lng)
+    if not district and village:
+        district = get_districts().get(village.district)
+
+    sub_district = None
+    if village and (not district or village.district == district.name):
+        sub_district = index["sub_districts"].get(village.sub_district)
+    governorate = index["governorates"].get(district.governorate) if district else None
+
+    out = {"latitude": lat, "longitude": lng, "village": None, "sub_district": None, "district": None, "governorate": None}
+    if village:
+        out["village"] = {
+            "name": village.name,
+            "pcode": village.villagepcode,
+            "name_en": village.villagenameen,
+            "name_ar": village.villagenamear,
+            "distance_km": round(village_km, 2),
+        }
+    if sub_district:
+        out["sub_district"] = {
+            "name": sub_district.name,
+            "pcode": sub_district.sub_district_pcode,
+            "name_en": sub_district.sub_district,
+            "name_ar": sub_district.arabic_name,
+        }
+    if district:
+        out["district"] = {
+            "name": district.name,
+            "pcode": district.dis_pcode,
+            "name_en": district.eng_name,
+            "name_ar": district.ar_name,
+        }
+    if governorate:
+        out["governorate"] = {
+            "name": governorate.name,
+            "pcode": governorate.gov_pcode,
+            "name_en": governorate.eng_name,
+            "name_ar": governorate.ar_name,
+        }
+
+    out["display_name"] = ", ".join(
+        filter(None, [_label(p["name_en"], p["name_ar"]) for p in (out[k] for k in ("village", "sub_district", "district", "governorate")) if p])
+    )
+    return out
+
+
+# ------------------------------- Nominatim enrichment ------------------------------- #
+
+def _coord_key(lat, lng):
+    return f"{flt(lat):.4f},{flt(lng):.4f}"
+
+
+def nominatim(lat, lng):
+    """Nominatim display name, served from Reverse Geocode Cache when known."""
+    key = _coord_key(lat, lng)
+    cached = frappe.db.get_value(CACHE_DOCTYPE, key, "display_name")
+    if cached is not None:
+        return cached
+
+    try:
+        r = requests.get(
+            NOMINATIM_URL,
+            params={"format": "jsonv2", "lat": lat, "lon": lng, "addressdetails": 1},
+            headers={"User-Agent": "Frappe-ERPNext-Volunteer-Map/1.0"},
+            timeout=5,
+        )
+        r.raise_for_status()
+        j = r.json()
+    except Exception:
+        return None
+
+    display = j.get("display_name")
+    if not display:
+        a = j.get("address", {}) or {}
+        parts = [
+            a.get("road"),
+            a.get("suburb"),
+            a.get("city") or a.get("town") or a.get("village"),
+            a.get("state"),
+            a.get("postcode"),
+            a.get("country"),
+        ]
+        display = ", ".join([p for p in parts if p])
+
+    frappe.get_doc({
+        "doctype": CACHE_DOCTYPE,
+        "coord_key": key,
+        "latitude": flt(lat),
+        "longitude": flt(lng),
+        "display_name": display,
+        "response": json.dumps(j, ensure_ascii=False),
+    }).insert(ignore_permissions=True, ignore_if_duplicate=True)
+    return display
+
+
+def reverse_geocode(lat, lng, enrich=False):
+    """Gazetteer result, optionally enriched with a (cached) Nominatim name."""
+    out = reverse(lat, lng)
+    if cint(enrich) or cint(frappe.conf.get("reverse_geocode_nominatim")):
+        out["nominatim"] = nominatim(lat, lng)
+    return out
@@ -0,0 +1,271 @@
+import json
+
+import frappe
+from frappe.utils import cint
+
+from red_crescent.district_cache import parse_geometry
+
+# Douglas-Peucker simplification of boundary polygons at a few fixed
+# resolutions. A whole layer (every boundary of a doctype) is simplified at
+# once: vertices where rings of different boundaries meet or part are
+# junctions, and each arc between junctions is simplified in one canonical
+# direction, so a border shared by two districts comes out identical on both
+# sides with no gaps or slivers. Layers are kept in Redis, one hash per
+# doctype and resolution, tagged with the row count and latest `modified` of
+# the source doctype; a different signature rebuilds the layer on next read.
+
+# resolution -> (tolerance in degrees, coordinate decimals)
+RESOLUTIONS = {
+    "low": (0.02, 3),
+    "medium": (0.005, 4),
+    "high": (0.001, 5),
+}
+FULL = "full"
+
+CACHE_PREFIX = "simplified_geometry"
+SIGNATURE_FIELD = "__signature__"
+
+# doctype -> field holding its GeoJSON boundary
+SOURCES = {
+    "Districts": "location_geojson",
+    "District Sectoral Needs": "location_geojson",
+}
+
+
+def resolution_for(zoom=None, resolution=None):
+    """Map a `resolution` name or a map `zoom` level to a resolution key."""
+    if resolution:
+        return resolution if resolution in RESOLUTIONS else FULL
+    if zoom in (None, ""):
+        return FULL
+    zoom = cint(zoom)
+    if zoom <= 6:
+        return "low"
+    if zoom <= 8:
+        return "medium"
+    if zoom <= 11:
+        return "high"
+    return FULL
+
+
+# ------------------------------- Simplification ------------------------------- #
+
+def _sq_seg_dist(p, a, b):
+    x, y = a
+    dx, dy = b[0] - x, b[1] - y
+    if dx or dy:
+        t = ((p[0] - x) * dx + (p[1] - y) * dy) / (dx * dx + dy * dy)
+        if t > 1:
+            x, y = b
+        elif t > 0:
+            x += dx * t
+            y += dy * t
+    dx, dy = p[0] - x, p[1] - y
+    return dx * dx + dy * dy
+
+
+def simplify_line(points, tolerance):
+    """Iterative Douglas-Peucker over a list of [x, y] points."""
+    if len(points) <= 2:
+        return list(points)
+    sq_tol = tolerance * tolerance
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_sq, index = 0, None
+        for i in range(first + 1, last):
+            d = _sq_seg_dist(points[i], points[first], points[last])
+            if d > max_sq:
+                max_sq, index = d, i
+        if index is not None and max_sq > sq_tol:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep, strict=True) if k]
+
+
+def _rings(geometry):
+    """Every ring of a Polygon / MultiPolygon as open lists of (x, y)."""
+    gtype = (geometry or {}).get("type")
+    polygons = [geometry["coordinates"]] if gtype == "Polygon" else geometry["coordinates"] if gtype == "MultiPolygon" else []
+    out = []
+    for rings in polygons:
+        for ring in rings or []:
+            points = [(c[0], c[1]) for c in ring]
+            if len(points) > 1 and points[0] == points[-1]:
+                points.pop()
+            out.append(points)
+    return out
+
+
+def find_junctions(geometries):
+    """Vertices where boundaries meet or part, across a set of geometries.
+
+    A vertex is a junction when it is seen with different neighbours: inside
+    a shared border both rings have the same two neighbours, at its ends they
+    do not.
+    """
+    neighbours, junctions = {}, set()
+    for geometry in geometries:
+        for ring in _rings(geometry):
+            n = len(ring)
+            for i, p in enumerate(ring):
+                pair = frozenset((ring[i - 1], ring[(i + 1) % n]))
+                seen = neighbours.setdefault(p, pair)
+                if seen != pair:
+                    junctions.add(p)
+    return junctions
+
+
+def _simplify_arc(arc, tolerance):
+    # Shared arcs run in opposite directions in the two rings; simplify both
+    # in the same direction so they keep the same vertices.
+    if arc[-1] < arc[0]:
+        return simplify_line(arc[::-1], tolerance)[::-1]
+    return simplify_line(arc, tolerance)
+
+
+def _simplify_ring(ring, tolerance, precision, junctions=frozenset()):
+    points = [(c[0], c[1]) for c in ring]
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if len(points) < 3:
+        return None
+
+    anchors = {i for i, p in enumerate(points) if p in junctions}
+    if len(anchors) < 2:
+        # An unshared (or wholly shared) ring: anchor it at points both
+        # sides agree on whatever the ring's start and direction.
+        anchors |= {points.index(min(points)), points.index(max(points))}
+    anchors = sorted(anchors)
+
+    out = []
+    for a, b in zip(anchors, [*anchors[1:], anchors[0] + len(points)], strict=True):
+        arc = [points[i % len(points)] for i in range(a, b + 1)]
+        out.extend(_simplify_arc(arc, tolerance)[:-1])
+    out.append(out[0])
+
+    out = [[round(c[0], precision), round(c[1], precision)] for c in out]
+    return out if len(out) >= 4 else None
+
+
+def _simplify_polygon(rings, tolerance, precision, junctions=frozenset()):
+    if not rings:
+        return None
+    outer = _simplify_ring(rings[0], tolerance, precision, junctions)
+    if not outer:
+        return None
+    holes = [h for h in (_simplify_ring(r, tolerance, precision, junctions) for r in rings[1:]) if h]
+    return [outer, *holes]
+
+
+def simplify_geometry(geometry, tolerance, precision, junctions=frozenset()):
+    """Simplify Polygon/MultiPolygon geometries; other types pass through.
+
+    `junctions` (see find_junctions) are vertices that must be kept.
+    """
+    if not geometry or "coordinates" not in geometry:
+        return geometry
+    gtype = geometry.get("type")
+    if gtype == "Polygon":
+        coords = _simplify_polygon(geometry["coordinates"], tolerance, precision, junctions)
+        return {"type": "Polygon", "coordinates": coords} if coords else geometry
+    if gtype == "MultiPolygon":
+        parts = [
+            p
+            for p in (_simplify_polygon(poly, tolerance, precision, junctions) for poly in geometry["coordinates"])
+            if p
+        ]
+        return {"type": "MultiPolygon", "coordinates": parts} if parts else geometry
+    return geometry
+
+
+def simplify_layer(geometries, tolerance, precision):
+    """Simplify {name: geometry} together, keeping shared borders shared."""
+    junctions = find_junctions(geometries.values())
+    return {name: simplify_geometry(g, tolerance, precision, junctions) for name, g in geometries.items()}
+
+
+# ------------------------------- Cache ------------------------------- #
+
+def _key(doctype, resolution):
+    return f"{CACHE_PREFIX}::{doctype}::{resolution}"
+
+
+def _signature(doctype):
+    field = SOURCES[doctype]
+    count, last_modified = frappe.db.sql(
+        f"SELECT COUNT(*), MAX(modified) FROM `tab{doctype}` WHERE IFNULL(`{field}`, '') != ''"
+    )[0]
+    return f"{count}:{last_modified}"
+
+
+def _build_layer(doctype, resolution, signature):
+    """Simplify every boundary of `doctype` and store the layer."""
+    tolerance, precision = RESOLUTIONS[resolution]
+    field = SOURCES[doctype]
+    shapes = simplify_layer(
+        {
+            r.name: parse_geometry(r.get(field))
+            for r in frappe.get_all(doctype, fields=["name", field], filters={field: ["is", "set"]}, limit_page_length=0)
+        },
+        tolerance,
+        precision,
+    )
+
+    # Written aside and renamed in, so readers never see a half-built layer
+    cache = frappe.cache()
+    key = cache.make_key(_key(doctype, resolution))
+    staging = f"{key}::{frappe.generate_hash(length=8)}"
+    pipe = cache.pipeline(transaction=False)
+    for name, geometry in shapes.items():
+        pipe.hset(staging, name, json.dumps(geometry))
+    pipe.hset(staging, SIGNATURE_FIELD, signature)
+    pipe.rename(staging, key)
+    pipe.execute()
+    return shapes
+
+
+def get_simplified(doctype, records, resolution):
+    """Return {name: geometry} at the requested resolution.
+
+    `records` is an iterable of (name, modified, geometry) where geometry may be
+    a parsed dict or the raw stored GeoJSON string.
+    """
+    records = list(records)
+    if resolution not in RESOLUTIONS:
+        return {name: parse_geometry(geometry) for name, _modified, geometry in records}
+
+    cache = frappe.cache()
+    names = [name for name, _modified, _geometry in records]
+    signature = _signature(doctype)
+    cached = cache.hmget(cache.make_key(_key(doctype, resolution)), [SIGNATURE_FIELD, *names]) if names else []
+    if names and frappe.safe_decode(cached[0]) == signature:
+        hits = dict(zip(names, cached[1:], strict=True))
+        layer = {name: json.loads(hit) for name, hit in hits.items() if hit}
+    elif names:
+        layer = _build_layer(doctype, resolution, signature)
+    else:
+        return {}
+
+    # Records outside the stored layer (no stored boundary) are simplified alone
+    tolerance, precision = RESOLUTIONS[resolution]
+    return {
+        name: layer[name] if name in layer else simplify_geometry(parse_geometry(geometry), tolerance, precision)
+        for name, _modified, geometry in records
+    }
+
+
+def clear_simplified(doctype):
+    frappe.cache().delete_value([_key(doctype, r) for r in RESOLUTIONS])
+
+
+def invalidate(doc, method=None, *args, **kwargs):
+    """Doc event: drop a doctype's layers once a delete or rename commits.
+
+    A rename keeps the row count and latest `modified`, so the signature
+    alone would not notice it.
+    """
+    frappe.db.after_commit.add(lambda doctype=doc.doctype: clear_simplified(doctype))
@@ -0,0 +1,112 @@
+import base64
+import gzip
+import io
+import json
+
+import frappe
+from frappe.utils import cint
+from werkzeug.wrappers import Response
+
+# Keyset-paginated GeoJSON streaming. Rows are read through an unbuffered
+# (server-side) cursor ordered by (modified, name) and every feature is
+# encoded straight into the (optionally gzipped) response body, so no row list
+# or feature list is ever held in memory. The last (modified, name) of a page
+# is handed back as an opaque cursor and seeks the next page via the index
+# instead of an OFFSET scan.
+
+DEFAULT_PAGE_LENGTH = 5000
+MAX_PAGE_LENGTH = 20000
+
+
+# ------------------------------- Cursor ------------------------------- #
+
+def encode_cursor(*keys):
+    raw = json.dumps([str(k) if k is not None else None for k in keys], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size=2):
+    """Return the key tuple of an opaque cursor, or None for the first page."""
+    if not cursor:
+        return None
+    try:
+        keys = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        keys = None
+    if not isinstance(keys, list) or len(keys) != size:
+        frappe.throw(frappe._("Invalid cursor"))
+    return tuple(keys)
+
+
+def page_length_for(page_length):
+    return min(max(cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+
+
+# ------------------------------- Writer ------------------------------- #
+
+class FeatureWriter:
+    """Write a FeatureCollection incrementally into a (gzipped) buffer."""
+
+    def __init__(self, gzipped=False):
+        self.buffer = io.BytesIO()
+        self.gzipped = gzipped
+        self.stream = gzip.GzipFile(fileobj=self.buffer, mode="wb", compresslevel=6) if gzipped else self.buffer
+        self.count = 0
+        self.stream.write(b'{"type":"FeatureCollection","features":[')
+
+    def write(self, feature):
+        if self.count:
+            self.stream.write(b",")
+        self.stream.write(frappe.as_json(feature, indent=None, separators=(",", ":")).encode("utf-8"))
+        self.count += 1
+
+    def close(self, **extra):
+        tail = "".join(f',"{k}":{json.dumps(v, default=str)}' for k, v in extra.items())
+        self.stream.write(f"]{tail}}}".encode())
+        if self.gzipped:
+            self.stream.close()
+        return self.buffer.getvalue()
+
+
+def _accepts_gzip():
+    request = getattr(frappe.local, "request", None)
+    return bool(request) and "gzip" in (request.headers.get("Accept-Encoding") or "")
+
+
+def stream_features(query, values, to_feature, page_length):
+    """Run a keyset query and stream its rows as a GeoJSON page.
+
+    `query` must select `modified` and `name`, order by them descending and
+    fetch `page_length + 1` rows; `to_feature(row)` returns a feature or None.
+    """
+    writer = FeatureWriter(gzipped=_accepts_gzip())
+    next_cursor, seen, last = None, 0, None
+
+    with frappe.db.unbuffered_cursor():
+        for row in frappe.db.sql(query, values, as_dict=True, as_iterator=True):
+            seen += 1
+            if seen > page_length:
+                next_cursor = encode_cursor(last.modified, last.name)
+                break
+            last = row
+            feature = to_feature(row)
+            if feature:
+                writer.write(feature)
+
+    body = writer.close(next_cursor=next_cursor, count=writer.count)
+    response = Response(body, mimetype="application/json")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+    if writer.gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# ------------------------------- Volunteer addresses ------------------------------- #
+
+def volunteer_addresses(cursor=None, page_length=None, **filters):
+    from red_crescent.volunteer_query import build_query, to_feature
+
+    page_length = page_length_for(page_length)
+    query, values = build_query(after=decode_cursor(cursor), limit=page_length + 1, **filters)
+    return stream_features(query, values, to_feature, page_length)
@@ -72,8 +72,171 @@ doc_events = {
     }
 }
 doc_events = {
-    "Indicator": {"validate": "red_crescent.pmer_logic.calculate_progress"}
+    "Indicator": {"validate": "red_crescent.pmer_logic.calculate_progress"},
+    "YRCS Volunteers": {
+        "on_update": [
+            "red_crescent.volunteer_map_points.sync_volunteer",
+            "red_crescent.volunteer_geo_index.on_volunteer_update",
+            "red_crescent.volunteer_clusters.mark_changed",
+            "red_crescent.volunteer_facets.invalidate",
+        ],
+        "on_trash": [
+            "red_crescent.volunteer_map_points.remove_volunteer",
+            "red_crescent.volunteer_geo_index.on_volunteer_trash",
+            "red_crescent.volunteer_clusters.mark_changed",
+            "red_crescent.volunteer_facets.invalidate",
+        ],
+        "after_rename": [
+            "red_crescent.volunteer_map_points.rename_volunteer",
+            "red_crescent.volunteer_geo_index.on_volunteer_rename",
+            "red_crescent.volunteer_clusters.mark_renamed",
+            "red_crescent.volunteer_facets.invalidate",
+        ],
+    },
+    # Team Member rows are saved through their Teams parent.
+    "Teams": {
+        "on_update": "red_crescent.volunteer_facets.invalidate",
+        "on_trash": "red_crescent.volunteer_facets.invalidate",
+        "after_rename": "red_crescent.volunteer_facets.invalidate",
+    },
+    "NS Branch": {
+        "on_update": "red_crescent.volunteer_facets.invalidate",
+        "on_trash": "red_crescent.volunteer_facets.invalidate",
+        "after_rename": "red_crescent.volunteer_facets.invalidate",
+    },
+    "Districts": {
+        "on_update": [
+            "red_crescent.district_cache.invalidate",
+            "red_crescent.vector_tiles.clear_tile_cache",
+            "red_crescent.admin_hierarchy.invalidate",
+        ],
+        "on_trash": [
+            "red_crescent.district_cache.invalidate",
+            "red_crescent.vector_tiles.clear_tile_cache",
+            "red_crescent.admin_hierarchy.invalidate",
+            "red_crescent.geo_simplify.invalidate",
+        ],
+        "after_rename": [
+            "red_crescent.district_cache.invalidate",
+            "red_crescent.vector_tiles.clear_tile_cache",
+            "red_crescent.admin_hierarchy.invalidate",
+            "red_crescent.geo_simplify.invalidate",
+        ],
+    },
+    "Yemen Population by District - 2025": {
+        "on_update": [
+            "red_crescent.district_cache.invalidate",
+            "red_crescent.vector_tiles.clear_tile_cache",
+        ],
+        "on_trash": [
+            "red_crescent.district_cache.invalidate",
+            "red_crescent.vector_tiles.clear_tile_cache",
+        ],
+    },
+    # Sector Severity rows are saved through their District Sectoral Needs parent.
+    "District Sectoral Needs": {
+        "on_update": [
+            "red_crescent.sector_rollup.update_rollup",
+            "red_crescent.vector_tiles.clear_tile_cache",
+        ],
+        "on_trash": [
+            "red_crescent.sector_rollup.remove_rollup",
+            "red_crescent.vector_tiles.clear_tile_cache",
+            "red_crescent.geo_simplify.invalidate",
+        ],
+        "after_rename": [
+            "red_crescent.sector_rollup.rename_rollup",
+            "red_crescent.geo_simplify.invalidate",
+        ],
+    },
+    "Villages": {
+        "on_update": ["red_crescent.gazetteer.invalidate", "red_crescent.admin_hierarchy.invalidate"],
+        "on_trash": ["red_crescent.gazetteer.invalidate", "red_crescent.admin_hierarchy.invalidate"],
+        "after_rename": "red_crescent.admin_hierarchy.invalidate",
+    },
+    "Sub-Districts": {
+        "on_update": ["red_crescent.gazetteer.invalidate", "red_crescent.admin_hierarchy.invalidate"],
+        "on_trash": ["red_crescent.gazetteer.invalidate", "red_crescent.admin_hierarchy.invalidate"],
+        "after_rename": "red_crescent.admin_hierarchy.invalidate",
+    },
+    "Governorate": {
+        "on_update": ["red_crescent.gazetteer.invalidate", "red_crescent.admin_hierarchy.invalidate"],
+        "on_trash": ["red_crescent.gazetteer.invalidate", "red_crescent.admin_hierarchy.invalidate"],
+        "after_rename": "red_crescent.admin_hierarchy.invalidate",
+    },
+    "Sectors": {
+        "on_update": "red_crescent.admin_hierarchy.invalidate",
+        "on_trash": "red_crescent.admin_hierarchy.invalidate",
+        "after_rename": "red_crescent.admin_hierarchy.invalidate",
+    },
+    "District Risk Profile": {
+        "on_update": "red_crescent.vector_tiles.clear_tile_cache",
+        "on_trash": "red_crescent.vector_tiles.clear_tile_cache",
+    },
+    "YRCS Fleet Vehicle": {
+        "on_update": "red_crescent.map_search.index_doc",
+        "on_trash": "red_crescent.map_search.remove_doc",
+        "after_rename": "red_crescent.map_search.rename_doc",
+    },
+    "Warehouse": {
+        "on_update": "red_crescent.map_search.index_doc",
+        "on_trash": "red_crescent.map_search.remove_doc",
+        "after_rename": "red_crescent.map_search.rename_doc",
+    },
+    "Asset": {
+        "on_update": "red_crescent.map_search.index_doc",
+        "on_trash": "red_crescent.map_search.remove_doc",
+        "after_rename": "red_crescent.map_search.rename_doc",
+    },
+    "Relief Dispatch": {
+        "validate": "red_crescent.relief_allocation.allocate_dispatch",
+        "on_update": "red_crescent.relief_stock.post_voucher",
+        "on_trash": [
+            "red_crescent.relief_stock.reverse_voucher",
+            "red_crescent.relief_allocation.release_dispatch",
+        ],
+    },
+    "Relief Return": {
+        "on_update": "red_crescent.relief_stock.post_voucher",
+        "on_trash": "red_crescent.relief_stock.reverse_voucher",
+    },
+    "Relief Item Stock": {
+        "on_update": "red_crescent.relief_stock.reconcile_stock",
+    },
+    "Beneficiary": {
+        "validate": "red_crescent.beneficiary_dedup.set_keys",
+        "on_update": "red_crescent.beneficiary_dedup.check_duplicates",
+        "on_trash": "red_crescent.beneficiary_dedup.remove_pairs",
+    },
+    # Beneficiary lines of these are indexed in Beneficiary Assistance
+    "Relief Distribution": {
+        "validate": "red_crescent.assistance_index.warn_recent_assistance",
+        "on_update": "red_crescent.assistance_index.sync_source",
+        "on_trash": "red_crescent.assistance_index.remove_source",
+    },
+    "Intervention": {
+        "validate": "red_crescent.assistance_index.warn_recent_assistance",
+        "on_update": "red_crescent.assistance_index.sync_source",
+        "on_trash": "red_crescent.assistance_index.remove_source",
+    },
+    "Cash Transfer Request": {
+        "validate": "red_crescent.assistance_index.warn_recent_assistance",
+        "on_update": "red_crescent.assistance_index.sync_source",
+        "on_trash": "red_crescent.assistance_index.remove_source",
+    },
+    "Emergency Relief Distribution": {
+        "validate": "red_crescent.assistance_index.warn_recent_assistance",
+        "on_update": "red_crescent.assistance_index.sync_source",
+        "on_trash": "red_crescent.assistance_index.remove_source",
+    },
+    "Emergency Shelter Assignment": {
+        "validate": "red_crescent.assistance_index.warn_recent_assistance",
+        "on_update": "red_crescent.assistance_index.sync_source",
+        "on_trash": "red_crescent.assistance_index.remove_source",
+    },
 }
+
+page_renderer = ["red_crescent.vector_tiles.DistrictTileRenderer"]
 after_migrate = ["red_crescent.sample_data.load"]
 
 # Includes in <head>
@@ -233,6 +396,10 @@ page_js = {
 # 	],
 # }
 
+scheduler_events = {
+    "daily": ["red_crescent.relief_stock.take_snapshot"],
+}
+
 # Testing
 # -------
 
@@ -260,6 +427,8 @@ page_js = {
 # -----------------------------------------------------------
 
 # ignore_links_on_delete = ["Communication", "ToDo"]
+# The relief stock ledger is append-only and outlives the vouchers it records
+ignore_links_on_delete = ["Relief Stock Ledger Entry"]
 
 # Request Events
 # ----------------
@@ -0,0 +1,75 @@
+import functools
+import gzip
+import hashlib
+import json
+
+import frappe
+from werkzeug.wrappers import Response
+
+# Conditional GET for polled map endpoints. The ETag is derived from the call
+# arguments plus COUNT(*)/MAX(modified) of the source doctypes, so a poll with
+# a matching If-None-Match gets a 304 without running the endpoint at all.
+# Full bodies are gzipped once and cached in Redis under their ETag.
+
+PAYLOAD_TTL = 60 * 60
+CACHE_PREFIX = "conditional_response"
+
+
+def version_token(doctypes):
+    parts = []
+    for doctype in doctypes:
+        count, modified = frappe.db.sql(f"SELECT COUNT(*), MAX(modified) FROM `tab{doctype}`")[0]
+        parts.append(f"{doctype}:{count}:{modified}")
+    return "|".join(parts)
+
+
+def make_etag(method, kwargs, doctypes):
+    args = json.dumps(sorted((k, v) for k, v in kwargs.items() if v not in (None, "")), default=str)
+    raw = f"{frappe.local.site}|{method}|{args}|{version_token(doctypes)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _response(etag, body=None, status=200):
+    response = Response(body, status=status, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def conditional_response(*doctypes):
+    """Serve the wrapped whitelisted method with ETag/304 and gzip.
+
+    Direct Python calls (and calls to other methods in the same request) are
+    passed straight through and keep returning plain data.
+    """
+
+    def decorator(fn):
+        method = f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            request = getattr(frappe.local, "request", None)
+            if args or request is None or frappe.form_dict.get("cmd") != method:
+                return fn(*args, **kwargs)
+
+            etag = make_etag(method, kwargs, doctypes)
+            if request.if_none_match.contains(etag):
+                return _response(etag, status=304)
+
+            key = f"{CACHE_PREFIX}::{etag}"
+            compressed = frappe.cache().get_value(key)
+            if compressed is None:
+                body = frappe.as_json({"message": fn(**kwargs)}, indent=None, separators=(",", ":"))
+                compressed = gzip.compress(body.encode("utf-8"), compresslevel=6)
+                frappe.cache().set_value(key, compressed, expires_in_sec=PAYLOAD_TTL)
+
+            if "gzip" in (request.headers.get("Accept-Encoding") or ""):
+                response = _response(etag, compressed)
+                response.headers["Content-Encoding"] = "gzip"
+                return response
+            return _response(etag, gzip.decompress(compressed))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,214 @@
+import hashlib
+import json
+
+import frappe
+import pandas as pd
+from frappe.utils import cint, getdate, now_datetime
+
+from red_crescent.admin_hierarchy import resolve
+from red_crescent.file_chunks import iter_frames
+
+# Bulk import of IDPs Sites from the Power BI site export
+# (extract_powerbi/PowerBI_Sites_Full.xlsx) or any CSV / XLSX with the same
+# layout. Each cleaned row is hashed; sites whose hash matches the stored
+# `import_hash` are skipped, so re-syncs only write changed sites and leave
+# `modified` untouched on the rest. Writes are batched bulk inserts / updates.
+
+DOCTYPE = "IDPs Sites"
+
+# Commit after this many written sites
+BATCH_SIZE = 500
+
+# The Power BI export has generic "Column N" headers; by default they follow
+# the field order of the IDPs Sites form. Files with real headers are matched
+# on field labels / fieldnames instead, and `column_mapping` overrides both.
+FIELD_ORDER = (
+    "implementing_partner", "coverage", "funded_by", "funding_end_date", "governorate", "district",
+    "sub_district", "villagenameen", "site_name", "site_id", "arabic_name", "site_type",
+    "lines_of_response", "sub_site", "verified_date", "updated_site", "hhs_numbers",
+    "site_population", "status", "hubs", "last_field_assessment",
+)
+POWERBI_COLUMNS = {f"Column {i}": field for i, field in enumerate(FIELD_ORDER, 1)}
+
+# Link fields resolved through the admin hierarchy, with the field holding their parent
+PLACE_FIELDS = {
+    "governorate": ("governorate", None),
+    "district": ("district", "governorate"),
+    "sub_district": ("sub_district", "district"),
+    "villagenameen": ("village", "sub_district"),
+}
+
+
+# ------------------------------- Columns ------------------------------- #
+
+def get_column_map(columns, column_mapping=None):
+    """{file column: IDPs Sites field} for the columns of a file."""
+    if isinstance(column_mapping, str):
+        column_mapping = json.loads(column_mapping or "{}")
+
+    by_label = {}
+    for df in frappe.get_meta(DOCTYPE).fields:
+        if df.fieldname in FIELD_ORDER:
+            by_label[df.fieldname.lower()] = df.fieldname
+            by_label[(df.label or "").strip().lower()] = df.fieldname
+
+    out = {}
+    for column in columns:
+        field = (column_mapping or {}).get(column) or POWERBI_COLUMNS.get(column) or by_label.get(column.lower())
+        if field:
+            if field not in FIELD_ORDER:
+                frappe.throw(f"Unknown IDPs Sites field in column mapping: {field}")
+            out[column] = field
+    return out
+
+
+# ------------------------------- Cleaning ------------------------------- #
+
+def _blank(value):
+    return value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip() == ""
+
+
+def _clean(df, value, warnings):
+    if _blank(value):
+        return None
+    text = str(value).strip()
+
+    if df.fieldtype == "Int":
+        return cint(text.replace(",", ""))
+    if df.fieldtype == "Check":
+        return 1 if text.lower() in ("1", "yes", "true", "y", "نعم") else 0
+    if df.fieldtype == "Date":
+        try:
+            return str(getdate(value))
+        except Exception:
+            warnings.append(f"Invalid date for {df.fieldname}: {text}")
+            return None
+    if df.fieldtype == "Select":
+        options = {o.strip().lower(): o.strip() for o in (df.options or "").split("\n") if o.strip()}
+        if text.lower() not in options:
+            warnings.append(f"Unknown {df.fieldname}: {text}")
+            return None
+        return options[text.lower()]
+    return text
+
+
+def clean_row(row, meta, warnings):
+    """IDPs Sites values for one mapped row, with places resolved to names."""
+    out = {}
+    for field in FIELD_ORDER:
+        if field in row and field not in PLACE_FIELDS:
+            out[field] = _clean(meta.get_field(field), row[field], warnings)
+
+    for field, (level, parent_field) in PLACE_FIELDS.items():
+        if field not in row or _blank(row[field]):
+            continue
+        place = resolve(level, str(row[field]).strip(), out.get(parent_field))
+        if not place:
+            warnings.append(f"Unknown {level}: {row[field]}")
+        out[field] = place.name if place else None
+    return out
+
+
+def row_hash(values):
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ------------------------------- Import ------------------------------- #
+
+def _existing():
+    """{site_id: (name, import_hash)}, {site_name: (name, import_hash, site_id)} and the used names.
+
+    The maps are kept apart so a site_id never matches another site's name.
+    """
+    by_id, by_name, names = {}, {}, set()
+    for r in frappe.get_all(DOCTYPE, fields=["name", "site_id", "site_name", "import_hash"]):
+        names.add(r.name)
+        if r.site_id:
+            by_id.setdefault(r.site_id, (r.name, r.import_hash))
+        if r.site_name:
+            by_name.setdefault(r.site_name, (r.name, r.import_hash, r.site_id))
+    return by_id, by_name, names
+
+
+def _match(values, by_id, by_name):
+    """Stored (name, import_hash) of a row, matched on site_id first.
+
+    A row falls back to its site_name only when it has no site_id, or when the
+    site stored under that name has none yet.
+    """
+    if values.get("site_id") in by_id:
+        return by_id[values["site_id"]]
+    name, import_hash, site_id = by_name.get(values["site_name"], (None, None, None))
+    if site_id and values.get("site_id"):
+        return None, None
+    return name, import_hash
+
+
+def _new_name(values, names):
+    name = values["site_name"]
+    if name in names and values.get("site_id"):
+        name = f"{name}-{values['site_id']}"
+    while name in names:
+        name = f"{values['site_name']}-{frappe.generate_hash(length=5)}"
+    names.add(name)
+    return name
+
+
+def _flush(inserts, updates):
+    now, user = now_datetime(), frappe.session.user
+    if inserts:
+        fields = ["name", "creation", "modified", "modified_by", "owner", "docstatus", *FIELD_ORDER, "import_hash"]
+        frappe.db.bulk_insert(
+            DOCTYPE,
+            fields=fields,
+            values=[(name, now, now, user, user, 0, *(v.get(f) for f in FIELD_ORDER), v["import_hash"]) for name, v in inserts],
+        )
+    if updates:
+        frappe.db.bulk_update(DOCTYPE, dict(updates), modified=now, modified_by=user)
+    frappe.db.commit()
+    inserts.clear()
+    updates.clear()
+
+
+def import_sites(path, column_mapping=None, dry_run=False):
+    """Upsert IDPs Sites from a file; returns counts and warnings."""
+    meta = frappe.get_meta(DOCTYPE)
+    by_id, by_name, names = _existing()
+    seen = set()
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "warnings": []}
+    inserts, updates = [], []
+
+    for first_row, chunk in iter_frames(path, {}):
+        column_map = get_column_map(list(chunk.columns), column_mapping)
+        chunk = chunk[list(column_map)].rename(columns=column_map)
+
+        for offset, row in enumerate(chunk.to_dict("records")):
+            warnings = []
+            values = clean_row(row, meta, warnings)
+            stats["warnings"].extend(f"Row {first_row + offset}: {w}" for w in warnings)
+
+            key = ("site_id", values["site_id"]) if values.get("site_id") else ("site_name", values.get("site_name"))
+            if not values.get("site_name") or key in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(key)
+
+            values["import_hash"] = row_hash(values)
+            name, stored_hash = _match(values, by_id, by_name)
+            if name and stored_hash == values["import_hash"]:
+                stats["unchanged"] += 1
+                continue
+
+            if name:
+                updates.append((name, values))
+                stats["updated"] += 1
+            else:
+                inserts.append((_new_name(values, names), values))
+                stats["inserted"] += 1
+
+            if not dry_run and len(inserts) + len(updates) >= BATCH_SIZE:
+                _flush(inserts, updates)
+
+    if not dry_run:
+        _flush(inserts, updates)
+    return stats
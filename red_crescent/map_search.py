@@ -0,0 +1,133 @@
+import re
+
+import frappe
+from frappe.utils import now_datetime
+
+# Search index for the free-text `q` filters of the map endpoints. Text is
+# normalized for Arabic spelling variants (hamza / alef forms, alef maqsura,
+# taa marbuta, diacritics, tatweel, Arabic-Indic digits) and stored as word
+# trigrams under a FULLTEXT index, so `q` becomes an indexed MATCH on the
+# trigrams plus a LIKE on the normalized text of the few candidates left.
+
+DOCTYPE = "Map Search Index"
+
+# Searchable fields per source doctype
+SOURCES = {
+    "Volunteer Map Point": ("home_address", "village", "district"),
+    "YRCS Fleet Vehicle": ("name",),
+    "Warehouse": ("name",),
+    "Asset": ("name",),
+}
+
+GRAM = 3
+
+_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_NON_WORD = re.compile(r"[^\w]+|_")
+_TRANSLATE = str.maketrans(
+    {
+        # Arabic letters are meant here, not the Latin look-alikes RUF001 suggests
+        "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",  # noqa: RUF001
+        "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه", "ء": "",  # noqa: RUF001
+        # Arabic-Indic digits
+        **{chr(0x0660 + d): str(d) for d in range(10)},
+    }
+)
+
+
+# ------------------------------- Text ------------------------------- #
+
+def normalize(text):
+    """Lower-cased, Arabic-normalized words separated by single spaces."""
+    if not text:
+        return ""
+    text = _DIACRITICS.sub("", str(text)).translate(_TRANSLATE).lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def trigrams(normalized):
+    grams = []
+    for word in normalized.split():
+        grams.extend(word[i:i + GRAM] for i in range(len(word) - GRAM + 1))
+    return list(dict.fromkeys(grams))
+
+
+# ------------------------------- Index maintenance ------------------------------- #
+
+def _entry(name, values):
+    normalized = normalize(" ".join(str(v) for v in values if v))
+    return name, normalized, " ".join(trigrams(normalized))
+
+
+def index_records(doctype, records):
+    """(Re)index records given as dicts holding `name` and the SOURCES fields."""
+    entries = [_entry(r["name"], [r.get(f) for f in SOURCES[doctype]]) for r in records]
+    remove_records(doctype, [e[0] for e in entries])
+
+    entries = [e for e in entries if e[1]]
+    if not entries:
+        return
+    now, user = now_datetime(), frappe.session.user
+    frappe.db.bulk_insert(
+        DOCTYPE,
+        fields=["name", "creation", "modified", "modified_by", "owner", "docstatus", "ref_doctype", "ref_name", "normalized", "grams"],
+        values=[
+            (frappe.generate_hash(length=12), now, now, user, user, 0, doctype, name, normalized, grams)
+            for name, normalized, grams in entries
+        ],
+    )
+
+
+def remove_records(doctype, names):
+    if names:
+        frappe.db.delete(DOCTYPE, {"ref_doctype": doctype, "ref_name": ["in", list(names)]})
+
+
+def index_doc(doc, method=None):
+    index_records(doc.doctype, [doc.as_dict()])
+
+
+def remove_doc(doc, method=None):
+    remove_records(doc.doctype, [doc.name])
+
+
+def rename_doc(doc, method=None, old=None, new=None, merge=False):
+    if old:
+        remove_records(doc.doctype, [old])
+    index_records(doc.doctype, [frappe.get_doc(doc.doctype, new or doc.name).as_dict()])
+
+
+def rebuild(doctype=None):
+    """Reindex every record of one or all SOURCES doctypes."""
+    for dt in [doctype] if doctype else SOURCES:
+        if not frappe.db.table_exists(dt):
+            continue
+        frappe.db.delete(DOCTYPE, {"ref_doctype": dt})
+        fields = list(dict.fromkeys(["name", *SOURCES[dt]]))
+        index_records(dt, frappe.get_all(dt, fields=fields))
+
+
+# ------------------------------- Query ------------------------------- #
+
+def _search(doctype, q):
+    """(WHERE clause over the index alias `s`, values) for a query string."""
+    normalized = normalize(q)
+    values = {"search_doctype": doctype, "search_like": f"%{normalized}%"}
+    conditions = ["s.ref_doctype = %(search_doctype)s"]
+    grams = trigrams(normalized)
+    if grams:
+        conditions.append("MATCH(s.grams) AGAINST (%(search_grams)s IN BOOLEAN MODE)")
+        values["search_grams"] = " ".join(f"+{g}" for g in grams)
+    conditions.append("s.normalized LIKE %(search_like)s")
+    return " AND ".join(conditions), values
+
+
+def search_condition(doctype, q, column):
+    """(SQL condition, values) restricting `column` to records matching `q`."""
+    where, values = _search(doctype, q)
+    return f"{column} IN (SELECT s.ref_name FROM `tab{DOCTYPE}` s WHERE {where})", values
+
+
+def matching_names(doctype, q):
+    """Names of `doctype` records whose indexed text matches `q`."""
+    where, values = _search(doctype, q)
+    return frappe.db.sql_list(f"SELECT s.ref_name FROM `tab{DOCTYPE}` s WHERE {where}", values)
@@ -0,0 +1,11 @@
+import frappe
+
+# get_district_risks seeks risk rows on Frappe's own `modified` index (its
+# entries end with the primary key, so they are ordered by (modified, name))
+# and then reads whole districts: one seek per district on this index.
+# District Risk Profile is not defined in this app, so the index is added here.
+
+
+def execute():
+    if frappe.db.table_exists("District Risk Profile"):
+        frappe.db.add_index("District Risk Profile", ["governorate", "district", "modified"], "district_risk_district")
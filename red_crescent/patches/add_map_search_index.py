@@ -0,0 +1,11 @@
+from red_crescent.map_search import rebuild
+from red_crescent.yemen_red_crescent_society.doctype.map_search_index.map_search_index import (
+    on_doctype_update,
+)
+
+
+def execute():
+    # The FULLTEXT index is normally created on migrate; make sure it exists
+    # before the first rebuild
+    on_doctype_update()
+    rebuild()
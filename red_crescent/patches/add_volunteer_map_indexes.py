@@ -0,0 +1,97 @@
+import frappe
+
+from red_crescent.volunteer_query import build_query
+from red_crescent.yemen_red_crescent_society.doctype.volunteer_map_point.volunteer_map_point import (
+    on_doctype_update,
+)
+
+# Composite indexes for the volunteer map queries.
+#
+#   Volunteer Address  (parenttype, governorate, district, add_type)
+#       volunteer_facets: governorate / district / address type counts are
+#       read from the index alone
+#   Volunteer Address  (parenttype, latitude, longitude)
+#       volunteer_map_points.rebuild: "located rows only" without touching
+#       the table rows
+#   YRCS Volunteers    (modified, sex, status), (volunteer_rol, modified)
+#       the volunteer list and reports: newest first, filtered by sex /
+#       status (index condition pushdown) or by exact role
+#   Volunteer Map Point (see VolunteerMapPoint.on_doctype_update, which also
+#       creates them on fresh installs): place and sex / status filters of
+#       every map endpoint, in keyset order
+#
+# Each query in CHECKS is EXPLAINed after the indexes are added and the plan
+# is written to the "red_crescent" log; a query that does not use its
+# expected index is logged as a warning.
+
+INDEXES = {
+    "Volunteer Address": {
+        "volunteer_map_filters": ["parenttype", "governorate", "district", "add_type"],
+        "volunteer_map_coords": ["parenttype", "latitude", "longitude"],
+    },
+    "YRCS Volunteers": {
+        "volunteer_map_modified": ["modified", "sex", "status"],
+        "volunteer_map_role": ["volunteer_rol", "modified"],
+    },
+}
+
+
+def _checks():
+    return [
+        ("map points by sex / status", *build_query(sex="Female", status="Active", limit=500), "volunteer_map_status"),
+        (
+            "map points by place",
+            *build_query(governorate="-", district="-", limit=500),
+            "volunteer_map_place",
+        ),
+        (
+            "facet districts",
+            """SELECT governorate, district, COUNT(*) FROM `tabVolunteer Address`
+            WHERE parenttype = 'YRCS Volunteers' GROUP BY governorate, district""",
+            {},
+            "volunteer_map_filters",
+        ),
+        (
+            "projection rebuild",
+            """SELECT a.name FROM `tabVolunteer Address` a
+            WHERE a.parenttype = 'YRCS Volunteers' AND a.latitude IS NOT NULL AND a.latitude != ''""",
+            {},
+            "volunteer_map_coords",
+        ),
+        (
+            "volunteer list by sex / status",
+            """SELECT name FROM `tabYRCS Volunteers`
+            WHERE sex = 'Female' AND status = 'Active' ORDER BY modified DESC LIMIT 20""",
+            {},
+            "volunteer_map_modified",
+        ),
+    ]
+
+
+def explain_checks():
+    """EXPLAIN each map query; returns [(label, expected index, [(table, type, key, rows)])]."""
+    results = []
+    for label, sql, values, expected in _checks():
+        plan = frappe.db.sql(f"EXPLAIN {sql}", values, as_dict=True)
+        results.append(
+            (label, expected, [(r.get("table"), r.get("type"), r.get("key"), r.get("rows")) for r in plan])
+        )
+    return results
+
+
+def execute():
+    for doctype, indexes in INDEXES.items():
+        if not frappe.db.table_exists(doctype):
+            continue
+        for index_name, fields in indexes.items():
+            frappe.db.add_index(doctype, fields, index_name)
+
+    on_doctype_update()
+
+    if not all(frappe.db.table_exists(dt) for dt in (*INDEXES, "Volunteer Map Point")):
+        return
+    logger = frappe.logger("red_crescent")
+    for label, expected, plan in explain_checks():
+        keys = {key for _table, _type, key, _rows in plan}
+        log = logger.info if expected in keys else logger.warning
+        log(f"volunteer map index check, {label}: expected {expected}, plan {plan}")
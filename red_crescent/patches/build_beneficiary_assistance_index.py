@@ -0,0 +1,9 @@
+from red_crescent.assistance_index import rebuild
+from red_crescent.yemen_red_crescent_society.doctype.beneficiary_assistance.beneficiary_assistance import (
+    on_doctype_update,
+)
+
+
+def execute():
+    on_doctype_update()
+    rebuild()
@@ -0,0 +1,54 @@
+import frappe
+from frappe.utils import flt
+
+from red_crescent.relief_stock import (
+    BALANCE,
+    LEDGER,
+    STOCK,
+    VOUCHERS,
+    balance_key,
+    post,
+    reconcile_stock,
+    repost_voucher,
+    take_snapshot,
+)
+from red_crescent.yemen_red_crescent_society.doctype.relief_stock_balance import relief_stock_balance
+from red_crescent.yemen_red_crescent_society.doctype.relief_stock_ledger_entry import (
+    relief_stock_ledger_entry,
+)
+
+
+def execute():
+    relief_stock_ledger_entry.on_doctype_update()
+    relief_stock_balance.on_doctype_update()
+
+    if frappe.db.count(LEDGER):
+        return
+
+    # Post existing vouchers, so later edits only post their difference ...
+    for doctype in VOUCHERS:
+        for name in frappe.get_all(doctype, order_by="creation asc", pluck="name"):
+            repost_voucher(frappe.get_doc(doctype, name), check=False)
+
+    # ... then count every Relief Item Stock record. The manually maintained
+    # quantities already include those vouchers, so each count posts only its
+    # difference to the balance.
+    counted = set()
+    for name in frappe.get_all(STOCK, order_by="modified asc", pluck="name"):
+        doc = frappe.get_doc(STOCK, name)
+        if doc.storage_location and doc.item_code:
+            reconcile_stock(doc)
+            counted.add(balance_key(doc.storage_location, doc.item_code, doc.expiry_date))
+
+    # Vouchers posted under a key no count covers (dispatch lines without an
+    # expiry batch, mostly) are already netted out of the counted quantities;
+    # bring those balances to zero instead of leaving them negative.
+    balances = frappe.get_all(
+        BALANCE, filters={"qty": ["!=", 0]}, fields=["name", "warehouse", "item_code", "expiry_date", "qty"]
+    )
+    for b in balances:
+        if b.name not in counted:
+            key = (b.warehouse, b.item_code, str(b.expiry_date) if b.expiry_date else None)
+            post(BALANCE, b.name, {key: -flt(b.qty)}, check=False)
+
+    take_snapshot()
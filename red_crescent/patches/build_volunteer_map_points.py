@@ -0,0 +1,9 @@
+import frappe
+
+from red_crescent.volunteer_map_points import rebuild
+
+
+def execute():
+    # Bounding-box scans of the map read latitude / longitude together
+    frappe.db.add_index("Volunteer Map Point", ["latitude", "longitude"], "volunteer_map_point_coords")
+    rebuild()
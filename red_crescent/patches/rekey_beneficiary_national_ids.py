@@ -0,0 +1,11 @@
+import frappe
+
+from red_crescent.beneficiary_dedup import screen_all
+
+# Fill the blocking keys of existing Beneficiaries (national IDs keep their
+# letters; placeholders such as "N/A" get no key) and build the Open pairs.
+
+
+def execute():
+    if frappe.db.table_exists("Beneficiary"):
+        screen_all()
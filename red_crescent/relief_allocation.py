@@ -0,0 +1,226 @@
+import heapq
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, now_datetime, nowdate
+
+from red_crescent.relief_stock import BALANCE, PRECISION, balance_key, posted_lines
+
+# First-expiry-first-out allocation of Relief Dispatch lines. The batches of
+# every requested item in the source warehouse are read in one locking query
+# (SELECT ... FOR UPDATE on their Relief Stock Balance rows) and kept in a
+# min-heap per item keyed on expiry, so a whole convoy manifest is allocated
+# in one pass. Draft dispatches hold their picks as Relief Stock Reservations,
+# which lower the available quantity seen by every other allocation until
+# the dispatch is dispatched or deleted.
+
+RESERVATION = "Relief Stock Reservation"
+
+# Undated batches are picked after every dated one
+NO_EXPIRY = "9999-12-31"
+
+
+# ------------------------------- Batches ------------------------------- #
+
+def _batches(warehouse, item_codes, lock=True):
+    if not item_codes:
+        return []
+    return frappe.db.sql(
+        f"""
+        SELECT name, item_code, expiry_date, qty - IFNULL(reserved_qty, 0) AS available
+        FROM `tab{BALANCE}`
+        WHERE warehouse = %s AND item_code IN %s
+        ORDER BY name
+        {"FOR UPDATE" if lock else ""}
+        """,
+        (warehouse, tuple(item_codes)),
+        as_dict=True,
+    )
+
+
+def allocate(warehouse, lines, on_date=None, lock=True, credit=None):
+    """Pick batches for [(item_code, qty, expiry_date or None)] lines.
+
+    Lines with an expiry date draw on that batch only; the others are filled
+    first-expiry-first-out, skipping batches expired before `on_date`.
+    `credit` ({balance name: qty}) adds back stock the caller already holds.
+    Returns a list of (picks, shortfall) per line, where picks are
+    [(balance name, expiry_date, qty)].
+    """
+    on_date = str(getdate(on_date or nowdate()))
+    available, expiry_of = {}, {}
+    for b in _batches(warehouse, {item for item, _qty, _expiry in lines}, lock=lock):
+        expiry = str(b.expiry_date) if b.expiry_date else None
+        available[b.name] = flt(b.available) + flt((credit or {}).get(b.name))
+        expiry_of[b.name] = (b.item_code, expiry)
+
+    results = [None] * len(lines)
+
+    # Explicit batches first, so FEFO never takes stock a line asked for by date
+    for i, (item_code, qty, expiry) in enumerate(lines):
+        if not expiry:
+            continue
+        expiry = str(getdate(expiry))
+        name = next((n for n, key in expiry_of.items() if key == (item_code, expiry)), None)
+        take = min(qty, max(available.get(name, 0), 0)) if name else 0
+        if take > 0:
+            available[name] -= take
+        results[i] = ([(name, expiry, take)] if take > 0 else [], round(qty - take, PRECISION))
+
+    queues = {}
+    for name, (item_code, expiry) in expiry_of.items():
+        if available[name] > 0 and (not expiry or expiry >= on_date):
+            queues.setdefault(item_code, []).append((expiry or NO_EXPIRY, name))
+    for queue in queues.values():
+        heapq.heapify(queue)
+
+    for i, (item_code, qty, expiry) in enumerate(lines):
+        if expiry:
+            continue
+        picks, need, queue = [], qty, queues.get(item_code, [])
+        while need > 0 and queue:
+            sort_key, name = queue[0]
+            take = min(need, available[name])
+            picks.append((name, None if sort_key == NO_EXPIRY else sort_key, take))
+            available[name] -= take
+            need -= take
+            if available[name] <= 0:
+                heapq.heappop(queue)
+        results[i] = (picks, round(max(need, 0), PRECISION))
+    return results
+
+
+# ------------------------------- Reservations ------------------------------- #
+
+def reserve(voucher_type, voucher_no, warehouse, picks):
+    """Hold [(balance name, item_code, expiry_date, qty)] for a voucher."""
+    picks = [p for p in picks if p[3] > 0]
+    if not picks:
+        return
+    for name, _item, _expiry, qty in picks:
+        frappe.db.sql(f"UPDATE `tab{BALANCE}` SET reserved_qty = IFNULL(reserved_qty, 0) + %s WHERE name = %s", (qty, name))
+    now, user = now_datetime(), frappe.session.user
+    frappe.db.bulk_insert(
+        RESERVATION,
+        fields=[
+            "name", "creation", "modified", "modified_by", "owner", "docstatus",
+            "voucher_type", "voucher_no", "balance", "warehouse", "item_code", "expiry_date", "qty",
+        ],
+        values=[
+            (frappe.generate_hash(length=12), now, now, user, user, 0,
+             voucher_type, voucher_no, name, warehouse, item_code, expiry, qty)
+            for name, item_code, expiry, qty in picks
+        ],
+    )
+
+
+def release(voucher_type, voucher_no):
+    """Drop every reservation held by a voucher."""
+    held = frappe.db.sql(
+        f"""
+        SELECT balance, SUM(qty) AS qty FROM `tab{RESERVATION}`
+        WHERE voucher_type = %s AND voucher_no = %s
+        GROUP BY balance ORDER BY balance
+        """,
+        (voucher_type, voucher_no),
+        as_dict=True,
+    )
+    for r in held:
+        frappe.db.sql(
+            f"UPDATE `tab{BALANCE}` SET reserved_qty = GREATEST(IFNULL(reserved_qty, 0) - %s, 0) WHERE name = %s",
+            (r.qty, r.balance),
+        )
+    if held:
+        frappe.db.delete(RESERVATION, {"voucher_type": voucher_type, "voucher_no": voucher_no})
+
+
+# ------------------------------- Dispatches ------------------------------- #
+
+ROW_FIELDS = ("item_code", "description", "uom", "notes")
+
+
+def allocate_dispatch(doc, method=None):
+    """Split Relief Dispatch lines into expiry batches and reserve drafts.
+
+    Runs on validate. Lines without an expiry date are spread over batches
+    FEFO; any quantity that cannot be covered stays on an undated line.
+    Dispatched documents throw on a shortfall, drafts only warn.
+    """
+    release(doc.doctype, doc.name)
+    if not doc.from_warehouse:
+        return
+
+    items = doc.get("dispatch_items") or []
+    positions = [i for i, r in enumerate(items) if r.item_code and flt(r.quantity_dispatched) > 0]
+    results = dict(
+        zip(
+            positions,
+            allocate(
+                doc.from_warehouse,
+                [(items[i].item_code, flt(items[i].quantity_dispatched), items[i].expiry_date) for i in positions],
+                on_date=doc.dispatch_date,
+                # Stock this dispatch already posted is its own to re-pick
+                credit={balance_key(*key): -qty for key, qty in posted_lines(doc.doctype, doc.name).items()},
+            ),
+            strict=True,
+        )
+    )
+
+    new_rows, held, short = [], [], []
+    for i, row in enumerate(items):
+        if i not in results or row.expiry_date:
+            # Explicit batches (and empty lines) stay as entered
+            new_rows.append(row)
+        if i not in results:
+            continue
+        picks, shortfall = results[i]
+        if not row.expiry_date:
+            base = {f: row.get(f) for f in ROW_FIELDS}
+            new_rows.extend({**base, "quantity_dispatched": qty, "expiry_date": expiry} for _name, expiry, qty in picks)
+            if shortfall:
+                new_rows.append({**base, "quantity_dispatched": shortfall, "expiry_date": None})
+        held.extend((name, row.item_code, expiry, qty) for name, expiry, qty in picks)
+        if shortfall:
+            short.append(_("{0}: {1} short").format(row.item_code, shortfall))
+
+    doc.set("dispatch_items", new_rows)
+    for idx, row in enumerate(doc.dispatch_items, 1):
+        row.idx = idx
+
+    if doc.get("status") == "Draft":
+        reserve(doc.doctype, doc.name, doc.from_warehouse, held)
+        if short:
+            frappe.msgprint(
+                _("Not enough stock in {0} to reserve: {1}").format(doc.from_warehouse, "; ".join(short)),
+                title=_("Partial Reservation"),
+                indicator="orange",
+            )
+    elif short:
+        frappe.throw(
+            _("Not enough stock in {0}: {1}").format(doc.from_warehouse, "; ".join(short)),
+            title=_("Insufficient Stock"),
+        )
+
+
+def release_dispatch(doc, method=None):
+    release(doc.doctype, doc.name)
+
+
+@frappe.whitelist()
+def preview_allocation(warehouse, items, dispatch_date=None):
+    """FEFO picks for a manifest of [{item_code, qty}] without reserving."""
+    if isinstance(items, str):
+        items = json.loads(items)
+    lines = [(i.get("item_code"), flt(i.get("qty")), i.get("expiry_date")) for i in items if i.get("item_code")]
+    return [
+        {
+            "item_code": item_code,
+            "qty": qty,
+            "picks": [{"expiry_date": expiry, "qty": take} for _name, expiry, take in picks],
+            "shortfall": shortfall,
+        }
+        for (item_code, qty, _expiry), (picks, shortfall) in zip(
+            lines, allocate(warehouse, lines, on_date=dispatch_date, lock=False), strict=True
+        )
+    ]
@@ -0,0 +1,238 @@
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, flt, getdate, now_datetime, nowdate
+
+# Append-only relief stock ledger. Saving a Relief Dispatch or Relief Return
+# appends ledger entries for the difference between what the document now
+# moves and what it has already posted; deleting it appends the reversal.
+# Each entry updates one Relief Stock Balance row per (warehouse, item,
+# expiry batch), named by a hash of that key, so a balance is a primary key
+# lookup. Draft dispatches post nothing. Relief Item Stock acts as a stock
+# count: saving it posts the adjustment to its quantity, and its
+# `quantity_available` is kept equal to the balance. Daily Relief Stock
+# Snapshots bound "balance as of" queries.
+
+LEDGER = "Relief Stock Ledger Entry"
+BALANCE = "Relief Stock Balance"
+SNAPSHOT = "Relief Stock Snapshot"
+STOCK = "Relief Item Stock"
+
+# voucher doctype: (warehouse field, items table, quantity field, direction)
+VOUCHERS = {
+    "Relief Dispatch": ("from_warehouse", "dispatch_items", "quantity_dispatched", -1),
+    "Relief Return": ("to_warehouse", "return_items", "quantity_returned", 1),
+}
+
+PRECISION = 6
+
+
+def balance_key(warehouse, item_code, expiry_date=None):
+    """Name of the Relief Stock Balance row for a (warehouse, item, expiry) key."""
+    expiry = str(getdate(expiry_date)) if expiry_date else ""
+    return hashlib.md5(f"{warehouse}\n{item_code}\n{expiry}".encode()).hexdigest()
+
+
+def _key(warehouse, item_code, expiry_date):
+    return warehouse, item_code, str(getdate(expiry_date)) if expiry_date else None
+
+
+# ------------------------------- Posting ------------------------------- #
+
+def voucher_lines(doc):
+    """{(warehouse, item, expiry): qty change} a voucher should have posted."""
+    warehouse_field, table, qty_field, direction = VOUCHERS[doc.doctype]
+    warehouse = doc.get(warehouse_field)
+    lines = {}
+    # Draft dispatches only reserve stock (see relief_allocation)
+    if not warehouse or doc.get("status") == "Draft":
+        return lines
+    for row in doc.get(table) or []:
+        if row.item_code and flt(row.get(qty_field)):
+            key = _key(warehouse, row.item_code, row.get("expiry_date"))
+            lines[key] = lines.get(key, 0) + direction * flt(row.get(qty_field))
+    return lines
+
+
+def posted_lines(voucher_type, voucher_no):
+    """{(warehouse, item, expiry): net qty change} already in the ledger."""
+    rows = frappe.db.sql(
+        f"""
+        SELECT warehouse, item_code, expiry_date, SUM(qty_change) AS qty
+        FROM `tab{LEDGER}`
+        WHERE voucher_type = %s AND voucher_no = %s
+        GROUP BY warehouse, item_code, expiry_date
+        """,
+        (voucher_type, voucher_no),
+        as_dict=True,
+    )
+    return {_key(r.warehouse, r.item_code, r.expiry_date): flt(r.qty) for r in rows}
+
+
+def post(voucher_type, voucher_no, changes, check=True):
+    """Append ledger entries for {(warehouse, item, expiry): qty change}.
+
+    With `check`, an outgoing change that leaves a balance negative throws.
+    """
+    now, user = now_datetime(), frappe.session.user
+    entries = []
+    # Fixed order so concurrent postings lock balance rows in the same order
+    for key in sorted(changes, key=lambda k: (k[0], k[1], k[2] or "")):
+        change = round(flt(changes[key]), PRECISION)
+        if not change:
+            continue
+        warehouse, item_code, expiry_date = key
+        name = balance_key(*key)
+        frappe.db.sql(
+            f"""
+            INSERT INTO `tab{BALANCE}`
+                (name, creation, modified, modified_by, owner, docstatus,
+                 warehouse, item_code, expiry_date, qty, last_posting)
+            VALUES (%(name)s, %(now)s, %(now)s, %(user)s, %(user)s, 0,
+                 %(warehouse)s, %(item_code)s, %(expiry_date)s, %(change)s, %(now)s)
+            ON DUPLICATE KEY UPDATE
+                qty = qty + VALUES(qty), last_posting = VALUES(last_posting),
+                modified = VALUES(modified), modified_by = VALUES(modified_by)
+            """,
+            {
+                "name": name, "now": now, "user": user, "warehouse": warehouse,
+                "item_code": item_code, "expiry_date": expiry_date, "change": change,
+            },
+        )
+        qty_after = flt(frappe.db.get_value(BALANCE, name, "qty"))
+        if check and change < 0 and round(qty_after, PRECISION) < 0:
+            frappe.throw(
+                _("Insufficient stock of {0} in {1} (expiry {2}): short by {3}").format(
+                    item_code, warehouse, expiry_date or _("none"), -qty_after
+                ),
+                title=_("Insufficient Stock"),
+            )
+        entries.append(
+            (frappe.generate_hash(length=12), now, now, user, user, 0, now, voucher_type, voucher_no,
+             warehouse, item_code, expiry_date, change, qty_after)
+        )
+
+    if not entries:
+        return
+    frappe.db.bulk_insert(
+        LEDGER,
+        fields=[
+            "name", "creation", "modified", "modified_by", "owner", "docstatus", "posting_datetime",
+            "voucher_type", "voucher_no", "warehouse", "item_code", "expiry_date", "qty_change", "qty_after",
+        ],
+        values=entries,
+    )
+    _sync_stock_records([(e[9], e[10], e[11], e[13]) for e in entries])
+
+
+def _sync_stock_records(balances):
+    """Mirror balances into the matching Relief Item Stock quantities."""
+    now = now_datetime()
+    for warehouse, item_code, expiry_date, qty in balances:
+        frappe.db.sql(
+            f"""
+            UPDATE `tab{STOCK}`
+            SET quantity_available = %s, last_updated = %s
+            WHERE storage_location = %s AND item_code = %s AND expiry_date <=> %s
+            """,
+            (qty, now, warehouse, item_code, expiry_date),
+        )
+
+
+def repost_voucher(doc, check=True):
+    lines = voucher_lines(doc)
+    posted = posted_lines(doc.doctype, doc.name)
+    post(
+        doc.doctype,
+        doc.name,
+        {key: lines.get(key, 0) - posted.get(key, 0) for key in set(lines) | set(posted)},
+        check=check,
+    )
+
+
+# ------------------------------- Doc events ------------------------------- #
+
+def post_voucher(doc, method=None):
+    repost_voucher(doc)
+
+
+def reverse_voucher(doc, method=None):
+    post(doc.doctype, doc.name, {key: -qty for key, qty in posted_lines(doc.doctype, doc.name).items()}, check=False)
+
+
+def reconcile_stock(doc, method=None):
+    """Post the difference between a Relief Item Stock count and the balance."""
+    if not doc.storage_location or not doc.item_code:
+        return
+    key = _key(doc.storage_location, doc.item_code, doc.expiry_date)
+    post(STOCK, doc.name, {key: flt(doc.quantity_available) - get_balance(*key)}, check=False)
+
+
+# ------------------------------- Reads ------------------------------- #
+
+def get_balance(warehouse, item_code, expiry_date=None):
+    return flt(frappe.db.get_value(BALANCE, balance_key(warehouse, item_code, expiry_date), "qty"))
+
+
+@frappe.whitelist()
+def get_stock_balance(warehouse=None, item_code=None, expiry_date=None):
+    """Non-zero balances, optionally for one warehouse / item / expiry batch."""
+    filters = {"qty": ["!=", 0]}
+    if warehouse:
+        filters["warehouse"] = warehouse
+    if item_code:
+        filters["item_code"] = item_code
+    if expiry_date:
+        filters["expiry_date"] = expiry_date
+    return frappe.get_all(
+        BALANCE,
+        filters=filters,
+        fields=["warehouse", "item_code", "expiry_date", "qty", "reserved_qty", "last_posting"],
+        order_by="warehouse asc, item_code asc, expiry_date asc",
+    )
+
+
+def balance_as_of(warehouse, item_code, expiry_date=None, date=None):
+    """Balance at the end of `date`: latest snapshot plus later ledger entries."""
+    date = getdate(date or nowdate())
+    snapshot = frappe.db.sql(
+        f"""
+        SELECT qty, creation FROM `tab{SNAPSHOT}`
+        WHERE warehouse = %s AND item_code = %s AND expiry_date <=> %s AND snapshot_date <= %s
+        ORDER BY snapshot_date DESC LIMIT 1
+        """,
+        (warehouse, item_code, expiry_date, date),
+        as_dict=True,
+    )
+    since = snapshot[0].creation if snapshot else "1900-01-01"
+    moved = frappe.db.sql(
+        f"""
+        SELECT IFNULL(SUM(qty_change), 0) FROM `tab{LEDGER}`
+        WHERE warehouse = %s AND item_code = %s AND expiry_date <=> %s
+          AND posting_datetime > %s AND posting_datetime < %s
+        """,
+        (warehouse, item_code, expiry_date, since, add_days(date, 1)),
+    )[0][0]
+    return flt(snapshot[0].qty if snapshot else 0) + flt(moved)
+
+
+# ------------------------------- Snapshots ------------------------------- #
+
+def take_snapshot():
+    """Copy every non-zero balance into today's Relief Stock Snapshot rows."""
+    today = nowdate()
+    frappe.db.delete(SNAPSHOT, {"snapshot_date": today})
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{SNAPSHOT}`
+            (name, creation, modified, modified_by, owner, docstatus,
+             snapshot_date, warehouse, item_code, expiry_date, qty)
+        SELECT MD5(CONCAT(b.name, %(today)s)), %(now)s, %(now)s, 'Administrator', 'Administrator', 0,
+             %(today)s, b.warehouse, b.item_code, b.expiry_date, b.qty
+        FROM `tab{BALANCE}` b
+        WHERE b.qty != 0
+        """,
+        {"today": today, "now": now_datetime()},
+    )
+    frappe.db.commit()
@@ -0,0 +1,133 @@
+import pickle
+
+import frappe
+from frappe.utils import cint
+
+# Per-record rollup of the Sector Severity child rows of District Sectoral
+# Needs, kept in a Redis hash so choropleth endpoints never query the child
+# table per record. Rebuilt with one query when missing and refreshed from the
+# parent's doc events (uploads go through parent.save() as well) once the
+# save commits, so a rolled-back save never reaches the shared hash.
+
+ROLLUP_KEY = "sector_severity_rollup"
+READY_KEY = "sector_severity_rollup_ready"
+
+PARENT = "District Sectoral Needs"
+CHILD = "Sector Severity"
+FIELDS = ("sector", "severity", "total_pin", "boys_0_17", "girls_0_17", "men_18_plus", "women_18_plus")
+
+
+def _sector_row(row):
+    return {
+        "sector": row.get("sector"),
+        "severity": row.get("severity"),
+        "total_pin": row.get("total_pin") or 0,
+        "boys_0_17": row.get("boys_0_17") or 0,
+        "girls_0_17": row.get("girls_0_17") or 0,
+        "men_18_plus": row.get("men_18_plus") or 0,
+        "women_18_plus": row.get("women_18_plus") or 0,
+    }
+
+
+def summarize(sectors):
+    """Build a rollup from a list of sector rows."""
+    return {
+        "max_severity": max((cint(r["severity"]) for r in sectors), default=0),
+        "total_pin_sum": sum(cint(r["total_pin"]) for r in sectors),
+        "sectors": sectors,
+    }
+
+
+def rebuild():
+    rows = frappe.db.sql(
+        f"""
+        SELECT parent, {", ".join(FIELDS)}
+        FROM `tab{CHILD}`
+        WHERE parenttype = %s
+        ORDER BY parent, idx
+        """,
+        (PARENT,),
+        as_dict=True,
+    )
+    grouped = {}
+    for r in rows:
+        grouped.setdefault(r.parent, []).append(_sector_row(r))
+
+    # Written aside and renamed in, so readers never see a partial rollup;
+    # values are pickled as RedisWrapper.hset does, for hgetall to read
+    cache = frappe.cache()
+    key = cache.make_key(ROLLUP_KEY)
+    pipe = cache.pipeline(transaction=False)
+    if grouped:
+        staging = f"{key}::{frappe.generate_hash(length=8)}"
+        for parent, sectors in grouped.items():
+            pipe.hset(staging, parent, pickle.dumps(summarize(sectors)))
+        pipe.rename(staging, key)
+    else:
+        pipe.delete(key)
+    pipe.execute()
+    cache.set_value(READY_KEY, 1)
+
+
+def get_rollups():
+    """Return {District Sectoral Needs name: rollup}."""
+    if not frappe.cache().get_value(READY_KEY):
+        rebuild()
+    return frappe.cache().hgetall(ROLLUP_KEY) or {}
+
+
+def _refresh(names):
+    """Re-read committed records into the hash; missing ones are dropped.
+
+    Reading at commit time (rather than keeping the saved doc's rows) also
+    covers saves rolled back to a savepoint inside the transaction.
+    """
+    cache = frappe.cache()
+    if not cache.get_value(READY_KEY):
+        return
+    existing = set(frappe.get_all(PARENT, filters={"name": ["in", list(names)]}, pluck="name"))
+    rows = frappe.get_all(
+        CHILD,
+        filters={"parenttype": PARENT, "parent": ["in", list(existing) or [""]]},
+        fields=["parent", *FIELDS],
+        order_by="parent asc, idx asc",
+    )
+    grouped = {name: [] for name in existing}
+    for r in rows:
+        grouped[r.parent].append(_sector_row(r))
+    for name in names:
+        if name in grouped:
+            cache.hset(ROLLUP_KEY, name, summarize(grouped[name]))
+        else:
+            cache.hdel(ROLLUP_KEY, name)
+
+
+def _flush():
+    names, frappe.flags.sector_rollup_pending = frappe.flags.sector_rollup_pending, None
+    if names:
+        _refresh(names)
+
+
+def _discard():
+    frappe.flags.sector_rollup_pending = None
+
+
+def _after_commit(*names):
+    """Queue records for one refresh when the transaction commits."""
+    if frappe.flags.sector_rollup_pending is None:
+        frappe.flags.sector_rollup_pending = set()
+        frappe.db.after_commit.add(_flush)
+        frappe.db.after_rollback.add(_discard)
+    frappe.flags.sector_rollup_pending.update(names)
+
+
+def update_rollup(doc, method=None):
+    _after_commit(doc.name)
+
+
+def remove_rollup(doc, method=None):
+    _after_commit(doc.name)
+
+
+def rename_rollup(doc, method=None, old=None, new=None, merge=False):
+    _after_commit(*{old, new or doc.name} - {None})
@@ -1,119 +1,324 @@
+import os
+
 import frappe
+import numpy as np
 import pandas as pd
-import os
+from frappe import _
+from frappe.utils import cint
+
+from red_crescent.file_chunks import iter_frames
+
+UPLOAD_DOCTYPE = "Sector Severity Upload"
+PARENT_DOCTYPE = "District Sectoral Needs"
+CHILD_DOCTYPE = "Sector Severity"
+
+# Errors kept in the status log of a rejected upload
+MAX_LOGGED_ERRORS = 500
+
+# Parents saved per transaction, and how often progress is published
+BATCH_SIZE = 100
+
+COLUMN_MAP = {
+    "ID": "parent",
+    "Sector": "sector",
+    "Total PiN": "total_pin",
+    "Boys (0-17)": "boys_0_17",
+    "Men (18+)": "men_18_plus",
+    "Girls (0-17)": "girls_0_17",
+    "Women (18+)": "women_18_plus",
+    "Severity": "severity"
+}
+VALUE_FIELDS = ("total_pin", "boys_0_17", "men_18_plus", "girls_0_17", "women_18_plus")
+
 
 @frappe.whitelist()
-def process_sector_file(docname):
-    doc = frappe.get_doc("Sector Severity Upload", docname)
+def process_sector_file(docname, dry_run=0, column_mapping=None):
+    """Queue the upload; rows are written by `run_upload` in a background job.
+
+    With `dry_run` the file is only validated and the error report returned.
+    `column_mapping` ({"File header": "fieldname"}) overrides COLUMN_MAP for
+    this upload.
+    """
+    doc = frappe.get_doc(UPLOAD_DOCTYPE, docname)
+    doc.check_permission("write")
 
     if not doc.upload_file:
-        frappe.throw("Please upload an Excel file first.")
+        frappe.throw(_("Please upload an Excel file first."))
 
-    path = frappe.get_site_path("public", "files", os.path.basename(doc.upload_file))
-    log = [f"📁 File path: {path}"]
+    if cint(dry_run):
+        return validate_sector_file(docname, column_mapping=column_mapping)
+
+    frappe.db.set_value(UPLOAD_DOCTYPE, docname, "status_log", "⏳ Queued for processing")
+    frappe.enqueue(
+        "red_crescent.sector_severity_upload.sector_severity_upload.run_upload",
+        queue="long",
+        timeout=3600,
+        job_id=f"sector_severity_upload::{docname}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        docname=docname,
+        column_mapping=column_mapping,
+    )
+    return {"queued": True}
+
+
+# ------------------------------- Helpers ------------------------------- #
+
+def get_severity_options():
+    field = frappe.get_meta(CHILD_DOCTYPE).get_field("severity")
+    if not field or not field.options:
+        return []
+    return [opt.strip() for opt in field.options.split("\n") if opt.strip()]
+
+
+def safe_int(value):
+    try:
+        return int(float(value))
+    except (ValueError, TypeError):
+        return None
+
+
+def safe_str(value):
+    return str(value).strip() if pd.notna(value) else ""
+
+
+def normalize_severity(value, severity_options):
+    if pd.isna(value):
+        return ""
+    try:
+        normalized = str(int(float(value))).strip()
+    except Exception:
+        normalized = safe_str(value)
+    return normalized if normalized in severity_options else ""
+
+
+def file_path(doc):
+    return frappe.get_site_path("public", "files", os.path.basename(doc.upload_file))
+
+
+def get_column_map(column_mapping=None):
+    """COLUMN_MAP overridden by the mapping passed with the call."""
+    column_map = dict(COLUMN_MAP)
+    if column_mapping:
+        mapping = frappe.parse_json(column_mapping)
+        unknown = set(mapping.values()) - set(COLUMN_MAP.values())
+        if unknown:
+            frappe.throw(_("Unknown fields in column mapping: {0}").format(", ".join(sorted(unknown))))
+        # A field can only come from one header
+        column_map = {src: col for src, col in column_map.items() if col not in mapping.values()}
+        column_map.update(mapping)
+    return column_map
+
+
+# ------------------------------- Validation ------------------------------- #
+
+def _text(series):
+    return series.where(series.notna(), "").astype(str).str.strip()
+
+
+def validate_frame(df, severity_options, column_map=None, first_row=1, known_parents=None):
+    """Validate a chunk of an upload at once; returns [{row, column, error}].
+
+    `known_parents` ({id: exists}) carries parent lookups across chunks.
+    """
+    column_map = column_map or COLUMN_MAP
+    missing = [src for src, col in column_map.items() if col not in df.columns]
+    if missing:
+        return [{"row": None, "column": src, "error": _("Missing column")} for src in missing]
+
+    errors = []
+
+    def add(mask, column, message):
+        for pos in np.flatnonzero(mask.to_numpy()):
+            errors.append({"row": int(pos) + first_row, "column": column, "error": message})
 
+    source = {col: src for src, col in column_map.items()}
+    parent, sector = _text(df["parent"]), _text(df["sector"])
+    add(parent == "", source["parent"], _("Missing parent ID"))
+    add(sector == "", source["sector"], _("Missing sector"))
+
+    # Same rules as safe_int: blank is allowed, anything non-numeric is not
+    for field in VALUE_FIELDS:
+        numbers = pd.to_numeric(df[field], errors="coerce")
+        add(df[field].notna() & ~np.isfinite(numbers), source[field], _("Not a number"))
+
+    if severity_options:
+        severity = _text(df["severity"])
+        numbers = pd.to_numeric(df["severity"], errors="coerce")
+        numeric = np.isfinite(numbers)
+        severity[numeric] = numbers[numeric].astype("int64").astype(str)
+        add(df["severity"].notna() & ~severity.isin(severity_options), source["severity"], _("Not a valid severity"))
+
+    known_parents = {} if known_parents is None else known_parents
+    ids = [p for p in parent.unique() if p and p not in known_parents]
+    if ids:
+        found = set(frappe.get_all(PARENT_DOCTYPE, filters={"name": ["in", ids]}, pluck="name"))
+        known_parents.update((p, p in found) for p in ids)
+    existing = [p for p, exists in known_parents.items() if exists]
+    add((parent != "") & ~parent.isin(existing), source["parent"], _("{0} not found").format(PARENT_DOCTYPE))
+
+    errors.sort(key=lambda e: e["row"])
+    return errors
+
+
+def format_errors(errors):
+    lines = [
+        f"❌ Row {e['row']} | {e['column']}: {e['error']}" if e["row"] else f"❌ {e['column']}: {e['error']}"
+        for e in errors[:MAX_LOGGED_ERRORS]
+    ]
+    if len(errors) > MAX_LOGGED_ERRORS:
+        lines.append(f"… {len(errors) - MAX_LOGGED_ERRORS} more errors")
+    return lines
+
+
+def scan_file(path, column_map, severity_options):
+    """Validation pass: stream the file chunk by chunk, keeping only errors.
+
+    Returns (rows, errors); nothing from the rows themselves is held.
+    """
+    rows, errors, known_parents = 0, [], {}
+    for first_row, chunk in iter_frames(path, column_map):
+        rows += len(chunk)
+        chunk_errors = validate_frame(chunk, severity_options, column_map, first_row, known_parents)
+        errors.extend(chunk_errors)
+        if chunk_errors and chunk_errors[0]["row"] is None:
+            break
+    return rows, errors
+
+
+@frappe.whitelist()
+def validate_sector_file(docname, column_mapping=None):
+    """Dry run: validate the uploaded file without writing anything."""
+    doc = frappe.get_doc(UPLOAD_DOCTYPE, docname)
+    doc.check_permission("read")
+    if not doc.upload_file:
+        frappe.throw(_("Please upload an Excel file first."))
+
+    rows, errors = scan_file(file_path(doc), get_column_map(column_mapping), get_severity_options())
+    return {"rows": rows, "valid": not errors, "errors": errors}
+
+
+def group_rows(rows, severity_options, log, first_row=1, grouped=None):
+    """{parent: {sector: values}}; a later row for the same sector wins."""
+    grouped = {} if grouped is None else grouped
+    for index, row in enumerate(rows):
+        parent_id = safe_str(row.get("parent"))
+        sector = safe_str(row.get("sector"))
+        if not parent_id or not sector:
+            log.append(f"⚠️ Row {index + first_row} skipped: missing parent or sector")
+            continue
+
+        values = {f: safe_int(row.get(f)) for f in VALUE_FIELDS}
+        values["severity"] = normalize_severity(row.get("severity"), severity_options)
+        grouped.setdefault(parent_id, {})[sector] = values
+    return grouped
+
+
+def apply_sectors(parent, sectors):
+    """Update or append child rows through a sector -> row index."""
+    index = {child.sector: child for child in parent.get("sector") or []}
+    updated = appended = 0
+    for sector, values in sectors.items():
+        child = index.get(sector)
+        if child:
+            child.update(values)
+            updated += 1
+        else:
+            index[sector] = parent.append("sector", {"sector": sector, **values})
+            appended += 1
+    return updated, appended
+
+
+def publish(docname, done, total, description=None):
+    frappe.publish_progress(
+        done * 100 / total if total else 100,
+        title=_("Processing sector severities"),
+        doctype=UPLOAD_DOCTYPE,
+        docname=docname,
+        description=description or _("{0} of {1} districts").format(done, total),
+    )
+
+
+def save_parent(parent_id, sectors, log):
+    frappe.db.savepoint("sector_upload_parent")
     try:
-        df = pd.read_excel(path)
-        log.append(f"✅ File loaded. Rows found: {len(df)}")
+        parent = frappe.get_doc(PARENT_DOCTYPE, parent_id)
+        updated, appended = apply_sectors(parent, sectors)
+        parent.flags.ignore_validate = True
+        parent.flags.ignore_mandatory = True
+        parent.save()
+        log.append(f"💾 {parent_id}: {updated} updated, {appended} appended")
+        return True
     except Exception as e:
-        doc.status_log = f"❌ Error reading Excel file: {e}"
-        doc.save()
-        return
-
-    # Rename Excel columns
-    df = df.rename(columns={
-        "ID": "parent",
-        "Sector": "sector",
-        "Total PiN": "total_pin",
-        "Boys (0-17)": "boys_0_17",
-        "Men (18+)": "men_18_plus",
-        "Girls (0-17)": "girls_0_17",
-        "Women (18+)": "women_18_plus",
-        "Severity": "severity"
-    })
-
-    # Get severity field options from child table
-    child_table_doctype = "Sector Severity"  # Replace with your actual child table DocType
-    severity_options = []
+        frappe.db.rollback(save_point="sector_upload_parent")
+        log.append(f"❌ Error saving {parent_id}: {e}")
+        return False
+
+
+def write_file(docname, path, column_map, severity_options, total_rows, log):
+    """Write pass: stream the file again and save the parents of each chunk.
+
+    Only one chunk is grouped at a time. The parent of a chunk's last row may
+    continue in the next chunk, so it is carried over instead of being saved
+    twice; a parent whose rows are scattered through the file is saved once
+    per run, in file order, so the last row for a sector still wins.
+    """
+    saved = failed = done = 0
+    carry = {}
+
+    def flush(grouped):
+        nonlocal saved, failed
+        for parent_id, sectors in grouped.items():
+            if save_parent(parent_id, sectors, log):
+                saved += 1
+            else:
+                failed += 1
+            if (saved + failed) % BATCH_SIZE == 0:
+                frappe.db.commit()
+                publish(docname, done, total_rows, _("{0} of {1} rows").format(done, total_rows))
+
+    for first_row, chunk in iter_frames(path, column_map):
+        records = chunk.to_dict(orient="records")
+        grouped = group_rows(records, severity_options, log, first_row, carry)
+        last = safe_str(records[-1].get("parent")) if records else ""
+        carry = {last: grouped.pop(last)} if last in grouped else {}
+        done += len(records)
+        flush(grouped)
+
+    flush(carry)
+    frappe.db.commit()
+    publish(docname, total_rows, total_rows, _("{0} of {1} rows").format(total_rows, total_rows))
+    return saved, failed
+
+
+# ------------------------------- Job ------------------------------- #
+
+def run_upload(docname, column_mapping=None):
+    doc = frappe.get_doc(UPLOAD_DOCTYPE, docname)
+    path = file_path(doc)
+    log = [f"📁 File path: {path}"]
+
     try:
-        meta = frappe.get_meta(child_table_doctype)
-        severity_field = meta.get_field("severity")
-        if severity_field and severity_field.options:
-            severity_options = [opt.strip() for opt in severity_field.options.split("\n") if opt.strip()]
+        column_map = get_column_map(column_mapping)
+        severity_options = get_severity_options()
+        rows, errors = scan_file(path, column_map, severity_options)
+        log.append(f"✅ File read. Rows found: {rows}")
+        if errors:
+            log.append(f"⛔ File rejected: {len(errors)} errors, nothing was written.")
+            log.extend(format_errors(errors))
+        else:
+            saved, failed = write_file(docname, path, column_map, severity_options, rows, log)
+            log.append(f"\n✅ Done: {saved} districts saved, {failed} failed.")
     except Exception as e:
-        log.append(f"⚠️ Could not fetch severity options: {e}")
-
-    def safe_int(value):
-        try:
-            return int(float(value))
-        except (ValueError, TypeError):
-            return None
-
-    def safe_str(value):
-        return str(value).strip() if pd.notna(value) else ""
-
-    def normalize_severity(value):
-        if pd.isna(value):
-            return ""
-        try:
-            normalized = str(int(float(value))).strip()
-        except Exception:
-            normalized = safe_str(value)
-        return normalized if normalized in severity_options else ""
-
-    for index, row in enumerate(df.to_dict(orient="records")):
-        try:
-            parent_id = safe_str(row.get("parent"))
-            sector = safe_str(row.get("sector"))
-            severity = normalize_severity(row.get("severity"))
-
-            log.append(f"\n➡️ Row {index + 1} | Parent: {parent_id} | Sector: {sector}")
-
-            if not parent_id or not sector:
-                log.append("⚠️ Skipped row: missing parent or sector")
-                continue
-
-            parent = frappe.get_doc("District Sectoral Needs", parent_id)
-            updated = False
-
-            for child in parent.get("sector") or []:
-                if child.sector == sector:
-                    child.total_pin = safe_int(row["total_pin"])
-                    child.boys_0_17 = safe_int(row["boys_0_17"])
-                    child.men_18_plus = safe_int(row["men_18_plus"])
-                    child.girls_0_17 = safe_int(row["girls_0_17"])
-                    child.women_18_plus = safe_int(row["women_18_plus"])
-                    child.severity = severity
-                    updated = True
-                    log.append("🔄 Updated existing child row.")
-                    break
-
-            if not updated:
-                try:
-                    parent.append("sector", {
-                        "sector": sector,
-                        "total_pin": safe_int(row["total_pin"]),
-                        "boys_0_17": safe_int(row["boys_0_17"]),
-                        "men_18_plus": safe_int(row["men_18_plus"]),
-                        "girls_0_17": safe_int(row["girls_0_17"]),
-                        "women_18_plus": safe_int(row["women_18_plus"]),
-                        "severity": severity
-                    })
-                    log.append("➕ Appended new child row.")
-                except Exception as e:
-                    log.append(f"❌ Error appending new child row: {e}")
-                    continue
-
-            parent.flags.ignore_validate = True
-            parent.flags.ignore_mandatory = True
-            parent.save()
-            frappe.db.commit()
-            log.append("💾 Saved and committed to DB.")
-
-        except frappe.DoesNotExistError:
-            log.append(f"❌ Parent record not found: {parent_id}")
-        except Exception as e:
-            log.append(f"❌ Error processing row {index + 1}: {e}")
-
-    doc.status_log = "\n".join(log)
-    doc.save()
\ No newline at end of file
+        frappe.db.rollback()
+        log.append(f"❌ Error processing file: {e}")
+        frappe.log_error(title=f"Sector Severity Upload {docname}")
+
+    frappe.db.set_value(UPLOAD_DOCTYPE, docname, "status_log", "\n".join(log))
+    frappe.db.commit()
+    frappe.publish_realtime(
+        "sector_severity_upload_done",
+        {"docname": docname},
+        doctype=UPLOAD_DOCTYPE,
+        docname=docname,
+    )
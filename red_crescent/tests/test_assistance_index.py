@@ -0,0 +1,91 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.assistance_index import assistance_rows
+
+
+def distribution(**kwargs):
+	return frappe._dict(
+		doctype="Relief Distribution",
+		name="RD-0001",
+		distribution_date="2026-01-10",
+		modality="In-kind",
+		programme_activity="PA-01",
+		donor="ECHO",
+		lines=[
+			frappe._dict(name="row-1", beneficiary="BEN-1", item_name="Food Basket", qty=2, total_cost=50),
+			frappe._dict(name="row-2", beneficiary=None, item_name="Food Basket", qty=1, total_cost=25),
+			frappe._dict(name="row-3", beneficiary="BEN-2", item_name="Hygiene Kit", qty=1, modality="Voucher"),
+		],
+		**kwargs,
+	)
+
+
+class TestAssistanceRows(FrappeTestCase):
+	def test_table_lines(self):
+		rows = assistance_rows(distribution())
+		self.assertEqual([r["beneficiary"] for r in rows], ["BEN-1", "BEN-2"])
+		first = rows[0]
+		self.assertEqual(first["assistance_date"], "2026-01-10")
+		self.assertEqual((first["item"], first["qty"], first["amount"]), ("Food Basket", 2, 50))
+		self.assertEqual((first["programme_activity"], first["donor"]), ("PA-01", "ECHO"))
+		self.assertEqual((first["source_doctype"], first["source_name"], first["source_row"]), ("Relief Distribution", "RD-0001", "row-1"))
+
+	def test_line_fields_win_over_header_fields(self):
+		rows = assistance_rows(distribution())
+		self.assertEqual([r["modality"] for r in rows], ["In-kind", "Voucher"])
+		self.assertEqual(rows[1]["amount"], 0)
+
+	def test_single_beneficiary_document(self):
+		doc = frappe._dict(
+			doctype="Cash Transfer Request",
+			name="CTR-0001",
+			beneficiary="BEN-3",
+			request_date="2026-02-01",
+			transfer_method="Mobile Money",
+			amount=100,
+			status="Approved",
+		)
+		(row,) = assistance_rows(doc)
+		self.assertEqual((row["beneficiary"], row["modality"], row["item"]), ("BEN-3", "Mobile Money", "Cash Transfer"))
+		self.assertEqual((row["qty"], row["amount"], row["source_row"]), (0, 100, None))
+
+	def test_undelivered_statuses_are_not_indexed(self):
+		doc = frappe._dict(
+			doctype="Intervention",
+			name="INT-0001",
+			distributions=[frappe._dict(name="row-1", beneficiary="BEN-1", item_name="Tent", qty=1)],
+		)
+		for status in ("Planned", "On Hold", "Cancelled", None):
+			self.assertEqual(assistance_rows(frappe._dict(doc, status=status)), [], status)
+		for status in ("Ongoing", "Completed"):
+			self.assertEqual(len(assistance_rows(frappe._dict(doc, status=status))), 1, status)
+
+	def test_cash_transfer_statuses(self):
+		doc = frappe._dict(doctype="Cash Transfer Request", name="CTR-0002", beneficiary="BEN-3", amount=100)
+		for status in ("Draft", "Under Review", "Rejected"):
+			self.assertEqual(assistance_rows(frappe._dict(doc, status=status)), [], status)
+		for status in ("Approved", "Disbursed"):
+			self.assertEqual(len(assistance_rows(frappe._dict(doc, status=status))), 1, status)
+
+	def test_shelter_head_and_occupants(self):
+		doc = frappe._dict(
+			doctype="Emergency Shelter Assignment",
+			name="ESA-0001",
+			beneficiary="BEN-1",
+			assignment_status="Active",
+			check_in="2026-03-01",
+			shelter_type="Tent",
+			occupants=[
+				frappe._dict(name="occ-1", beneficiary="BEN-1", relationship="Head"),
+				frappe._dict(name="occ-2", beneficiary="BEN-2", relationship="Spouse"),
+				frappe._dict(name="occ-3", beneficiary=None, relationship="Child"),
+			],
+		)
+		rows = assistance_rows(doc)
+		self.assertEqual([(r["beneficiary"], r["source_row"]) for r in rows], [("BEN-1", None), ("BEN-2", "occ-2")])
+		self.assertEqual({(r["modality"], r["item"], r["assistance_date"]) for r in rows}, {("Shelter", "Tent", "2026-03-01")})
+		self.assertEqual(assistance_rows(frappe._dict(doc, assignment_status="Planned")), [])
@@ -0,0 +1,104 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.beneficiary_dedup import (
+	check_duplicates,
+	keys_for,
+	name_key,
+	normalize_national_id,
+	normalize_phone,
+	score,
+)
+
+RECORD = {
+	"full_name": "Mohammed Ali Saleh",
+	"phone_number": "+967 777 123 456",
+	"date_of_birth": "1990-01-01",
+	"district": "Crater",
+	"gender": "Male",
+}
+
+
+def with_keys(record):
+	return {**record, **keys_for(record)}
+
+
+class TestBlockingKeys(FrappeTestCase):
+	def test_normalize_phone_prefixes(self):
+		for phone in ("+967 777 123 456", "00967777123456", "0777123456", "777-123-456"):
+			self.assertEqual(normalize_phone(phone), "777123456", phone)
+
+	def test_normalize_phone_arabic_digits(self):
+		self.assertEqual(normalize_phone("٠٧٧٧١٢٣٤٥٦"), "777123456")
+
+	def test_normalize_phone_rejects_short_numbers(self):
+		self.assertIsNone(normalize_phone("12345"))
+		self.assertIsNone(normalize_phone(None))
+
+	def test_national_id_keeps_letters(self):
+		self.assertEqual(normalize_national_id("A-123 456"), "a123456")
+		self.assertEqual(normalize_national_id("a123456"), normalize_national_id("A 123-456"))
+		self.assertNotEqual(normalize_national_id("A123456"), normalize_national_id("B123456"))
+		self.assertEqual(normalize_national_id("٠١٢٣٤٥٦"), "0123456")
+
+	def test_national_id_placeholders_have_no_key(self):
+		for national_id in (None, "", "N/A", "-", "0", "0000000", "Unknown", "لا يوجد", "12"):
+			self.assertIsNone(normalize_national_id(national_id), national_id)
+
+	def test_name_key_spelling_variants(self):
+		key = name_key("Mohammed bin Ali Al-Hassani", "Crater")
+		self.assertEqual(key, name_key("Mohamed Ali Hasani", "Crater"))
+		self.assertTrue(key.endswith("|Crater"))
+
+	def test_name_key_arabic_particles_and_diacritics(self):
+		self.assertEqual(name_key("مُحَمَّد بن علي الحسني", "Crater"), name_key("محمد علي حسني", "Crater"))
+
+	def test_name_key_needs_two_names(self):
+		self.assertIsNone(name_key("أحمد", "Crater"))
+		self.assertNotEqual(name_key("Ali Saleh", "Crater"), name_key("Ali Saleh", "Sheikh Othman"))
+
+
+class TestScore(FrappeTestCase):
+	def test_same_national_id_is_certain(self):
+		self.assertEqual(score({"dedup_national_id": "0101"}, {"dedup_national_id": "0101"}), (1.0, ["national_id"]))
+
+	def test_identical_records(self):
+		total, reasons = score(with_keys(RECORD), with_keys(RECORD))
+		self.assertEqual(total, 1.0)
+		self.assertEqual(reasons, ["name", "phone", "date_of_birth", "district"])
+
+	def test_gender_mismatch_is_penalised(self):
+		total, _reasons = score(with_keys(RECORD), with_keys({**RECORD, "gender": "Female"}))
+		self.assertAlmostEqual(total, 0.8)
+
+	def test_unrelated_records(self):
+		other = {"full_name": "Fatima Hassan", "phone_number": "733000111", "gender": "Female"}
+		self.assertEqual(score(with_keys(RECORD), with_keys(other)), (0.0, []))
+
+	def test_similar_name_without_other_evidence_stays_below_threshold(self):
+		total, reasons = score({"full_name": "Mohammed Ali Saleh"}, {"full_name": "Mohamed Ali Salih"})
+		self.assertEqual(reasons, ["name"])
+		self.assertLess(total, 0.8)
+
+
+class TestCheckDuplicates(FrappeTestCase):
+	def test_same_national_id_is_recorded_not_rejected(self):
+		doc = frappe._dict(name="BEN-0002", national_id="A123456")
+		doc.as_dict = lambda: {"name": doc.name, "dedup_national_id": "a123456"}
+		candidates = {"BEN-0001": (1.0, ["national_id"])}
+		with (
+			patch("frappe.db", MagicMock()),
+			patch("red_crescent.beneficiary_dedup.find_candidates", return_value=candidates),
+			patch("red_crescent.beneficiary_dedup._reviewed_pairs", return_value=set()),
+			patch("red_crescent.beneficiary_dedup.record_pairs") as record_pairs,
+			patch("frappe.msgprint") as msgprint,
+		):
+			check_duplicates(doc)
+
+		record_pairs.assert_called_once_with({("BEN-0001", "BEN-0002"): (1.0, ["national_id"])})
+		self.assertIn("BEN-0001", msgprint.call_args.args[0])
@@ -0,0 +1,85 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.fulfilment_planner import plan
+
+WAREHOUSES = [
+	frappe._dict(name="Sanaa Store", latitude=15.35, longitude=44.2),
+	frappe._dict(name="Aden Store", latitude=12.8, longitude=45.03),
+	frappe._dict(name="Unlocated Store", latitude=None, longitude=None),
+]
+CENTRES = ({"Sanaa City": (15.36, 44.19)}, {"Aden": (12.8, 45.0)})
+
+
+def line(request, item_code, need, priority="Medium", district="Sanaa City", governorate="Amanat Al Asimah", **kw):
+	return frappe._dict(
+		request=request,
+		item_code=item_code,
+		need=need,
+		priority=priority,
+		district=district,
+		governorate=governorate,
+		needed_by=kw.get("needed_by"),
+		needed_by_date=None,
+		creation=kw.get("creation", "2026-01-01 08:00:00"),
+		item_description=item_code,
+	)
+
+
+def run(lines, supply):
+	with (
+		patch("red_crescent.fulfilment_planner._open_lines", return_value=lines),
+		patch("red_crescent.fulfilment_planner._supply", return_value=supply),
+		patch("red_crescent.fulfilment_planner._centres", return_value=CENTRES),
+		patch("frappe.get_all", return_value=WAREHOUSES),
+	):
+		return plan("2026-01-15")
+
+
+def shipped(result):
+	return {
+		(d["resource_request"], d["from_warehouse"]): [(i["item_code"], i["qty"]) for i in d["items"]]
+		for d in result["dispatches"]
+	}
+
+
+class TestPlan(FrappeTestCase):
+	def test_nearest_warehouse_first(self):
+		result = run([line("RR-1", "Rice", 40)], {"Rice": {"Sanaa Store": 30, "Aden Store": 50}})
+		self.assertEqual(
+			shipped(result), {("RR-1", "Sanaa Store"): [("Rice", 30)], ("RR-1", "Aden Store"): [("Rice", 10)]}
+		)
+		self.assertEqual(result["unmet"], [])
+
+	def test_priority_is_served_first(self):
+		result = run(
+			[line("RR-1", "Rice", 30, priority="Low"), line("RR-2", "Rice", 30, priority="Critical")],
+			{"Rice": {"Sanaa Store": 30}},
+		)
+		self.assertEqual(shipped(result), {("RR-2", "Sanaa Store"): [("Rice", 30)]})
+		self.assertEqual(result["unmet"], [{"resource_request": "RR-1", "item_code": "Rice", "qty": 30}])
+
+	def test_earlier_needed_by_wins_within_a_priority(self):
+		result = run(
+			[line("RR-1", "Oil", 5, needed_by="2026-03-01"), line("RR-2", "Oil", 5, needed_by="2026-02-01")],
+			{"Oil": {"Aden Store": 5}},
+		)
+		self.assertEqual(list(shipped(result)), [("RR-2", "Aden Store")])
+
+	def test_governorate_centre_and_unlocated_warehouses(self):
+		result = run(
+			[line("RR-1", "Rice", 20, district="Crater", governorate="Aden")],
+			{"Rice": {"Unlocated Store": 20, "Aden Store": 5}},
+		)
+		first, second = result["dispatches"]
+		self.assertEqual(first["from_warehouse"], "Aden Store")
+		self.assertLess(first["distance_km"], 10)
+		self.assertEqual((second["from_warehouse"], second["distance_km"]), ("Unlocated Store", None))
+
+	def test_nothing_open(self):
+		self.assertEqual(run([], {}), {"dispatches": [], "unmet": []})
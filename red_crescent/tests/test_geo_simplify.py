@@ -0,0 +1,62 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+import math
+
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.geo_simplify import find_junctions, resolution_for, simplify_layer, simplify_line
+
+
+def wiggly_border(n=200):
+	return [(1 + 0.01 * math.sin(i * 0.7) + 0.003 * math.cos(i * 2.3), i / n) for i in range(n + 1)]
+
+
+def neighbours():
+	"""Two districts sharing a wiggly border, the second ring starting mid-border."""
+	border = wiggly_border()
+	left = [(0, 0), *border, (0, 1), (0, 0)]
+	right = [border[0], (2, 0), (2, 1), *border[::-1][:-1]]
+	right = [*right[50:], *right[:50], right[50]]
+	return {
+		"A": {"type": "Polygon", "coordinates": [[list(p) for p in left]]},
+		"B": {"type": "Polygon", "coordinates": [[list(p) for p in right]]},
+	}
+
+
+def border_vertices(ring):
+	return {tuple(p) for p in ring if 0.9 < p[0] < 1.1}
+
+
+class TestGeoSimplify(FrappeTestCase):
+	def test_simplify_line(self):
+		self.assertEqual(simplify_line([[0, 0], [1, 0.001], [2, 0]], 0.01), [[0, 0], [2, 0]])
+		self.assertEqual(simplify_line([[0, 0], [1, 1], [2, 0]], 0.01), [[0, 0], [1, 1], [2, 0]])
+		self.assertEqual(simplify_line([[0, 0], [1, 1]], 0.01), [[0, 0], [1, 1]])
+
+	def test_simplify_line_keeps_points_beyond_tolerance(self):
+		points = [[i / 10, math.sin(i / 3)] for i in range(60)]
+		kept = simplify_line(points, 0.05)
+		self.assertLess(len(kept), len(points))
+		self.assertEqual((kept[0], kept[-1]), (points[0], points[-1]))
+
+	def test_junctions_are_where_borders_part(self):
+		geometries = neighbours()
+		border = wiggly_border()
+		self.assertEqual(find_junctions(geometries.values()), {border[0], border[-1]})
+
+	def test_shared_border_keeps_the_same_vertices(self):
+		for tolerance in (0.02, 0.005):
+			shapes = simplify_layer(neighbours(), tolerance, 5)
+			left, right = shapes["A"]["coordinates"][0], shapes["B"]["coordinates"][0]
+			self.assertLess(len(left), 200)
+			self.assertEqual(left[0], left[-1])
+			self.assertEqual(border_vertices(left), border_vertices(right))
+
+	def test_resolution_for(self):
+		self.assertEqual(resolution_for(5), "low")
+		self.assertEqual(resolution_for(8), "medium")
+		self.assertEqual(resolution_for(11), "high")
+		self.assertEqual(resolution_for(14), "full")
+		self.assertEqual(resolution_for(None, "medium"), "medium")
+		self.assertEqual(resolution_for(None, "bogus"), "full")
@@ -0,0 +1,48 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+import datetime
+import gzip
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.geojson_stream import FeatureWriter, decode_cursor, encode_cursor, page_length_for
+
+
+class TestGeoJSONStream(FrappeTestCase):
+	def test_cursor_round_trip(self):
+		modified = datetime.datetime(2025, 3, 1, 12, 30, 5, 123456)
+		cursor = encode_cursor(modified, "ADDR-0001")
+		self.assertNotIn("=", cursor)
+		self.assertEqual(decode_cursor(cursor), (str(modified), "ADDR-0001"))
+
+	def test_cursor_keeps_none_and_unicode(self):
+		cursor = encode_cursor("2025-01-01", "صنعاء", None)
+		self.assertEqual(decode_cursor(cursor, size=3), ("2025-01-01", "صنعاء", None))
+
+	def test_empty_cursor_is_first_page(self):
+		self.assertIsNone(decode_cursor(None))
+		self.assertIsNone(decode_cursor(""))
+
+	def test_invalid_cursor_throws(self):
+		for cursor in ("not-a-cursor", encode_cursor("only-one"), encode_cursor("a", "b", "c")):
+			with self.assertRaises(frappe.ValidationError):
+				decode_cursor(cursor)
+
+	def test_page_length_for(self):
+		self.assertEqual(page_length_for(None), 5000)
+		self.assertEqual(page_length_for(0), 5000)
+		self.assertEqual(page_length_for(-5), 1)
+		self.assertEqual(page_length_for(10**6), 20000)
+
+	def test_feature_writer(self):
+		for gzipped in (False, True):
+			writer = FeatureWriter(gzipped=gzipped)
+			writer.write({"type": "Feature", "geometry": None, "properties": {"name": "A"}})
+			writer.write({"type": "Feature", "geometry": None, "properties": {"name": "B"}})
+			body = writer.close(next_cursor="abc", count=writer.count)
+			data = json.loads(gzip.decompress(body) if gzipped else body)
+			self.assertEqual([f["properties"]["name"] for f in data["features"]], ["A", "B"])
+			self.assertEqual((data["next_cursor"], data["count"]), ("abc", 2))
@@ -0,0 +1,55 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.relief_allocation import allocate
+
+BATCHES = [
+	frappe._dict(name="rice-jun", item_code="Rice", expiry_date="2026-06-30", available=40),
+	frappe._dict(name="rice-mar", item_code="Rice", expiry_date="2026-03-31", available=30),
+	frappe._dict(name="rice-old", item_code="Rice", expiry_date="2025-12-31", available=100),
+	frappe._dict(name="rice-undated", item_code="Rice", expiry_date=None, available=50),
+	frappe._dict(name="oil-sep", item_code="Oil", expiry_date="2026-09-30", available=10),
+]
+
+
+def run(lines, batches=BATCHES, **kwargs):
+	with patch("red_crescent.relief_allocation._batches", return_value=batches):
+		return allocate("Aden Warehouse", lines, on_date="2026-01-15", **kwargs)
+
+
+class TestAllocate(FrappeTestCase):
+	def test_first_expiry_first_out(self):
+		((picks, shortfall),) = run([("Rice", 50, None)])
+		self.assertEqual(picks, [("rice-mar", "2026-03-31", 30), ("rice-jun", "2026-06-30", 20)])
+		self.assertEqual(shortfall, 0)
+
+	def test_skips_expired_and_takes_undated_last(self):
+		((picks, shortfall),) = run([("Rice", 100, None)])
+		self.assertEqual([p[0] for p in picks], ["rice-mar", "rice-jun", "rice-undated"])
+		self.assertEqual(picks[-1], ("rice-undated", None, 30))
+		self.assertEqual(shortfall, 0)
+
+	def test_shortfall(self):
+		((picks, shortfall),) = run([("Oil", 25, None)])
+		self.assertEqual(picks, [("oil-sep", "2026-09-30", 10)])
+		self.assertEqual(shortfall, 15)
+
+	def test_explicit_batch_is_served_before_fefo(self):
+		fefo, dated = run([("Rice", 30, None), ("Rice", 20, "2026-03-31")])
+		self.assertEqual(dated, ([("rice-mar", "2026-03-31", 20)], 0))
+		self.assertEqual(fefo[0], [("rice-mar", "2026-03-31", 10), ("rice-jun", "2026-06-30", 20)])
+
+	def test_lines_share_the_same_batches(self):
+		first, second = run([("Oil", 6, None), ("Oil", 6, None)])
+		self.assertEqual(first, ([("oil-sep", "2026-09-30", 6)], 0))
+		self.assertEqual(second, ([("oil-sep", "2026-09-30", 4)], 2))
+
+	def test_credit_adds_back_held_stock(self):
+		((picks, shortfall),) = run([("Oil", 12, None)], credit={"oil-sep": 2})
+		self.assertEqual(picks, [("oil-sep", "2026-09-30", 12)])
+		self.assertEqual(shortfall, 0)
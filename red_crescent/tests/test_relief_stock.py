@@ -0,0 +1,119 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.relief_stock import balance_key, post, post_voucher, reconcile_stock, reverse_voucher
+
+WAREHOUSE = "Aden Warehouse"
+EXPIRY = "2026-06-30"
+
+
+class FakeDB:
+	"""Relief Stock Balance rows and ledger entries kept in memory."""
+
+	def __init__(self, balances=None):
+		self.balances = {balance_key(*key): qty for key, qty in (balances or {}).items()}
+		self.entries = []
+		self.stock = []
+
+	def sql(self, query, values=None, as_dict=False):
+		if "INSERT INTO `tabRelief Stock Balance`" in query:
+			self.balances[values["name"]] = self.balances.get(values["name"], 0) + values["change"]
+		elif "FROM `tabRelief Stock Ledger Entry`" in query:
+			grouped = {}
+			for e in self.entries:
+				if (e["voucher_type"], e["voucher_no"]) == values:
+					key = (e["warehouse"], e["item_code"], e["expiry_date"])
+					grouped[key] = grouped.get(key, 0) + e["qty_change"]
+			return [
+				frappe._dict(warehouse=w, item_code=i, expiry_date=x, qty=qty)
+				for (w, i, x), qty in grouped.items()
+			]
+		elif "UPDATE `tabRelief Item Stock`" in query:
+			self.stock.append(values)
+		return []
+
+	def get_value(self, doctype, name, fieldname):
+		return self.balances.get(name)
+
+	def bulk_insert(self, doctype, fields, values):
+		self.entries.extend(dict(zip(fields, row, strict=True)) for row in values)
+
+	def balance(self, item_code, expiry_date=EXPIRY):
+		return self.balances.get(balance_key(WAREHOUSE, item_code, expiry_date), 0)
+
+
+def dispatch(qty, item_code="Rice", status="Dispatched"):
+	return frappe._dict(
+		doctype="Relief Dispatch",
+		name="DISP-0001",
+		from_warehouse=WAREHOUSE,
+		status=status,
+		dispatch_items=[frappe._dict(item_code=item_code, quantity_dispatched=qty, expiry_date=EXPIRY)],
+	)
+
+
+class TestReliefStock(FrappeTestCase):
+	def setUp(self):
+		self.db = FakeDB({(WAREHOUSE, "Rice", EXPIRY): 100})
+		patcher = patch("frappe.db", self.db)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_resave_posts_only_the_difference(self):
+		post_voucher(dispatch(30))
+		post_voucher(dispatch(45))
+		post_voucher(dispatch(45))
+
+		self.assertEqual([e["qty_change"] for e in self.db.entries], [-30, -15])
+		self.assertEqual(self.db.entries[-1]["qty_after"], 55)
+		self.assertEqual(self.db.balance("Rice"), 55)
+
+	def test_draft_posts_nothing(self):
+		post_voucher(dispatch(30, status="Draft"))
+		self.assertEqual(self.db.entries, [])
+		self.assertEqual(self.db.balance("Rice"), 100)
+
+	def test_delete_reverses_posted_lines(self):
+		post_voucher(dispatch(30))
+		post_voucher(dispatch(45))
+		reverse_voucher(dispatch(45))
+
+		self.assertEqual(self.db.entries[-1]["qty_change"], 45)
+		self.assertEqual(sum(e["qty_change"] for e in self.db.entries), 0)
+		self.assertEqual(self.db.balance("Rice"), 100)
+
+	def test_negative_balance_throws(self):
+		with self.assertRaises(frappe.ValidationError):
+			post_voucher(dispatch(130))
+		self.assertEqual(self.db.entries, [])
+
+	def test_negative_balance_allowed_without_check(self):
+		post("Relief Dispatch", "DISP-0001", {(WAREHOUSE, "Rice", EXPIRY): -130}, check=False)
+		self.assertEqual(self.db.balance("Rice"), -30)
+
+	def test_stock_count_posts_adjustment(self):
+		count = frappe._dict(
+			doctype="Relief Item Stock",
+			name="STK-0001",
+			storage_location=WAREHOUSE,
+			item_code="Rice",
+			expiry_date=EXPIRY,
+			quantity_available=85,
+		)
+		reconcile_stock(count)
+
+		(entry,) = self.db.entries
+		self.assertEqual(
+			(entry["voucher_type"], entry["qty_change"], entry["qty_after"]), ("Relief Item Stock", -15, 85)
+		)
+		self.assertEqual(self.db.balance("Rice"), 85)
+		self.assertEqual(self.db.stock[0][0], 85)
+
+		# A count matching the balance posts nothing
+		reconcile_stock(count)
+		self.assertEqual(len(self.db.entries), 1)
@@ -0,0 +1,129 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.vector_tiles import EXTENT, LAYER, encode_tile
+
+SQUARE = [[44, 14], [46, 14], [46, 16], [44, 16], [44, 14]]
+HOLE = [[44.5, 14.5], [44.5, 15.5], [45.5, 15.5], [45.5, 14.5], [44.5, 14.5]]
+
+
+def read_varint(data, pos):
+	shift = value = 0
+	while True:
+		b = data[pos]
+		pos += 1
+		value |= (b & 0x7F) << shift
+		shift += 7
+		if not b & 0x80:
+			return value, pos
+
+
+def read_message(data):
+	"""{field: [value, ...]} of a protobuf message (varint and length fields)."""
+	fields, pos = {}, 0
+	while pos < len(data):
+		key, pos = read_varint(data, pos)
+		field, wire = key >> 3, key & 7
+		if wire == 0:
+			value, pos = read_varint(data, pos)
+		elif wire == 2:
+			size, pos = read_varint(data, pos)
+			value, pos = data[pos : pos + size], pos + size
+		elif wire == 1:
+			value, pos = data[pos : pos + 8], pos + 8
+		else:
+			raise AssertionError(f"unexpected wire type {wire}")
+		fields.setdefault(field, []).append(value)
+	return fields
+
+
+def read_packed(data):
+	values, pos = [], 0
+	while pos < len(data):
+		value, pos = read_varint(data, pos)
+		values.append(value)
+	return values
+
+
+def unzigzag(n):
+	return (n >> 1) ^ -(n & 1)
+
+
+def decode_rings(commands):
+	"""Rings of tile coordinates from MVT geometry commands."""
+	rings, ring, x, y, i = [], [], 0, 0, 0
+	while i < len(commands):
+		command, count = commands[i] & 7, commands[i] >> 3
+		i += 1
+		if command == 7:
+			rings.append(ring)
+			ring = []
+			continue
+		for _ in range(count):
+			x += unzigzag(commands[i])
+			y += unzigzag(commands[i + 1])
+			ring.append((x, y))
+			i += 2
+	return rings
+
+
+def signed_area(ring):
+	return sum(ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1] for i in range(len(ring))) / 2
+
+
+def decode_layer(tile):
+	layer = read_message(read_message(tile)[3][0])
+	keys = [k.decode() for k in layer[3]]
+	values = [read_message(v) for v in layer[4]]
+	return layer, keys, values
+
+
+class TestVectorTiles(FrappeTestCase):
+	def test_exterior_clockwise_and_holes_counter_clockwise(self):
+		for ring in (SQUARE, SQUARE[::-1]):
+			tile = encode_tile(
+				[(1, {"type": "Polygon", "coordinates": [ring, HOLE]}, {"district": "D1"})], 4, 10, 7
+			)
+			layer, _keys, _values = decode_layer(tile)
+			feature = read_message(layer[2][0])
+			exterior, hole = decode_rings(read_packed(feature[4][0]))
+
+			# Spec 2.1: exterior rings have positive area in y-down tile space
+			self.assertGreater(signed_area(exterior), 0)
+			self.assertLess(signed_area(hole), 0)
+
+	def test_round_trip(self):
+		tile = encode_tile(
+			[
+				(7, {"type": "Polygon", "coordinates": [SQUARE]}, {"district": "D1", "max_severity": 4}),
+				(8, {"type": "Point", "coordinates": [45, 15]}, {"district": "D2"}),
+			],
+			4,
+			10,
+			7,
+		)
+		layer, keys, values = decode_layer(tile)
+
+		self.assertEqual(layer[1][0].decode(), LAYER)
+		self.assertEqual(layer[5], [EXTENT])
+		self.assertEqual(len(layer[2]), 1)  # non-polygon features are dropped
+
+		feature = read_message(layer[2][0])
+		self.assertEqual(feature[1], [7])
+		self.assertEqual(feature[3], [3])  # POLYGON
+		tags = read_packed(feature[2][0])
+		props = {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2], strict=True)}
+		self.assertEqual(props["district"][1][0].decode(), "D1")
+		self.assertEqual(props["max_severity"][5], [4])
+
+		(ring,) = decode_rings(read_packed(feature[4][0]))
+		self.assertEqual(len(ring), 4)
+		xs, ys = {p[0] for p in ring}, {p[1] for p in ring}
+		# 44°E lies left of this tile, so the ring is clipped to the buffer
+		self.assertEqual(min(xs), -64)
+		self.assertLess(min(ys), max(ys))
+
+	def test_empty_tile(self):
+		self.assertEqual(encode_tile([], 4, 10, 7), b"")
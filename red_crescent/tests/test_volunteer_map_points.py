@@ -0,0 +1,55 @@
+# Copyright (c) 2025, YRCS and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from red_crescent.volunteer_map_points import DEFAULT_AVATAR, full_name, photo_path, project
+
+VOLUNTEER = {
+	"name": "VOL-0001",
+	"firstname": "Amal",
+	"middle_name": None,
+	"last_name": "Saleh",
+	"sex": "Female",
+	"status": "Active",
+	"ns_branch": "Aden",
+	"volunteer_rol": "Volunteer",
+	"volunteer_photo": "/files/amal.jpg",
+	"modified": "2026-01-02 10:00:00",
+}
+
+ADDRESS = {
+	"name": "ADDR-1",
+	"add_type": "Home",
+	"governorate": "Aden",
+	"district": "Crater",
+	"latitude": "12.78",
+	"longitude": "45.03",
+	"modified": "2026-01-03 10:00:00",
+}
+
+
+class TestVolunteerMapPoints(FrappeTestCase):
+	def test_photo_path_is_site_relative(self):
+		self.assertEqual(photo_path("/files/amal.jpg"), "/files/amal.jpg")
+		self.assertEqual(photo_path("amal 1.jpg"), "/files/amal%201.jpg")
+		self.assertEqual(photo_path("https://cdn.example.org/a.jpg"), "https://cdn.example.org/a.jpg")
+		self.assertEqual(photo_path(None), DEFAULT_AVATAR)
+
+	def test_full_name_skips_missing_parts(self):
+		self.assertEqual(full_name(frappe._dict(VOLUNTEER, parent="VOL-0001")), "Amal Saleh")
+		self.assertEqual(full_name(frappe._dict(parent="VOL-0002")), "VOL-0002")
+
+	def test_project(self):
+		point = project(ADDRESS, VOLUNTEER)
+		self.assertEqual(point["address_row"], "ADDR-1")
+		self.assertEqual(point["volunteer"], "VOL-0001")
+		self.assertEqual(point["volunteer_name"], "Amal Saleh")
+		self.assertEqual(point["role"], "Volunteer")
+		self.assertEqual(point["image_url"], "/files/amal.jpg")
+		self.assertEqual((point["latitude"], point["longitude"]), (12.78, 45.03))
+
+	def test_project_skips_rows_without_coordinates(self):
+		self.assertIsNone(project({**ADDRESS, "latitude": ""}, VOLUNTEER))
+		self.assertIsNone(project({**ADDRESS, "longitude": "nan"}, VOLUNTEER))
@@ -0,0 +1,390 @@
+import hashlib
+import math
+import os
+import re
+import shutil
+import struct
+
+import frappe
+from frappe.utils import cint
+from frappe.website.page_renderers.base_renderer import BaseRenderer
+from werkzeug.wrappers import Response
+
+from red_crescent.district_cache import get_districts
+from red_crescent.geo_simplify import get_simplified, resolution_for
+
+# Mapbox Vector Tiles for the district choropleths, served at
+# /tiles/districts/{z}/{x}/{y}.mvt[?sector=...]. Tiles are written to
+# sites/<site>/private/tiles/<generation> and wiped once a change to the
+# underlying data commits; the generation (a Redis stamp) moves at the same
+# time, so a tile built from older data can never be served again.
+
+LAYER = "districts"
+EXTENT = 4096
+BUFFER = 64
+MAX_ZOOM = 16
+
+GENERATION_KEY = "district_tile_generation"
+
+TILE_ROUTE = re.compile(r"^tiles/districts/(\d+)/(\d+)/(\d+)\.mvt$")
+MIMETYPE = "application/vnd.mapbox-vector-tile"
+
+
+# ------------------------------- Protobuf ------------------------------- #
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _key(field, wire):
+    return _varint((field << 3) | wire)
+
+
+def _len_field(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field, values):
+    return _len_field(field, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _key(5, 0) + _varint(value)
+        return _key(6, 0) + _varint(_zigzag(value) & 0xFFFFFFFFFFFFFFFF)
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    return _len_field(1, str(value).encode("utf-8"))
+
+
+# ------------------------------- Geometry ------------------------------- #
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) of a tile in degrees."""
+    n = 2**z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def _project(lng, lat, z, x, y):
+    n = 2**z
+    lat = max(min(lat, 85.0511), -85.0511)
+    px = ((lng + 180) / 360 * n - x) * EXTENT
+    s = math.sin(math.radians(lat))
+    py = ((0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * n - y) * EXTENT
+    return px, py
+
+
+def _clip_ring(points, lo, hi):
+    """Sutherland-Hodgman clip of a ring against the square [lo, hi]."""
+    edges = (
+        (0, lo, False),
+        (0, hi, True),
+        (1, lo, False),
+        (1, hi, True),
+    )
+    for axis, bound, is_max in edges:
+        if not points:
+            break
+
+        def inside(p):
+            return p[axis] <= bound if is_max else p[axis] >= bound
+
+        def cross(a, b):
+            t = (bound - a[axis]) / (b[axis] - a[axis])
+            return (
+                (bound, a[1] + t * (b[1] - a[1])) if axis == 0 else (a[0] + t * (b[0] - a[0]), bound)
+            )
+
+        out = []
+        prev = points[-1]
+        for cur in points:
+            if inside(cur):
+                if not inside(prev):
+                    out.append(cross(prev, cur))
+                out.append(cur)
+            elif inside(prev):
+                out.append(cross(prev, cur))
+            prev = cur
+        points = out
+    return points
+
+
+def _signed_area(ring):
+    """Shoelace area; positive for clockwise rings in tile (y-down) space."""
+    return sum(
+        ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1] for i in range(len(ring))
+    ) / 2
+
+
+def _tile_ring(coords, z, x, y, exterior):
+    pts = [_project(c[0], c[1], z, x, y) for c in coords]
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts.pop()
+    pts = _clip_ring(pts, -BUFFER, EXTENT + BUFFER)
+
+    ring = []
+    for px, py in pts:
+        p = (round(px), round(py))
+        if not ring or ring[-1] != p:
+            ring.append(p)
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring.pop()
+    if len(ring) < 3:
+        return None
+
+    area = _signed_area(ring)
+    if not area:
+        return None
+    # MVT 2.1: exterior rings are clockwise (positive area), holes counter-clockwise.
+    if (area > 0) != exterior:
+        ring.reverse()
+    return ring
+
+
+def _encode_polygons(polygons):
+    cmds, cx, cy = [], 0, 0
+    for rings in polygons:
+        for ring in rings:
+            for i, (px, py) in enumerate(ring):
+                if i == 0:
+                    cmds.append((1 & 7) | (1 << 3))
+                elif i == 1:
+                    cmds.append((2 & 7) | ((len(ring) - 1) << 3))
+                cmds.extend((_zigzag(px - cx), _zigzag(py - cy)))
+                cx, cy = px, py
+            cmds.append((7 & 7) | (1 << 3))
+    return cmds
+
+
+def _tile_polygons(geometry, z, x, y):
+    if geometry["type"] == "Polygon":
+        parts = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        parts = geometry["coordinates"]
+    else:
+        return []
+
+    out = []
+    for rings in parts:
+        if not rings:
+            continue
+        outer = _tile_ring(rings[0], z, x, y, exterior=True)
+        if not outer:
+            continue
+        holes = [h for h in (_tile_ring(r, z, x, y, exterior=False) for r in rings[1:]) if h]
+        out.append([outer, *holes])
+    return out
+
+
+def encode_tile(features, z, x, y):
+    """Encode [(id, geometry, properties)] into one MVT layer."""
+    keys, key_index = [], {}
+    values, value_index = [], {}
+    encoded = []
+
+    for fid, geometry, props in features:
+        polygons = _tile_polygons(geometry, z, x, y)
+        if not polygons:
+            continue
+
+        tags = []
+        for k, v in props.items():
+            if v is None:
+                continue
+            if k not in key_index:
+                key_index[k] = len(keys)
+                keys.append(k)
+            vkey = (type(v).__name__, v)
+            if vkey not in value_index:
+                value_index[vkey] = len(values)
+                values.append(v)
+            tags.extend((key_index[k], value_index[vkey]))
+
+        feature = _key(1, 0) + _varint(fid) + _packed(2, tags) + _key(3, 0) + _varint(3)
+        feature += _packed(4, _encode_polygons(polygons))
+        encoded.append(feature)
+
+    if not encoded:
+        return b""
+
+    layer = _key(15, 0) + _varint(2) + _len_field(1, LAYER.encode("utf-8"))
+    layer += b"".join(_len_field(2, f) for f in encoded)
+    layer += b"".join(_len_field(3, k.encode("utf-8")) for k in keys)
+    layer += b"".join(_len_field(4, _encode_value(v)) for v in values)
+    layer += _key(5, 0) + _varint(EXTENT)
+    return _len_field(3, layer)
+
+
+# ------------------------------- Data ------------------------------- #
+
+def _district_properties(sector=None):
+    sector_cond = "AND s.sector = %(sector)s" if sector else ""
+    severity = frappe.db.sql(
+        f"""
+        SELECT
+            n.district,
+            MAX(CAST(IFNULL(s.severity, 0) AS UNSIGNED)) AS max_severity,
+            SUM(IFNULL(s.total_pin, 0)) AS total_pin_sum
+        FROM `tabSector Severity` s
+        JOIN `tabDistrict Sectoral Needs` n ON n.name = s.parent
+        WHERE s.parenttype = 'District Sectoral Needs' {sector_cond}
+        GROUP BY n.district
+        """,
+        {"sector": sector},
+        as_dict=True,
+    )
+    risks = frappe.db.sql(
+        """
+        SELECT
+            district,
+            MAX(IFNULL(impact, 0) * IFNULL(risk_ranking, 0)) AS risk_severity,
+            COUNT(*) AS risk_count
+        FROM `tabDistrict Risk Profile`
+        GROUP BY district
+        """,
+        as_dict=True,
+    )
+    return {r.district: r for r in severity}, {r.district: r for r in risks}
+
+
+def build_tile(z, x, y, sector=None):
+    west, south, east, north = tile_bounds(z, x, y)
+    pad_x = (east - west) * BUFFER / EXTENT
+    pad_y = (north - south) * BUFFER / EXTENT
+
+    districts = get_districts()
+    severity, risks = _district_properties(sector)
+
+    candidates = []
+    for ref in districts.values():
+        if not ref.geometry or (sector and ref.name not in severity):
+            continue
+        box = ref.bbox
+        if not box or box[0] > east + pad_x or box[2] < west - pad_x or box[1] > north + pad_y or box[3] < south - pad_y:
+            continue
+        candidates.append(ref)
+
+    shapes = get_simplified(
+        "Districts",
+        [(ref.name, ref.modified, ref.geometry) for ref in candidates],
+        resolution_for(z),
+    )
+
+    features = []
+    for fid, ref in enumerate(candidates, start=1):
+        geometry = shapes.get(ref.name)
+        if not geometry:
+            continue
+        sev = severity.get(ref.name) or {}
+        risk = risks.get(ref.name) or {}
+        features.append((fid, geometry, {
+            "district": ref.name,
+            "district_ar": ref.ar_name or ref.name,
+            "governorate": ref.governorate,
+            "dis_pcode": ref.dis_pcode,
+            "max_severity": cint(sev.get("max_severity")),
+            "total_pin_sum": cint(sev.get("total_pin_sum")),
+            "risk_severity": cint(risk.get("risk_severity")),
+            "risk_count": cint(risk.get("risk_count")),
+            "population_total": ref.population_total,
+        }))
+    return encode_tile(features, z, x, y)
+
+
+# ------------------------------- Disk cache ------------------------------- #
+
+def tile_root():
+    return frappe.get_site_path("private", "tiles", LAYER)
+
+
+def _generation():
+    generation = frappe.cache().get_value(GENERATION_KEY)
+    if not generation:
+        generation = frappe.generate_hash(length=12)
+        frappe.cache().set_value(GENERATION_KEY, generation)
+    return generation
+
+
+def _tile_path(z, x, y, sector=None):
+    variant = hashlib.md5(sector.encode("utf-8")).hexdigest()[:12] if sector else "all"
+    return os.path.join(tile_root(), _generation(), variant, str(z), str(x), f"{y}.mvt")
+
+
+def get_tile(z, x, y, sector=None):
+    z, x, y = cint(z), cint(x), cint(y)
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z):
+        raise frappe.PageDoesNotExistError
+    # Only real sectors get a cache directory, or any query string could add one
+    if sector and not frappe.db.exists("Sectors", sector):
+        raise frappe.PageDoesNotExistError
+
+    path = _tile_path(z, x, y, sector)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    data = build_tile(z, x, y, sector)
+    if not data:
+        # Most tiles at high zoom are empty; they are cheap to rebuild and
+        # not worth a file each
+        return data
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return data
+
+
+def _clear_tiles():
+    frappe.flags.tile_clear_pending = False
+    frappe.cache().delete_value(GENERATION_KEY)
+    shutil.rmtree(tile_root(), ignore_errors=True)
+
+
+def _cancel_clear():
+    frappe.flags.tile_clear_pending = False
+
+
+def clear_tile_cache(*args, **kwargs):
+    """Doc event: wipe the tiles once the current transaction commits.
+
+    Registered once per transaction, so a bulk upload saving many parents
+    clears the cache once per commit rather than once per row.
+    """
+    if frappe.flags.tile_clear_pending:
+        return
+    frappe.flags.tile_clear_pending = True
+    frappe.db.after_commit.add(_clear_tiles)
+    frappe.db.after_rollback.add(_cancel_clear)
+
+
+class DistrictTileRenderer(BaseRenderer):
+    def can_render(self):
+        return bool(TILE_ROUTE.match(self.path or ""))
+
+    def render(self):
+        z, x, y = TILE_ROUTE.match(self.path).groups()
+        data = get_tile(z, x, y, sector=frappe.form_dict.get("sector") or None)
+        response = Response(data, status=200 if data else 204, mimetype=MIMETYPE)
+        response.headers["Cache-Control"] = "public, max-age=300"
+        return response
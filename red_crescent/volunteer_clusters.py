@@ -0,0 +1,271 @@
+import math
+
+import frappe
+from frappe.utils import cint, flt, get_datetime
+
+from red_crescent.volunteer_map_points import DOCTYPE as POINTS
+from red_crescent.volunteer_map_points import image_url
+
+# Hierarchical cluster index for the volunteers map. Points are bucketed into
+# 64px cells of the Web Mercator grid for every zoom level up to MAX_ZOOM; a
+# cell at zoom z is the union of its four children at z + 1. Each worker keeps
+# the index in memory and replays a change log in Redis (volunteers saved or
+# deleted since its last read), so the index is built once and then patched.
+# Points come from the Volunteer Map Point projection; only active
+# volunteers are counted. Filtered requests (the map page filters) aggregate
+# the matching in-memory entries at the requested zoom.
+
+MAX_ZOOM = 15          # deeper zooms return individual volunteers
+CELL_SHIFT = 2         # 256px tiles / 64px cells = 2 ** 2 cells per tile axis
+
+SEQ_KEY = "volunteer_cluster_seq"
+LOG_KEY = "volunteer_cluster_log"
+LOG_SIZE = 1000
+
+ACTIVE = "Active"
+
+_sites = {}
+
+
+# ------------------------------- Helpers ------------------------------- #
+
+def _mercator(lat, lng):
+    """Project to the unit square (x right, y down)."""
+    lat = max(min(lat, 85.0511), -85.0511)
+    s = math.sin(math.radians(lat))
+    return (lng + 180) / 360, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+
+def _finest_cell(lat, lng):
+    x, y = _mercator(lat, lng)
+    n = 2 ** (MAX_ZOOM + CELL_SHIFT)
+    return min(int(x * n), n - 1), min(int(y * n), n - 1)
+
+
+def _fetch(volunteers=None):
+    cond = "AND p.volunteer IN %(volunteers)s" if volunteers else ""
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            p.name AS row, p.latitude, p.longitude, p.address_type, p.governorate,
+            p.district, p.village, p.home_address, p.volunteer AS volunteer_id,
+            p.volunteer_name AS volunteer, p.sex, p.role, p.image_url,
+            p.volunteer_modified AS modified
+        FROM `tab{POINTS}` p
+        WHERE IFNULL(p.status, %(active)s) = %(active)s
+          {cond}
+        """,
+        {"active": ACTIVE, "volunteers": tuple(volunteers or ())},
+        as_dict=True,
+    )
+
+    out = {}
+    for r in rows:
+        r.latitude, r.longitude = flt(r.latitude), flt(r.longitude)
+        r.cell = _finest_cell(r.latitude, r.longitude)
+        out.setdefault(r.volunteer_id, []).append(r)
+    return out
+
+
+def _apply_one(level, key, entry, sign=1):
+    sex = entry.sex or "Unknown"
+    role = entry.role or "Unknown"
+    cell = level.get(key)
+    if cell is None:
+        cell = level[key] = {"count": 0, "lat": 0.0, "lng": 0.0, "sex": {}, "role": {}}
+    cell["count"] += sign
+    cell["lat"] += sign * entry.latitude
+    cell["lng"] += sign * entry.longitude
+    cell["sex"][sex] = cell["sex"].get(sex, 0) + sign
+    cell["role"][role] = cell["role"].get(role, 0) + sign
+    if cell["count"] <= 0:
+        del level[key]
+
+
+def _apply(levels, entry, sign):
+    ix, iy = entry.cell
+    for z in range(MAX_ZOOM, -1, -1):
+        shift = MAX_ZOOM - z
+        _apply_one(levels[z], (ix >> shift, iy >> shift), entry, sign)
+
+
+# ------------------------------- Index ------------------------------- #
+
+def _current_seq():
+    cache = frappe.cache()
+    return cint(cache.get(cache.make_key(SEQ_KEY)))
+
+
+def _build(seq):
+    entries = _fetch()
+    levels = [{} for _ in range(MAX_ZOOM + 1)]
+    for rows in entries.values():
+        for entry in rows:
+            _apply(levels, entry, 1)
+    return {"seq": seq, "entries": entries, "levels": levels}
+
+
+def _changed_since(seq):
+    """Volunteers changed after `seq`, or None if the log no longer covers it."""
+    cache = frappe.cache()
+    changed, oldest = set(), None
+    for item in cache.lrange(cache.make_key(LOG_KEY), 0, -1):
+        s, volunteer = item.decode().split("|", 1)
+        s = int(s)
+        oldest = s if oldest is None else min(oldest, s)
+        if s > seq:
+            changed.add(volunteer)
+    if oldest is None or oldest > seq + 1:
+        return None
+    return changed
+
+
+def get_index():
+    site = frappe.local.site
+    seq = _current_seq()
+    state = _sites.get(site)
+
+    if state is None:
+        state = _sites[site] = _build(seq)
+    elif state["seq"] != seq:
+        changed = _changed_since(state["seq"])
+        if changed is None:
+            state = _sites[site] = _build(seq)
+        else:
+            fresh = _fetch(list(changed)) if changed else {}
+            for volunteer in changed:
+                for entry in state["entries"].pop(volunteer, []):
+                    _apply(state["levels"], entry, -1)
+                for entry in fresh.get(volunteer, []):
+                    _apply(state["levels"], entry, 1)
+                if volunteer in fresh:
+                    state["entries"][volunteer] = fresh[volunteer]
+            state["seq"] = seq
+    return state
+
+
+def _log_change(volunteer):
+    cache = frappe.cache()
+    seq_key, log = cache.make_key(SEQ_KEY), cache.make_key(LOG_KEY)
+
+    def append(pipe):
+        seq = cint(pipe.get(seq_key)) + 1
+        pipe.multi()
+        pipe.set(seq_key, seq)
+        pipe.rpush(log, f"{seq}|{volunteer}")
+        pipe.ltrim(log, -LOG_SIZE, -1)
+
+    # Sequence and log entry move together: a reader never sees seq N
+    # without entry N. Retried if another save takes the number first.
+    cache.transaction(append, seq_key)
+
+
+def mark_changed(doc, method=None):
+    # Log after commit so other workers never refetch uncommitted rows.
+    frappe.db.after_commit.add(lambda: _log_change(doc.name))
+
+
+def mark_renamed(doc, method=None, old=None, new=None, merge=False):
+    # The old id drops its points, the new one refetches them
+    for name in {old, new or doc.name} - {None}:
+        frappe.db.after_commit.add(lambda name=name: _log_change(name))
+
+
+# ------------------------------- Query ------------------------------- #
+
+def parse_bbox(bbox):
+    """Accept "west,south,east,north" or a JSON/list of four numbers."""
+    if not bbox:
+        return -180.0, -85.0511, 180.0, 85.0511
+    if isinstance(bbox, str):
+        bbox = frappe.parse_json(bbox) if bbox.strip().startswith("[") else bbox.split(",")
+    west, south, east, north = (flt(v) for v in bbox)
+    return west, south, east, north
+
+
+def _matches(entry, governorate=None, sex=None, role=None, modified_since=None):
+    """The volunteers map page filters, for in-memory entries."""
+    return (
+        (not governorate or entry.governorate == governorate)
+        and (not sex or entry.sex == sex)
+        and (not role or entry.role == role)
+        and (not modified_since or get_datetime(entry.modified) >= modified_since)
+    )
+
+
+def _aggregate(entries, zoom):
+    """Cells at `zoom` for a subset of entries, shaped like an index level."""
+    shift, level = MAX_ZOOM - zoom, {}
+    for entry in entries:
+        _apply_one(level, (entry.cell[0] >> shift, entry.cell[1] >> shift), entry)
+    return level
+
+
+def clusters(zoom, bbox=None, governorate=None, sex=None, role=None, modified_since=None):
+    """Cluster features for a viewport, or single volunteers past MAX_ZOOM.
+
+    `governorate`, `sex`, `role` and `modified_since` (volunteer record)
+    narrow the volunteers counted, as on the volunteers map page.
+    """
+    zoom = max(cint(zoom), 0)
+    west, south, east, north = parse_bbox(bbox)
+    index = get_index()
+    filters = {
+        "governorate": governorate,
+        "sex": sex,
+        "role": role,
+        "modified_since": get_datetime(modified_since) if modified_since else None,
+    }
+    filtered = any(filters.values())
+
+    def inside(lat, lng):
+        return south <= lat <= north and west <= lng <= east
+
+    def selected():
+        for rows in index["entries"].values():
+            for e in rows:
+                if not filtered or _matches(e, **filters):
+                    yield e
+
+    features = []
+    if zoom > MAX_ZOOM:
+        for e in selected():
+            if not inside(e.latitude, e.longitude):
+                continue
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [e.longitude, e.latitude]},
+                "properties": {
+                    "cluster": False,
+                    "row": e.row,
+                    "volunteer_id": e.volunteer_id,
+                    "volunteer": e.volunteer,
+                    "sex": e.sex,
+                    "role": e.role,
+                    "image": image_url(e.image_url),
+                    "address_type": e.address_type,
+                    "governorate": e.governorate,
+                    "district": e.district,
+                    "village": e.village,
+                    "home_address": e.home_address,
+                },
+            })
+        return {"type": "FeatureCollection", "features": features, "zoom": zoom, "clustered": False}
+
+    level = _aggregate(selected(), zoom) if filtered else index["levels"][zoom]
+    for (ix, iy), cell in level.items():
+        lat, lng = cell["lat"] / cell["count"], cell["lng"] / cell["count"]
+        if not inside(lat, lng):
+            continue
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lng, lat]},
+            "properties": {
+                "cluster": True,
+                "cluster_id": f"{zoom}/{ix}/{iy}",
+                "count": cell["count"],
+                "sex": {k: v for k, v in cell["sex"].items() if v},
+                "role": {k: v for k, v in cell["role"].items() if v},
+            },
+        })
+    return {"type": "FeatureCollection", "features": features, "zoom": zoom, "clustered": True}
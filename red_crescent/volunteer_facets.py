@@ -0,0 +1,98 @@
+import frappe
+
+# Every filter list of the volunteers map, with per-value counts, built with a
+# handful of grouped queries and kept in Redis until a volunteer (and so its
+# Volunteer Address rows), a team or a branch changes.
+
+FACETS_KEY = "volunteer_map_facets"
+
+PARENT = "YRCS Volunteers"
+CHILD = "Volunteer Address"
+
+
+def _values(rows):
+    return [{"value": r.value, "count": r.count} for r in rows if r.value]
+
+
+def build():
+    governorates = frappe.db.sql(
+        f"""
+        SELECT governorate AS value, COUNT(*) AS count
+        FROM `tab{CHILD}`
+        WHERE parenttype = %s AND IFNULL(governorate, '') != ''
+        GROUP BY governorate
+        ORDER BY governorate
+        """,
+        (PARENT,),
+        as_dict=True,
+    )
+    districts = frappe.db.sql(
+        f"""
+        SELECT district AS value, governorate, COUNT(*) AS count
+        FROM `tab{CHILD}`
+        WHERE parenttype = %s AND IFNULL(district, '') != ''
+        GROUP BY governorate, district
+        ORDER BY district, governorate
+        """,
+        (PARENT,),
+        as_dict=True,
+    )
+    address_types = frappe.db.sql(
+        f"""
+        SELECT add_type AS value, COUNT(*) AS count
+        FROM `tab{CHILD}`
+        WHERE parenttype = %s AND IFNULL(add_type, '') != ''
+        GROUP BY add_type
+        ORDER BY add_type
+        """,
+        (PARENT,),
+        as_dict=True,
+    )
+    teams = frappe.db.sql(
+        """
+        SELECT t.name AS value, t.team_name AS label, t.yrcs_branch AS branch, COUNT(tm.name) AS count
+        FROM `tabTeams` t
+        LEFT JOIN `tabTeam Member` tm ON tm.parent = t.name AND tm.parenttype = 'Teams'
+        GROUP BY t.name, t.team_name, t.yrcs_branch
+        ORDER BY t.name
+        """,
+        as_dict=True,
+    )
+    branches = frappe.db.sql(
+        f"""
+        SELECT b.name AS value, b.branch_name AS label, b.governorate, COUNT(v.name) AS count
+        FROM `tabNS Branch` b
+        LEFT JOIN `tab{PARENT}` v ON v.ns_branch = b.name
+        GROUP BY b.name, b.branch_name, b.governorate
+        ORDER BY IFNULL(b.branch_name, b.name)
+        """,
+        as_dict=True,
+    )
+
+    return {
+        "governorates": _values(governorates),
+        "districts": [
+            {"value": r.value, "governorate": r.governorate, "count": r.count} for r in districts
+        ],
+        "address_types": _values(address_types),
+        "teams": [
+            {"value": r.value, "label": r.label or r.value, "branch": r.branch, "count": r.count} for r in teams
+        ],
+        "branches": [
+            {"value": r.value, "label": r.label or r.value, "governorate": r.governorate, "count": r.count}
+            for r in branches
+        ],
+    }
+
+
+def get_facets():
+    facets = frappe.cache().get_value(FACETS_KEY)
+    if facets is None:
+        facets = build()
+        frappe.cache().set_value(FACETS_KEY, facets)
+    return facets
+
+
+def invalidate(*args, **kwargs):
+    frappe.cache().delete_value(FACETS_KEY)
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(FACETS_KEY))
@@ -0,0 +1,272 @@
+import json
+import math
+
+import frappe
+import numpy as np
+from frappe.utils import cint, flt
+from redis.exceptions import LockError
+
+from red_crescent.volunteer_map_points import image_url
+from red_crescent.volunteer_query import matches
+
+# Grid index over geolocated volunteer addresses, stored in Redis so every
+# worker shares it. Each cell is CELL_DEG x CELL_DEG degrees and is one Redis
+# hash of {address row: entry}, with everything the map needs to render.
+# Each volunteer owns a set of "cell|row" members, so replacing one
+# volunteer only touches its own hash fields (no read-modify-write of a
+# cell) and runs in one WATCH/MULTI transaction after the save commits.
+# A rebuild writes a new generation of keys under a lock and then points
+# READY_KEY at it, so readers keep the previous grid until the swap and
+# only one worker builds at a time.
+
+GRID_PREFIX = "volunteer_geo_grid:"         # + generation + ":"
+CELL_PREFIX = "cell:"                       # cell -> {row: entry}
+OWNER_PREFIX = "owner:"                     # volunteer -> {"cell|row", ...}
+CELLS_KEY = "cells"                         # every cell that held an entry
+READY_KEY = "volunteer_geo_grid_ready"      # generation being served
+LOCK_KEY = "volunteer_geo_grid_lock"
+
+# Seconds a rebuild may hold the lock, and readers wait for it
+LOCK_TIMEOUT = 600
+LOCK_WAIT = 60
+
+CELL_DEG = 0.25
+MAX_CELLS = 400
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+POINTS = "Volunteer Map Point"
+POINT_FIELDS = (
+    "name", "volunteer", "volunteer_name", "sex", "status", "image_url", "address_type",
+    "governorate", "district", "sub_district", "village", "home_address", "latitude", "longitude",
+)
+
+
+# ------------------------------- Helpers ------------------------------- #
+
+def cell_of(lat, lng):
+    return f"{math.floor(lat / CELL_DEG)}:{math.floor(lng / CELL_DEG)}"
+
+
+def cells_for_bbox(min_lat, min_lng, max_lat, max_lng):
+    """Return the grid cells covering a bounding box."""
+    i0, i1 = math.floor(min_lat / CELL_DEG), math.floor(max_lat / CELL_DEG)
+    j0, j1 = math.floor(min_lng / CELL_DEG), math.floor(max_lng / CELL_DEG)
+    return [f"{i}:{j}" for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+
+def bbox_around(lat, lng, radius_km):
+    """Bounding box (min_lat, min_lng, max_lat, max_lng) enclosing a circle."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    dlng = min(radius_km / (KM_PER_DEG_LAT * cos_lat), 180.0)
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Vectorized great-circle distance from one point to arrays of points."""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(lngs) - math.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _entry(r):
+    """Index entry for one Volunteer Map Point row."""
+    return {
+        "row": r.name,
+        "volunteer_id": r.volunteer,
+        "volunteer": r.volunteer_name,
+        "sex": r.sex,
+        "status": r.status,
+        "image": r.image_url,
+        "address_type": r.address_type,
+        "governorate": r.governorate,
+        "district": r.district,
+        "sub_district": r.sub_district,
+        "village": r.village,
+        "home_address": r.home_address,
+        "latitude": flt(r.latitude),
+        "longitude": flt(r.longitude),
+    }
+
+
+def _points(volunteer=None):
+    return frappe.get_all(
+        POINTS,
+        filters={"volunteer": volunteer} if volunteer else None,
+        fields=list(POINT_FIELDS),
+        limit_page_length=0,
+    )
+
+
+# ------------------------------- Build / Maintain ------------------------------- #
+
+def _key(generation, suffix):
+    return frappe.cache().make_key(f"{GRID_PREFIX}{generation}:{suffix}")
+
+
+def _generation():
+    return frappe.safe_decode(frappe.cache().get_value(READY_KEY)) or None
+
+
+def _lock():
+    cache = frappe.cache()
+    return cache.lock(cache.make_key(LOCK_KEY), timeout=LOCK_TIMEOUT, blocking_timeout=LOCK_WAIT)
+
+
+def _build():
+    """Write a new generation from the projection and switch readers to it."""
+    cache = frappe.cache()
+    generation = frappe.generate_hash(length=10)
+    rows = _points()
+
+    pipe = cache.pipeline(transaction=False)
+    for r in rows:
+        entry = _entry(r)
+        cell = cell_of(entry["latitude"], entry["longitude"])
+        pipe.hset(_key(generation, CELL_PREFIX + cell), r.name, json.dumps(entry))
+        pipe.sadd(_key(generation, OWNER_PREFIX + r.volunteer), f"{cell}|{r.name}")
+        pipe.sadd(_key(generation, CELLS_KEY), cell)
+    pipe.execute()
+
+    old = _generation()
+    cache.set_value(READY_KEY, generation)
+    if old:
+        cache.delete_keys(f"{GRID_PREFIX}{old}:")
+    return len(rows)
+
+
+def rebuild():
+    """Rebuild the whole grid from the Volunteer Map Point projection."""
+    with _lock():
+        return _build()
+
+
+def ensure_index():
+    """Generation to read, building the first one if there is none yet.
+
+    Workers that find no grid wait for the one building it instead of
+    building their own; None if that takes longer than LOCK_WAIT.
+    """
+    generation = _generation()
+    if generation:
+        return generation
+    try:
+        with _lock():
+            if not _generation():
+                _build()
+    except LockError:
+        return None
+    return _generation()
+
+
+def replace_volunteer(volunteer, entries):
+    """Atomically swap a volunteer's grid entries for `entries`."""
+    generation = _generation()
+    if not generation:
+        return  # the first read builds the grid from scratch
+    cache = frappe.cache()
+    owner_key = _key(generation, OWNER_PREFIX + volunteer)
+    cells_key = _key(generation, CELLS_KEY)
+
+    def apply(pipe):
+        old = pipe.smembers(owner_key)
+        pipe.multi()
+        for member in old:
+            cell, row = frappe.safe_decode(member).split("|", 1)
+            pipe.hdel(_key(generation, CELL_PREFIX + cell), row)
+        pipe.delete(owner_key)
+        for entry in entries:
+            cell = cell_of(entry["latitude"], entry["longitude"])
+            pipe.hset(_key(generation, CELL_PREFIX + cell), entry["row"], json.dumps(entry))
+            pipe.sadd(owner_key, f"{cell}|{entry['row']}")
+            pipe.sadd(cells_key, cell)
+
+    # Retried if another save of the same volunteer changes its owner set first
+    cache.transaction(apply, owner_key)
+
+
+def update_volunteer(volunteer):
+    """Re-read one volunteer's committed map points into the grid."""
+    replace_volunteer(volunteer, [_entry(r) for r in _points(volunteer)])
+
+
+def _remove_volunteer(volunteer):
+    replace_volunteer(volunteer, [])
+
+
+# The grid is shared by every worker, so it only changes once the save commits
+def on_volunteer_update(doc, method=None):
+    frappe.db.after_commit.add(lambda name=doc.name: update_volunteer(name))
+
+
+def on_volunteer_trash(doc, method=None):
+    frappe.db.after_commit.add(lambda name=doc.name: _remove_volunteer(name))
+
+
+def on_volunteer_rename(doc, method=None, old=None, new=None, merge=False):
+    def move(old=old, new=new or doc.name):
+        if old:
+            _remove_volunteer(old)
+        update_volunteer(new)
+
+    frappe.db.after_commit.add(move)
+
+
+# ------------------------------- Query ------------------------------- #
+
+def candidates_in_bbox(min_lat, min_lng, max_lat, max_lng):
+    """All index entries whose cell overlaps the bounding box."""
+    generation = ensure_index()
+    if not generation:
+        return []
+    cache = frappe.cache()
+    cells = cells_for_bbox(min_lat, min_lng, max_lat, max_lng)
+    if len(cells) > MAX_CELLS:
+        (members,) = cache.pipeline(transaction=False).smembers(_key(generation, CELLS_KEY)).execute()
+        cells = [frappe.safe_decode(c) for c in members]
+
+    pipe = cache.pipeline(transaction=False)
+    for cell in cells:
+        pipe.hvals(_key(generation, CELL_PREFIX + cell))
+    return [json.loads(e) for chunk in pipe.execute() for e in chunk]
+
+
+def nearest(lat, lng, radius_km=10, address_type=None, sex=None, status=None, volunteers=None, limit=100):
+    """Return the closest index entries within radius_km, nearest first.
+
+    `volunteers` restricts the search to a set of volunteer ids (e.g. team members).
+    """
+    lat, lng, radius_km = flt(lat), flt(lng), flt(radius_km)
+    limit = cint(limit)
+
+    entries = [
+        e
+        for e in candidates_in_bbox(*bbox_around(lat, lng, radius_km))
+        if matches(e, address_type=address_type, sex=sex, status=status, volunteers=volunteers)
+    ]
+    if not entries or limit <= 0:
+        return []
+
+    lats = np.fromiter((e["latitude"] for e in entries), dtype=float, count=len(entries))
+    lngs = np.fromiter((e["longitude"] for e in entries), dtype=float, count=len(entries))
+    dist = haversine_km(lat, lng, lats, lngs)
+
+    idx = np.flatnonzero(dist <= radius_km)
+    if len(idx) > limit:
+        idx = idx[np.argpartition(dist[idx], limit - 1)[:limit]]
+    idx = idx[np.argsort(dist[idx], kind="stable")]
+
+    return [
+        {**entries[i], "image": image_url(entries[i]["image"]), "distance_km": round(float(dist[i]), 2)}
+        for i in idx
+    ]
+
+
+@frappe.whitelist()
+def rebuild_volunteer_geo_index():
+    frappe.only_for("System Manager")
+    return rebuild()
@@ -0,0 +1,172 @@
+import math
+from urllib.parse import quote
+
+import frappe
+from frappe.utils import now_datetime
+
+from red_crescent import map_search
+
+# Read-optimized projection of geolocated volunteer addresses: one Volunteer
+# Map Point per Volunteer Address row, with the display name, photo path and
+# float coordinates precomputed, so map reads never join or format per row.
+# The photo is stored site-relative and made absolute by `image_url` on read.
+# Kept in sync from YRCS Volunteers doc events; `rebuild` recreates it.
+
+DOCTYPE = "Volunteer Map Point"
+PARENT = "YRCS Volunteers"
+CHILD = "Volunteer Address"
+
+FIELDS = (
+    "address_row", "volunteer", "volunteer_name", "sex", "status", "ns_branch", "role", "image_url",
+    "address_type", "governorate", "district", "sub_district", "village", "home_address",
+    "latitude", "longitude", "address_modified", "volunteer_modified",
+)
+META_FIELDS = ("name", "creation", "modified", "modified_by", "owner", "docstatus")
+
+DEFAULT_AVATAR = "/files/default-avatar.png"
+
+
+def _float(value):
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+def full_name(r):
+    return " ".join(filter(None, [r.firstname, r.middle_name, r.last_name])) or r.parent
+
+
+def photo_path(photo):
+    """Site-relative URL of a volunteer photo, as stored on the projection.
+
+    Attach Image values are already "/files/..." (or a full URL); a bare
+    file name is placed under /files/.
+    """
+    if not photo:
+        return DEFAULT_AVATAR
+    if photo.startswith(("/", "http://", "https://")):
+        return photo
+    return f"/files/{quote(photo)}"
+
+
+def image_url(path):
+    """Absolute URL for a stored photo path, resolved against the current site."""
+    return frappe.utils.get_url(path or DEFAULT_AVATAR)
+
+
+def project(addr, volunteer):
+    """Projection row for one address of a volunteer, or None if not geolocated."""
+    lat, lng = _float(addr.get("latitude")), _float(addr.get("longitude"))
+    if lat is None or lng is None:
+        return None
+    return {
+        "address_row": addr.get("name"),
+        "volunteer": volunteer.get("name"),
+        "volunteer_name": full_name(frappe._dict(volunteer, parent=volunteer.get("name"))),
+        "sex": volunteer.get("sex"),
+        "status": volunteer.get("status"),
+        "ns_branch": volunteer.get("ns_branch"),
+        "role": volunteer.get("volunteer_rol"),
+        "image_url": photo_path(volunteer.get("volunteer_photo")),
+        "address_type": addr.get("add_type"),
+        "governorate": addr.get("governorate"),
+        "district": addr.get("district"),
+        "sub_district": addr.get("sub_district"),
+        "village": addr.get("village"),
+        "home_address": addr.get("home_address"),
+        "latitude": lat,
+        "longitude": lng,
+        "address_modified": addr.get("modified"),
+        "volunteer_modified": volunteer.get("modified"),
+    }
+
+
+def _insert(points):
+    if not points:
+        return
+    now, user = now_datetime(), frappe.session.user
+    frappe.db.bulk_insert(
+        DOCTYPE,
+        fields=[*META_FIELDS, *FIELDS],
+        values=[(p["address_row"], now, now, user, user, 0, *(p[f] for f in FIELDS)) for p in points],
+    )
+    map_search.index_records(DOCTYPE, [{**p, "name": p["address_row"]} for p in points])
+
+
+def _delete(volunteer):
+    map_search.remove_records(DOCTYPE, frappe.get_all(DOCTYPE, filters={"volunteer": volunteer}, pluck="name"))
+    frappe.db.delete(DOCTYPE, {"volunteer": volunteer})
+
+
+# ------------------------------- Doc events ------------------------------- #
+
+def sync_volunteer(doc, method=None):
+    _delete(doc.name)
+    volunteer = doc.as_dict()
+    _insert(
+        [
+            p
+            for p in (project(addr.as_dict(), volunteer) for addr in doc.get("volunteer_address") or [])
+            if p
+        ]
+    )
+
+
+def remove_volunteer(doc, method=None):
+    _delete(doc.name)
+
+
+def rename_volunteer(doc, method=None, old=None, new=None, merge=False):
+    if old:
+        _delete(old)
+    sync_volunteer(frappe.get_doc(PARENT, new or doc.name))
+
+
+# ------------------------------- Rebuild ------------------------------- #
+
+def rebuild():
+    """Recreate every map point from one join; returns the number of points."""
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            a.name, a.modified, a.add_type, a.governorate, a.district,
+            a.sub_district, a.village, a.home_address, a.latitude, a.longitude,
+            v.name AS volunteer, v.modified AS volunteer_modified, v.firstname,
+            v.middle_name, v.last_name, v.sex, v.status, v.ns_branch,
+            v.volunteer_rol, v.volunteer_photo
+        FROM `tab{CHILD}` a
+        JOIN `tab{PARENT}` v ON v.name = a.parent
+        WHERE a.parenttype = %s
+          AND a.latitude IS NOT NULL AND a.latitude != ''
+          AND a.longitude IS NOT NULL AND a.longitude != ''
+        """,
+        (PARENT,),
+        as_dict=True,
+    )
+    points = [
+        p
+        for p in (
+            project(r, {**r, "name": r.volunteer, "modified": r.volunteer_modified})
+            for r in rows
+        )
+        if p
+    ]
+
+    from red_crescent import volunteer_geo_index
+
+    frappe.db.delete(DOCTYPE)
+    frappe.db.delete(map_search.DOCTYPE, {"ref_doctype": DOCTYPE})
+    _insert(points)
+    # The shared grid index swaps to the new projection once it is committed
+    frappe.db.after_commit.add(volunteer_geo_index.rebuild)
+    return len(points)
+
+
+@frappe.whitelist()
+def rebuild_volunteer_map_points():
+    frappe.only_for("System Manager")
+    count = rebuild()
+    frappe.db.commit()
+    return count
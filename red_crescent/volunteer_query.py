@@ -0,0 +1,139 @@
+import frappe
+from frappe.utils import cint
+
+from red_crescent.map_search import search_condition
+from red_crescent.volunteer_map_points import image_url
+
+# Single query layer for geolocated volunteer addresses. Every filter (team
+# membership, sex, status, role, branch, address type, place, text search,
+# keyset position) is pushed into one SQL statement over the Volunteer Map
+# Point projection (see volunteer_map_points), so the LIMIT is always applied
+# to fully filtered rows. `matches` applies the same filters to in-memory
+# entries (the shared grid index).
+
+POINTS = "Volunteer Map Point"
+
+
+def build_query(
+    governorate=None,
+    district=None,
+    address_type=None,
+    q=None,
+    team=None,
+    sex=None,
+    status=None,
+    role=None,
+    branch=None,
+    modified_since=None,
+    volunteers=None,
+    after=None,
+    limit=None,
+):
+    """Return (sql, values) for located volunteer addresses, newest first.
+
+    `after` is a (modified, name) keyset position; `volunteers` an iterable
+    of volunteer ids; `modified_since` applies to the volunteer record.
+    """
+    values = {}
+    conditions = ["1 = 1"]
+
+    for column, value in (
+        ("governorate", governorate),
+        ("district", district),
+        ("address_type", address_type),
+        ("sex", sex),
+        ("status", status),
+        ("role", role),
+        ("ns_branch", branch),
+    ):
+        if value:
+            conditions.append(f"p.{column} = %({column})s")
+            values[column] = value
+
+    if modified_since:
+        conditions.append("p.volunteer_modified >= %(modified_since)s")
+        values["modified_since"] = modified_since
+    if volunteers is not None:
+        conditions.append("p.volunteer IN %(volunteers)s")
+        values["volunteers"] = tuple(volunteers) or ("",)
+    if q:
+        condition, search_values = search_condition(POINTS, q, "p.name")
+        conditions.append(condition)
+        values.update(search_values)
+    if team:
+        conditions.append(
+            """EXISTS (
+                SELECT 1 FROM `tabTeam Member` tm
+                WHERE tm.parenttype = 'Teams' AND tm.parent = %(team)s AND tm.volunteer = p.volunteer
+            )"""
+        )
+        values["team"] = team
+    if after:
+        conditions.append(
+            "(p.address_modified < %(after_modified)s"
+            " OR (p.address_modified = %(after_modified)s AND p.name < %(after_name)s))"
+        )
+        values["after_modified"], values["after_name"] = after
+
+    sql = f"""
+        SELECT
+            p.name, p.address_modified AS modified, p.volunteer, p.volunteer_name,
+            p.sex, p.status, p.ns_branch, p.role, p.image_url, p.address_type,
+            p.governorate, p.district, p.sub_district, p.village,
+            p.home_address, p.latitude, p.longitude
+        FROM `tab{POINTS}` p
+        WHERE {" AND ".join(conditions)}
+        ORDER BY p.address_modified DESC, p.name DESC
+    """
+    if limit:
+        sql += " LIMIT %(limit)s"
+        values["limit"] = cint(limit)
+    return sql, values
+
+
+def get_locations(limit=None, **filters):
+    """Rows of build_query."""
+    sql, values = build_query(limit=limit, **filters)
+    return frappe.db.sql(sql, values, as_dict=True)
+
+
+def team_volunteers(team):
+    return set(
+        frappe.get_all("Team Member", filters={"parenttype": "Teams", "parent": team}, pluck="volunteer")
+    ) - {None}
+
+
+def matches(entry, address_type=None, sex=None, status=None, volunteers=None):
+    """The same filters as build_query, for volunteer_geo_index entries."""
+    return (
+        (not address_type or entry.get("address_type") == address_type)
+        and (not sex or entry.get("sex") == sex)
+        and (not status or entry.get("status") == status)
+        and (volunteers is None or entry.get("volunteer_id") in volunteers)
+    )
+
+
+# ------------------------------- Output ------------------------------- #
+
+def to_feature(r):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [float(r.longitude), float(r.latitude)]},
+        "properties": {
+            "row": r.name,
+            "volunteer_id": r.volunteer,
+            "volunteer": r.volunteer_name,
+            "sex": r.sex or "",
+            "status": r.status,
+            "role": r.role,
+            "branch": r.ns_branch,
+            "image": image_url(r.image_url),
+            "address_type": r.address_type,
+            "governorate": r.governorate,
+            "district": r.district,
+            "sub_district": r.sub_district,
+            "village": r.village,
+            "home_address": r.home_address,
+            "weight": 1,
+        },
+    }
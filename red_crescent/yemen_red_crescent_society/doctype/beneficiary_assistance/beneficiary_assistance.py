@@ -0,0 +1,16 @@
+# Copyright (c) 2026, YRCS and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class BeneficiaryAssistance(Document):
+	pass
+
+
+def on_doctype_update():
+	# "Assisted in the last N days" and the bulk check seek on this index
+	frappe.db.add_index("Beneficiary Assistance", ["beneficiary", "assistance_date"], "beneficiary_assistance_date")
+	# Rows are replaced per source document on save and delete
+	frappe.db.add_index("Beneficiary Assistance", ["source_doctype", "source_name"], "beneficiary_assistance_source")
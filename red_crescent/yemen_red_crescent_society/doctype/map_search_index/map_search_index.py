@@ -0,0 +1,15 @@
+# Copyright (c) 2026, YRCS and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class MapSearchIndex(Document):
+	pass
+
+
+def on_doctype_update():
+	# Trigram tokens are 3 characters, the InnoDB default innodb_ft_min_token_size
+	if not frappe.db.has_index("tabMap Search Index", "map_search_grams"):
+		frappe.db.sql_ddl("ALTER TABLE `tabMap Search Index` ADD FULLTEXT INDEX map_search_grams (grams)")
@@ -0,0 +1,14 @@
+# Copyright (c) 2026, YRCS and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class ReliefStockBalance(Document):
+	pass
+
+
+def on_doctype_update():
+	# get_stock_balance filters by warehouse / item / expiry batch
+	frappe.db.add_index("Relief Stock Balance", ["warehouse", "item_code", "expiry_date"], "relief_stock_balance_key")
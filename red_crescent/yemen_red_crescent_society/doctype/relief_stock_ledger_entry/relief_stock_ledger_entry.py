@@ -0,0 +1,20 @@
+# Copyright (c) 2026, YRCS and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class ReliefStockLedgerEntry(Document):
+	pass
+
+
+def on_doctype_update():
+	# posted_lines: everything a voucher has posted
+	frappe.db.add_index("Relief Stock Ledger Entry", ["voucher_type", "voucher_no"], "relief_stock_voucher")
+	# balance_as_of: one key's entries after a snapshot
+	frappe.db.add_index(
+		"Relief Stock Ledger Entry",
+		["warehouse", "item_code", "expiry_date", "posting_datetime"],
+		"relief_stock_key",
+	)
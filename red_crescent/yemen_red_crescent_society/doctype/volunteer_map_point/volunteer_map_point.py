@@ -0,0 +1,24 @@
+# Copyright (c) 2026, YRCS and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class VolunteerMapPoint(Document):
+	pass
+
+
+def on_doctype_update():
+	# Place filters of the map queries, then their keyset order
+	frappe.db.add_index(
+		"Volunteer Map Point",
+		["governorate", "district", "address_type", "address_modified"],
+		"volunteer_map_place",
+	)
+	# Sex / status filters, then the keyset order
+	frappe.db.add_index("Volunteer Map Point", ["sex", "status", "address_modified"], "volunteer_map_status")
+	# Role filter with the `volunteer_modified >= cutoff` range
+	frappe.db.add_index("Volunteer Map Point", ["role", "volunteer_modified"], "volunteer_map_role")
+	# Bounding-box scans read latitude / longitude together
+	frappe.db.add_index("Volunteer Map Point", ["latitude", "longitude"], "volunteer_map_point_coords")
@@ -1,30 +1,32 @@
-import frappe
-
-@frappe.whitelist()
-def get_volunteers_with_location(last_days=60, governorate=None, gender=None, role=None):
-    filters = "a.latitude IS NOT NULL AND a.longitude IS NOT NULL"
-    if last_days:
-        filters += f" AND DATEDIFF(NOW(), v.modified) <= {int(last_days)}"
-    if governorate:
-        filters += f" AND a.governorate = {frappe.db.escape(governorate)}"
-    if gender:
-        filters += f" AND v.gender = {frappe.db.escape(gender)}"
-    if role:
-        filters += f" AND v.role LIKE {frappe.db.escape('%' + role + '%')}"
-
-    return frappe.db.sql(f"""
-        SELECT 
-            v.name,
-            v.full_name,
-            v.gender,
-            v.role,
-            v.profile_image,
-            a.latitude,
-            a.longitude,
-            a.home_address,
-            a.village,
-            a.governorate
-        FROM `tabYRCS Volunteers` v
-        JOIN `tabVolunteer Address` a ON a.parent = v.name
-        WHERE {filters}
-    """, as_dict=True)
+import frappe
+from frappe.utils import add_days, cint, nowdate
+
+from red_crescent.volunteer_map_points import image_url
+from red_crescent.volunteer_query import get_locations
+
+
+@frappe.whitelist()
+def get_volunteers_with_location(last_days=60, governorate=None, gender=None, role=None):
+    # One indexed query over the Volunteer Map Point projection, through the
+    # shared volunteer query layer.
+    rows = get_locations(
+        governorate=governorate,
+        sex=gender,
+        role=role,
+        modified_since=add_days(nowdate(), -cint(last_days)) if cint(last_days) else None,
+    )
+    return [
+        {
+            "name": r.volunteer,
+            "full_name": r.volunteer_name,
+            "gender": r.sex,
+            "role": r.role,
+            "profile_image": image_url(r.image_url),
+            "latitude": r.latitude,
+            "longitude": r.longitude,
+            "home_address": r.home_address,
+            "village": r.village,
+            "governorate": r.governorate,
+        }
+        for r in rows
+    ]
@@ -32,8 +32,17 @@ frappe.pages['volunteers-map'].on_page_load = function (wrapper) {
 
   page.add_field({
     label: 'Role',
-    fieldtype: 'Data',
+    fieldtype: 'Link',
     fieldname: 'role',
+    options: 'Volunteer Role',
+    change: () => loadMapData()
+  });
+
+  page.add_field({
+    label: 'Server Clusters',
+    fieldtype: 'Check',
+    fieldname: 'clustered',
+    default: 0,
     change: () => loadMapData()
   });
 
@@ -49,21 +58,77 @@ frappe.pages['volunteers-map'].on_page_load = function (wrapper) {
     attribution: '&copy; OpenStreetMap'
   }).addTo(map);
 
-  async function loadMapData() {
-    map.eachLayer(layer => { if (layer instanceof L.MarkerClusterGroup) map.removeLayer(layer); });
-    markersLayer = L.markerClusterGroup();
-    volData = [];
+  let clusterLayer = L.layerGroup().addTo(map);
+  map.on('moveend', () => {
+    if (page.fields_dict.clustered.get_value()) loadClusters();
+  });
 
-    const args = {
+  function filterArgs() {
+    return {
       last_days: page.fields_dict.last_days.get_value(),
       governorate: page.fields_dict.governorate.get_value(),
       gender: page.fields_dict.gender.get_value(),
       role: page.fields_dict.role.get_value()
     };
+  }
+
+  // Server-side clusters: only what is in the viewport, aggregated per zoom
+  async function loadClusters() {
+    const b = map.getBounds();
+    const res = await frappe.call({
+      method: 'red_crescent.api.get_volunteer_clusters',
+      args: {
+        ...filterArgs(),
+        zoom: map.getZoom(),
+        bbox: [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].join(',')
+      }
+    });
+
+    clusterLayer.clearLayers();
+    const data = res.message || { features: [] };
+
+    data.features.forEach(f => {
+      const [lng, lat] = f.geometry.coordinates;
+      const p = f.properties;
+
+      const esc = frappe.utils.escape_html;
+
+      if (!p.cluster) {
+        L.marker([lat, lng], { icon: getGenderIcon(p.sex) })
+          .bindPopup(`<b>${esc(p.volunteer || '')}</b><br>${esc(p.role || '')}<br>${esc(p.home_address || '')}`)
+          .addTo(clusterLayer);
+        return;
+      }
+
+      const size = Math.min(24 + Math.log2(p.count) * 6, 64);
+      const sex = Object.entries(p.sex).map(([k, v]) => `${esc(k)}: ${v}`).join('<br>');
+      const role = Object.entries(p.role).map(([k, v]) => `${esc(k)}: ${v}`).join('<br>');
+      L.marker([lat, lng], {
+        icon: L.divIcon({
+          html: `<div><span>${p.count}</span></div>`,
+          className: 'marker-cluster marker-cluster-medium',
+          iconSize: [size, size]
+        })
+      })
+        .bindPopup(`<b>${p.count}</b><br>${sex}<hr>${role}`)
+        .on('dblclick', () => map.setView([lat, lng], map.getZoom() + 2))
+        .addTo(clusterLayer);
+    });
+  }
+
+  async function loadMapData() {
+    map.eachLayer(layer => { if (layer instanceof L.MarkerClusterGroup) map.removeLayer(layer); });
+    markersLayer = L.markerClusterGroup();
+    volData = [];
+    clusterLayer.clearLayers();
+
+    if (page.fields_dict.clustered.get_value()) {
+      return loadClusters();
+    }
 
     const res = await frappe.call({
-      method: 'red_crescent.api.volunteer_map.get_volunteers_with_location',
-      args
+      method: 'red_crescent.yemen_red_crescent_society.page.volunteers_map.volunteer_map.get_volunteers_with_location',
+      args: filterArgs()
     });
 
     volData = res.message || [];